@@ -3,7 +3,7 @@ API v1 Router
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, users, courses, analytics, eeg_demo
+from app.api.v1.endpoints import auth, users, courses, analytics, eeg, eeg_demo, knowledge, ai, admin
 
 api_router = APIRouter()
 
@@ -12,4 +12,8 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(courses.router, prefix="/courses", tags=["courses"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
-api_router.include_router(eeg_demo.router, prefix="/eeg", tags=["eeg"])
\ No newline at end of file
+api_router.include_router(knowledge.router, prefix="/knowledge", tags=["knowledge"])
+api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
+api_router.include_router(eeg_demo.router, prefix="/eeg", tags=["eeg"])
+api_router.include_router(eeg.router, prefix="/eeg", tags=["eeg"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Admin diagnostics endpoints
+"""
+import asyncio
+import threading
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.auth import admin_user
+from app.core.config import settings
+from app.core.profiling import ProfilerBusy, slow_callback_detector, stack_sampler
+
+router = APIRouter(dependencies=[Depends(admin_user)])
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    hz: int = Query(settings.PROFILER_DEFAULT_HZ, ge=1, le=1000),
+    all_threads: bool = False,
+    include_idle: bool = False,
+):
+    """Sample stacks for ``seconds`` and return them collapsed (``frame;frame;... count`` per line) for flame graph tools.
+
+    Samples the event loop thread unless ``all_threads``; time spent waiting for I/O is left out unless ``include_idle``.
+    """
+    thread_ids = None if all_threads else [threading.get_ident()]
+    try:
+        stacks = await asyncio.to_thread(stack_sampler.sample, seconds, hz, thread_ids, include_idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(stack_sampler.collapsed(stacks))
+
+@router.get("/profile/metrics")
+async def get_profiler_metrics():
+    """Profiles taken and the sampler's own cost in the last one"""
+    return stack_sampler.metrics()
+
+@router.get("/slow-callbacks")
+async def get_slow_callbacks(limit: int = Query(20, ge=1, le=50)):
+    """Recent event loop stalls, newest first, with the stack each was caught in"""
+    return {**slow_callback_detector.metrics(), "recent": list(slow_callback_detector.recent)[::-1][:limit]}
@@ -0,0 +1,118 @@
+"""
+AI tutor chat endpoints
+"""
+import json
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.services.conversation_store import AI, USER, conversation_store
+from app.services.course_retrieval import course_retrieval
+from app.services.tutor_chat import tutor_chat
+
+router = APIRouter()
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=4000)
+    course_id: Optional[str] = None
+    session_id: Optional[str] = Field(None, max_length=100)
+    stream: bool = True
+
+class SessionRequest(BaseModel):
+    user_id: Optional[int] = None
+
+class RetrieveRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=64)
+    k: int = Field(5, ge=1, le=50)
+    course_id: Optional[str] = None
+    exact: Optional[bool] = None
+
+def sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/chat")
+async def chat(request: ChatRequest):
+    """Ask the tutor; streams tokens as server-sent events unless ``stream`` is false.
+
+    With a ``session_id`` both turns are recorded and the conversation so far is passed to the tutor.
+    """
+    history = None
+    if request.session_id:
+        try:
+            history = await conversation_store.context(request.session_id)
+            await conversation_store.append(request.session_id, USER, request.message)
+        except Exception:
+            raise HTTPException(status_code=503, detail="Conversation store is unavailable")
+
+    source, tokens = tutor_chat.ask(request.message, request.course_id, history)
+    # Wait for the first token so a failing generator still becomes a 503
+    try:
+        first = await tokens.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except Exception:
+        raise HTTPException(status_code=503, detail="Tutor is unavailable")
+
+    async def record(answer: str):
+        if request.session_id:
+            await conversation_store.append(request.session_id, AI, answer, metadata={"source": source})
+
+    if not request.stream:
+        answer = first + "".join([token async for token in tokens])
+        await record(answer)
+        return {"answer": answer, "source": source, "session_id": request.session_id}
+
+    async def events():
+        answer = [first]
+        yield sse({"token": first})
+        try:
+            async for token in tokens:
+                answer.append(token)
+                yield sse({"token": token})
+        except Exception:
+            yield sse({"detail": "Tutor stopped before finishing"}, event="error")
+            return
+        await record("".join(answer))
+        yield sse({"source": source}, event="done")
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/sessions")
+async def create_session(request: SessionRequest):
+    """Start a tutor conversation"""
+    return {"session_id": conversation_store.create(request.user_id)}
+
+@router.get("/sessions/{session_id}/context")
+async def get_session_context(session_id: str):
+    """Summary of earlier turns plus the most recent ones, as given to the tutor"""
+    return await conversation_store.context(session_id)
+
+@router.get("/sessions/{session_id}/messages")
+async def get_session_messages(session_id: str, before_id: Optional[int] = None, limit: int = Query(50, ge=1, le=200)):
+    """Stored messages, newest first; pass the last ``id`` as ``before_id`` for the next page"""
+    return {"session_id": session_id, "messages": await conversation_store.history(session_id, before_id, limit)}
+
+@router.post("/retrieve")
+async def retrieve_material(request: RetrieveRequest):
+    """Course passages best matching each query; ``exact`` skips the approximate index"""
+    results = course_retrieval.retrieve_batch(request.queries, request.k, request.course_id, request.exact)
+    return {"results": [{"query": q, "passages": passages} for q, passages in zip(request.queries, results)]}
+
+@router.get("/metrics")
+async def get_chat_metrics():
+    """Request sources, time to first token and generation throughput"""
+    return tutor_chat.metrics()
+
+@router.get("/retrieval/metrics")
+async def get_retrieval_metrics():
+    """Index size, IVF state, indexing counters and search latency"""
+    return course_retrieval.metrics()
+
+@router.get("/conversations/metrics")
+async def get_conversation_metrics():
+    """Conversation writer and context window counters"""
+    return conversation_store.metrics()
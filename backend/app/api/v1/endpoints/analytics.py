@@ -1,7 +1,13 @@
 """
 Analytics endpoints
 """
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.session_export import MEDIA_TYPES, export_sessions, parse_fields
 
 router = APIRouter()
 
@@ -21,4 +27,24 @@ async def get_focus_trends():
     return {
         "daily_focus": [65, 70, 68, 75, 72, 78, 74],
         "weekly_average": 71.7
-    }
\ No newline at end of file
+    }
+
+@router.get("/sessions/export")
+async def export_learning_sessions(
+    format: str = "csv",
+    user_id: Optional[str] = None,
+    course_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = None
+):
+    """Stream learning sessions as CSV, NDJSON or Parquet"""
+    try:
+        chunks = export_sessions(format, None, user_id, course_id, start, end, parse_fields(fields))
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="learning_sessions.{format}"'}
+    )
\ No newline at end of file
@@ -2,8 +2,9 @@
 Authentication endpoints
 """
 from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from app.core.auth import create_access_token, verify_password, get_password_hash
+from fastapi.security import OAuth2PasswordRequestForm
+from typing import Any, Dict
+from app.core.auth import PasswordHasherBusy, create_access_token, current_user, password_hasher, token_verifier
 
 router = APIRouter()
 
@@ -20,20 +21,55 @@ fake_users_db = {
 
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, retry shortly",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user["username"]})
+    access_token = create_access_token(data={"sub": user["username"], "role": user["role"]})
     return {"access_token": access_token, "token_type": "bearer"}
 
-def authenticate_user(username: str, password: str):
+async def authenticate_user(username: str, password: str):
     user = fake_users_db.get(username)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    if not await password_hasher.verify(password, user["hashed_password"]):
         return False
-    return user
\ No newline at end of file
+    return user
+
+@router.get("/hashing/metrics")
+async def get_hashing_metrics():
+    """Password hashing pool statistics"""
+    return password_hasher.metrics()
+
+@router.get("/me")
+async def read_current_user(claims: Dict[str, Any] = Depends(current_user)):
+    """Current user from the bearer token"""
+    user = fake_users_db.get(claims["sub"], {})
+    return {
+        "username": claims["sub"],
+        "full_name": user.get("full_name"),
+        "email": user.get("email"),
+        "role": user.get("role"),
+        "expires_at": claims.get("exp"),
+    }
+
+@router.post("/logout")
+async def logout(claims: Dict[str, Any] = Depends(current_user)):
+    """Revoke the bearer token"""
+    token_verifier.revoke(claims)
+    return {"message": "Logged out"}
+
+@router.get("/tokens/metrics")
+async def get_token_metrics():
+    """Token verification cache statistics"""
+    return token_verifier.metrics()
\ No newline at end of file
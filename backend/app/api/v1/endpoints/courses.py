@@ -1,48 +1,122 @@
 """
 Course management endpoints
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.services.attention_heatmap import attention_heatmaps
+from app.services.course_catalog import course_catalog
+from app.services.course_search import course_search
+from app.services.course_store import db_course_id, fetch_course
+from app.services.enrollment_pipeline import ALREADY_ENROLLED, ENROLLED, UNKNOWN_USER, enrollment_queue
+from app.services.user_store import DEMO_USERNAME, get_user_by_username
 
 router = APIRouter()
 
-# Mock courses data
-mock_courses = [
-    {
-        "id": 1,
-        "title": "Introduction to Machine Learning",
-        "description": "Learn the basics of ML with EEG integration",
-        "difficulty": "beginner",
-        "rating": 4.5,
-        "enrollment_count": 1250
-    },
-    {
-        "id": 2,
-        "title": "Advanced Neural Networks",
-        "description": "Deep learning with real-time brain feedback",
-        "difficulty": "advanced",
-        "rating": 4.8,
-        "enrollment_count": 320
-    }
-]
+class RosterRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=10000)
 
 @router.get("/")
-async def get_courses():
-    """Get all available courses"""
-    return mock_courses
+async def get_courses(
+    difficulty: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    min_rating: Optional[float] = None,
+    sort: str = "rating",
+    order: str = "desc",
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """List courses with filtering and cursor pagination"""
+    try:
+        return course_catalog.query(
+            difficulty=difficulty,
+            tags=tag,
+            min_rating=min_rating,
+            sort=sort,
+            descending=order != "asc",
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search")
+async def search_courses(
+    q: str,
+    type: Optional[str] = Query(None, pattern="^(course|module)$"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Full-text search over courses and modules"""
+    return {"query": q, "results": course_search.search(q, limit=limit, doc_type=type)}
+
+@router.get("/search/complete")
+async def complete_search(prefix: str, limit: int = Query(10, ge=1, le=50)):
+    """Search term completions for a prefix"""
+    return {"prefix": prefix, "completions": course_search.complete(prefix, limit)}
+
+@router.get("/enrollments/metrics")
+async def get_enrollment_metrics():
+    """Enrollment batching statistics"""
+    return enrollment_queue.metrics()
 
 @router.get("/{course_id}")
-async def get_course(course_id: int):
+async def get_course(course_id: str, db: AsyncSession = Depends(get_db)):
     """Get a specific course by ID"""
-    course = next((c for c in mock_courses if c["id"] == course_id), None)
+    course = course_catalog.get(course_id)
+    if not course and db_course_id(course_id) is not None:
+        # Added to the database after this process loaded its catalog
+        stored = await fetch_course(db, db_course_id(course_id))
+        course = course_catalog.upsert(stored) if stored else None
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
+@router.get("/{course_id}/heatmap")
+async def get_course_heatmap(course_id: str):
+    """Module-aligned attention heatmap for a course"""
+    heatmap = attention_heatmaps.get_course_heatmap(course_id)
+    if not heatmap:
+        raise HTTPException(status_code=404, detail="No heatmap for this course")
+    return heatmap
+
+def get_enrollable_course(course_id: str):
+    course = course_catalog.get(course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if db_course_id(course_id) is None:
+        raise HTTPException(status_code=400, detail="Demo courses do not accept enrollments")
+    return course
+
 @router.post("/{course_id}/enroll")
-async def enroll_in_course(course_id: int):
+async def enroll_in_course(course_id: str, db: AsyncSession = Depends(get_db)):
     """Enroll in a course"""
-    course = next((c for c in mock_courses if c["id"] == course_id), None)
-    if not course:
+    course = get_enrollable_course(course_id)
+    user = await get_user_by_username(db, DEMO_USERNAME)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    outcome = await enrollment_queue.submit(user.id, db_course_id(course_id))
+    if outcome == ALREADY_ENROLLED:
+        return {"message": f"Already enrolled in {course['title']}"}
+    if outcome == UNKNOWN_USER:
+        raise HTTPException(status_code=404, detail="User not found")
+    if outcome != ENROLLED:
         raise HTTPException(status_code=404, detail="Course not found")
-    return {"message": f"Successfully enrolled in {course['title']}"}
\ No newline at end of file
+    return {"message": f"Successfully enrolled in {course['title']}"}
+
+@router.post("/{course_id}/enroll/bulk")
+async def enroll_roster(course_id: str, roster: RosterRequest):
+    """Enroll a class roster in one call; safe to retry"""
+    get_enrollable_course(course_id)
+    outcomes = await enrollment_queue.submit_many(db_course_id(course_id), roster.user_ids)
+    summary = {"course_id": course_id, "enrolled": 0, "already_enrolled": 0, "unknown_users": []}
+    for user_id, outcome in outcomes.items():
+        if outcome == ENROLLED:
+            summary["enrolled"] += 1
+        elif outcome == ALREADY_ENROLLED:
+            summary["already_enrolled"] += 1
+        else:
+            summary["unknown_users"].append(user_id)
+    return summary
\ No newline at end of file
@@ -1,23 +1,24 @@
 """
 EEG data processing and real-time monitoring endpoints
 """
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
 import json
 import random
+import time
 from datetime import datetime
 
-router = APIRouter()
+from app.services.change_detection import change_events
+from app.services.difficulty_controller import difficulty_controller
+from app.services.eeg_store import eeg_store
+from app.services.learning_state import learning_state_classifier
+from app.services.live_sessions import DEMO_LIVE_USER_ID, live_session_manager
+from app.services.session_history import record_live_session
+from app.services.user_stats import user_stats
 
-class EEGDevice(BaseModel):
-    id: str
-    name: str
-    status: str  # connected, disconnected, error
-    battery_level: int
-    signal_quality: str  # excellent, good, fair, poor
-    sampling_rate: int
+router = APIRouter()
 
 class EEGData(BaseModel):
     timestamp: datetime
@@ -28,23 +29,14 @@ class EEGData(BaseModel):
     meditation_level: float
     signal_quality: float
 
+class LiveSessionRequest(BaseModel):
+    user_id: str = DEMO_LIVE_USER_ID
+    course_id: Optional[str] = None
+    module_id: Optional[str] = None
+
 # Store active WebSocket connections
 active_connections: List[WebSocket] = []
 
-@router.get("/devices", response_model=List[EEGDevice])
-async def get_eeg_devices():
-    """Get available EEG devices"""
-    return [
-        EEGDevice(
-            id="openbci_001",
-            name="OpenBCI Cyton",
-            status="connected",
-            battery_level=85,
-            signal_quality="good",
-            sampling_rate=250
-        )
-    ]
-
 @router.post("/devices/{device_id}/connect")
 async def connect_device(device_id: str):
     """Connect to EEG device"""
@@ -102,6 +94,30 @@ async def websocket_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         active_connections.remove(websocket)
 
+@router.websocket("/events")
+async def change_event_stream(websocket: WebSocket, session_id: Optional[str] = None, user_id: Optional[str] = None):
+    """WebSocket stream of distraction, recovery and fatigue events"""
+    await websocket.accept()
+    queue = change_events.subscribe()
+    try:
+        while True:
+            event = await queue.get()
+            if session_id and event.session_id != session_id:
+                continue
+            if user_id and event.user_id != user_id:
+                continue
+            await websocket.send_text(json.dumps(event.to_dict()))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        change_events.unsubscribe(queue)
+
+@router.get("/events/recent")
+async def get_recent_events(session_id: Optional[str] = None, limit: int = 50):
+    """Most recent change-point events"""
+    events = [e for e in change_events.recent if not session_id or e.session_id == session_id]
+    return [e.to_dict() for e in events[-limit:]]
+
 @router.get("/analysis/focus-patterns")
 async def get_focus_patterns():
     """Analyze focus patterns from EEG data"""
@@ -113,14 +129,72 @@ async def get_focus_patterns():
         "attention_span_trend": "improving"
     }
 
+@router.post("/session/start")
+async def start_live_session(request: LiveSessionRequest):
+    """Start a simulated live EEG session"""
+    try:
+        session = live_session_manager.start_session(
+            user_id=request.user_id,
+            course_id=request.course_id,
+            module_id=request.module_id,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "tick_hz": live_session_manager.tick_hz,
+        "status": "running"
+    }
+
+@router.post("/session/{session_id}/stop")
+async def stop_live_session(session_id: str):
+    """Stop a live EEG session"""
+    session = live_session_manager.stop_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    user_id = user_stats.resolve(session.user_id)
+    if user_id is not None:
+        ended_at = time.time()
+        minutes = round((ended_at - session.started_at) / 60)
+        user_stats.record(user_id, counters={"total_study_time": minutes})
+        await record_live_session(user_id, session, ended_at)
+    return {"session_id": session_id, "samples": session.samples, "status": "stopped"}
+
+@router.get("/sessions/{session_id}/readings")
+async def get_session_readings(session_id: str, start: float, end: Optional[float] = None):
+    """Stored readings for a session between two unix timestamps, at the finest resolution still kept"""
+    end = time.time() if end is None else end
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return await asyncio.to_thread(eeg_store.query, session_id, start, end)
+
+@router.get("/storage/metrics")
+async def get_storage_metrics():
+    """EEG reading store partitions and compaction counters"""
+    return eeg_store.metrics()
+
+@router.get("/session/{session_id}/adaptive-actions")
+async def get_adaptive_actions(session_id: str):
+    """Difficulty adjustments made for a live session"""
+    session = live_session_manager.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {
+        "session_id": session_id,
+        "content_difficulty": session.simulator.content_difficulty,
+        "adaptive_actions": difficulty_controller.get_actions(session_id)
+    }
+
+@router.get("/adaptation/metrics")
+async def get_adaptation_metrics():
+    """Adaptive difficulty controller performance"""
+    return difficulty_controller.metrics()
+
 @router.get("/analysis/learning-state")
-async def get_learning_state():
+async def get_learning_state(session_id: str):
     """Get current cognitive learning state"""
-    return {
-        "current_state": "focused",
-        "readiness_score": 0.87,
-        "cognitive_load": 0.65,
-        "stress_level": 0.23,
-        "recommended_action": "continue_learning",
-        "optimal_difficulty": "medium-high"
-    }
\ No newline at end of file
+    state = learning_state_classifier.get(session_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="No learning state for this session yet")
+    return state
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Knowledge graph endpoints
+"""
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.services.graph_centrality import graph_centrality
+from app.services.graph_loader import mastery_sync
+from app.services.knowledge_graph import knowledge_graph
+from app.services.knowledge_tracing import knowledge_tracer
+from app.services.learning_planner import learning_planner
+
+router = APIRouter()
+
+class ConceptMastery(BaseModel):
+    concept_id: str
+    mastery_level: float = Field(..., ge=0, le=1)
+    confidence: float = Field(1.0, ge=0, le=1)
+
+class Answer(BaseModel):
+    concept_id: str
+    correct: bool
+    attention: Optional[float] = Field(None, ge=0, le=100)
+
+class UserAnswer(Answer):
+    user_id: str
+
+def resolve_node(node_id: str) -> int:
+    index = knowledge_graph.graph.node_index(node_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return index
+
+@router.get("/nodes/{node_id}/prerequisites")
+async def get_prerequisites(node_id: str, transitive: bool = True):
+    """Prerequisites of a node in learning order"""
+    graph = knowledge_graph.graph
+    index = resolve_node(node_id)
+    nodes = graph.ancestors(index) if transitive else graph.prerequisites(index)
+    return {"node_id": node_id, "transitive": transitive, "prerequisites": graph.describe(nodes)}
+
+@router.get("/nodes/{node_id}/dependents")
+async def get_dependents(node_id: str, transitive: bool = True):
+    """Nodes that build on this one, in learning order"""
+    graph = knowledge_graph.graph
+    index = resolve_node(node_id)
+    nodes = graph.descendants(index) if transitive else graph.dependents(index)
+    return {"node_id": node_id, "transitive": transitive, "dependents": graph.describe(nodes)}
+
+@router.get("/nodes/{node_id}/learning-order")
+async def get_learning_order(node_id: str):
+    """A node and everything it requires, ordered so prerequisites come first"""
+    graph = knowledge_graph.graph
+    index = resolve_node(node_id)
+    return {"node_id": node_id, "order": graph.describe(graph.prerequisite_closure([index]))}
+
+@router.get("/nodes/{node_id}/importance")
+async def get_node_importance(node_id: str):
+    """Precomputed PageRank, degree and betweenness scores of a node"""
+    index = resolve_node(node_id)
+    return {"node_id": node_id, **graph_centrality.scores().describe(index)}
+
+@router.get("/importance")
+async def get_most_important(type: Optional[str] = None, limit: int = Query(10, ge=1, le=100)):
+    """Most foundational nodes, optionally of one type (Concept, Skill, LearningObjective)"""
+    return {"nodes": graph_centrality.top(limit, type)}
+
+@router.get("/centrality/metrics")
+async def get_centrality_metrics():
+    """Centrality recompute counters"""
+    return graph_centrality.metrics()
+
+@router.get("/topological-order")
+async def get_topological_order():
+    """Every node, prerequisites before dependents"""
+    graph = knowledge_graph.graph
+    return {"order": graph.describe(graph.topological_order())}
+
+@router.get("/users/{user_id}/next-concepts")
+async def get_next_concepts(user_id: str, limit: int = Query(5, ge=1, le=50)):
+    """Unmastered concepts the user is most ready for"""
+    return {"user_id": user_id, "concepts": learning_planner.next_concepts(user_id, limit)}
+
+@router.get("/users/{user_id}/path/{objective_id}")
+async def get_learning_path(user_id: str, objective_id: str):
+    """Ordered steps to an objective, skipping what the user has mastered"""
+    path = learning_planner.path(user_id, objective_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {"user_id": user_id, "objective_id": objective_id, **path}
+
+@router.put("/users/{user_id}/mastery")
+async def update_mastery(user_id: str, masteries: List[ConceptMastery]):
+    """Record concept mastery; the user's cached plans are recomputed on next request"""
+    learning_planner.set_mastery(user_id, [m.model_dump() for m in masteries])
+    return {"user_id": user_id, "updated": len(masteries)}
+
+def trace_answers(answers: List[dict]) -> dict:
+    try:
+        return knowledge_tracer.record_answers(answers)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.post("/users/{user_id}/answers")
+async def record_answers(user_id: str, answers: List[Answer]):
+    """Trace mastery from quiz answers, weighted by attention when given"""
+    return trace_answers([{"user_id": user_id, **a.model_dump()} for a in answers])
+
+@router.post("/answers/batch")
+async def record_answer_batch(answers: List[UserAnswer]):
+    """Trace mastery from a batch of answers across users, applied in order"""
+    return trace_answers([a.model_dump() for a in answers])
+
+@router.get("/users/{user_id}/traced-mastery")
+async def get_traced_mastery(user_id: str):
+    """Traced mastery and confidence for every concept the user has evidence on"""
+    masteries = knowledge_tracer.user_mastery(user_id)
+    if masteries is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"user_id": user_id, "concepts": masteries}
+
+@router.get("/tracing/metrics")
+async def get_tracing_metrics():
+    """Knowledge tracing matrix size, batch and snapshot counters"""
+    return knowledge_tracer.metrics()
+
+@router.post("/plans/batch")
+async def plan_all_users(objective_id: Optional[str] = None, limit: int = Query(5, ge=1, le=50)):
+    """Plan every known user in one vectorised pass and cache the results"""
+    return await learning_planner.plan_all(objective_id, limit)
+
+@router.get("/planner/metrics")
+async def get_planner_metrics():
+    """Planner cache and batch counters"""
+    return learning_planner.metrics()
+
+@router.get("/sync/metrics")
+async def get_sync_metrics():
+    """Neo4j mastery delta-sync counters"""
+    return mastery_sync.metrics()
+
+@router.post("/reload")
+async def reload_graph():
+    """Rebuild the in-process graph from its configured source"""
+    await knowledge_graph.reload()
+    return knowledge_graph.metrics()
+
+@router.get("/metrics")
+async def get_graph_metrics():
+    """Graph size, load time and traversal cache counters"""
+    return knowledge_graph.metrics()
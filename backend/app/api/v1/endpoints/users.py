@@ -1,10 +1,19 @@
 """
 User management endpoints
 """
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
+from app.core.database import get_db
+from app.services.session_history import InvalidCursor, SessionFilter, decode_cursor, parse_fields, stream_page
+from app.services.user_stats import user_stats
+from app.services.user_store import DEMO_USERNAME, get_profile, get_user_by_username, update_profile
+
 router = APIRouter()
 
 class UserProfile(BaseModel):
@@ -23,33 +32,86 @@ class UserStats(BaseModel):
     ai_sessions: int
     learning_streak: int
 
+class UserProfileUpdate(BaseModel):
+    email: Optional[str] = None
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    learning_preferences: Optional[dict] = None
+    eeg_device_connected: Optional[bool] = None
+
+async def get_demo_user(db: AsyncSession):
+    user = await get_user_by_username(db, DEMO_USERNAME)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def get_demo_profile(db: AsyncSession):
+    profile = await get_profile(db, DEMO_USERNAME)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
+
 @router.get("/profile", response_model=UserProfile)
-async def get_user_profile():
+async def get_user_profile(db: AsyncSession = Depends(get_db)):
     """Get user profile"""
-    return UserProfile(
-        id=1,
-        username="demo",
-        email="demo@neurolynx.edu",
-        full_name="Demo User",
-        learning_preferences={
-            "preferred_difficulty": "intermediate",
-            "learning_style": "visual",
-            "session_duration": 45
-        }
-    )
+    return UserProfile(**await get_demo_profile(db))
 
 @router.put("/profile")
-async def update_user_profile(profile: UserProfile):
+async def update_user_profile(profile: UserProfileUpdate, db: AsyncSession = Depends(get_db)):
     """Update user profile"""
+    user = await get_demo_user(db)
+    try:
+        await update_profile(db, user, profile.model_dump(exclude_unset=True))
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Email already in use")
     return {"message": "Profile updated successfully"}
 
 @router.get("/stats", response_model=UserStats)
-async def get_user_stats():
+async def get_user_stats(db: AsyncSession = Depends(get_db)):
     """Get user learning statistics"""
+    profile = await get_demo_profile(db)
+    stats = await user_stats.get(db, profile["id"])
     return UserStats(
-        total_courses=12,
-        completed_courses=8,
-        focus_average=87.5,
-        ai_sessions=24,
-        learning_streak=7
-    )
\ No newline at end of file
+        total_courses=stats["total_courses"],
+        completed_courses=stats["completed_courses"],
+        focus_average=round(stats["avg_focus_level"], 2),
+        ai_sessions=stats["total_ai_sessions"],
+        learning_streak=stats["learning_streak"]
+    )
+
+@router.get("/stats/metrics")
+async def get_user_stats_metrics():
+    """Write-behind statistics and cache counters"""
+    return user_stats.metrics()
+
+@router.get("/{user_id}/sessions")
+async def get_session_history(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = None,
+    course_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_attention: Optional[float] = Query(None, ge=0, le=100),
+):
+    """Learning session history, newest first, paged by an opaque cursor"""
+    descending = order == "desc"
+    try:
+        columns = parse_fields(fields)
+        after = decode_cursor(cursor, descending) if cursor else None
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = SessionFilter(course_id=course_id, since=since, until=until, min_attention=min_attention)
+    chunks = stream_page(user_id, columns, filters, limit, after, descending)
+    # Run the query now so database errors still become a 503
+    first = await chunks.__anext__()
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="application/json")
@@ -1,13 +1,23 @@
 """
 Authentication utilities
 """
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -16,30 +26,279 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing worker frees up within the queue timeout"""
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool instead of the event loop.
+
+    bcrypt releases the GIL, so a few worker threads hash in parallel while
+    the loop keeps serving streams. At most ``workers`` hashes run at once;
+    up to ``max_queue`` callers wait for a worker for at most
+    ``queue_timeout`` seconds and everyone beyond that is rejected at once.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout: float = settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    async def _run(self, func: Callable, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise PasswordHasherBusy("Timed out waiting for a password hashing worker")
+        finally:
+            self.waiting -= 1
+        self.total_wait += time.perf_counter() - queued_at
+
+        # The slot is given back when the hash finishes, not when the caller stops
+        # waiting: a cancelled request leaves bcrypt running in its thread
+        loop, slots = asyncio.get_running_loop(), self._slots
+
+        def work():
+            try:
+                return func(*args)
+            finally:
+                try:
+                    loop.call_soon_threadsafe(self._finished, slots)
+                except RuntimeError:
+                    pass  # loop already closed
+
+        self.running += 1
+        try:
+            future = loop.run_in_executor(self._executor, work)
+        except BaseException:
+            self._finished(slots)
+            raise
+        return await future
+
+    def _finished(self, slots: asyncio.Semaphore):
+        self.running -= 1
+        self.completed += 1
+        slots.release()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+
+    def metrics(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(1000 * self.total_wait / self.completed, 3) if self.completed else 0.0,
+        }
+
+# Global password hasher
+password_hasher = PasswordHasher()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+class TokenRevocations:
+    """Revoked token ids (``jti``) with their expiry, mirrored to Redis.
+
+    Lookups are local dict checks. A background task pushes local
+    revocations to a Redis sorted set scored by expiry and pulls everyone
+    else's, so a logout on one worker reaches the others within one sync
+    interval. Without Redis the list is simply process-local.
+    """
+
+    REDIS_KEY = "neurolynx:revoked_tokens"
+
+    def __init__(self, sync_interval: float = settings.TOKEN_REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self._revoked: Dict[str, float] = {}
+        self._unpublished: List[Tuple[str, float]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._redis = None
+        self.last_sync: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def revoke(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        self._unpublished.append((jti, expires_at))
+
+    def prune(self, now: Optional[float] = None):
+        """Expired tokens fail verification anyway; forget them"""
+        now = time.time() if now is None else now
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    async def sync(self, client):
+        now = time.time()
+        unpublished, self._unpublished = self._unpublished, []
+        try:
+            if unpublished:
+                await client.zadd(self.REDIS_KEY, {jti: exp for jti, exp in unpublished})
+            await client.zremrangebyscore(self.REDIS_KEY, "-inf", now)
+            remote = await client.zrangebyscore(self.REDIS_KEY, now, "+inf", withscores=True)
+        except Exception:
+            self._unpublished = unpublished + self._unpublished
+            raise
+        for jti, exp in remote:
+            self._revoked[jti.decode() if isinstance(jti, bytes) else jti] = float(exp)
+        self.prune(now)
+        self.last_sync = now
+
+    async def _run(self):
+        warned = False
+        while True:
+            try:
+                await self.sync(self._redis)
+                warned = False
+            except Exception:
+                if not warned:
+                    logger.warning("Token revocation sync with Redis failed, using the local list", exc_info=True)
+                    warned = True
+                self.prune()
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.warning("redis is not installed, token revocations stay process-local")
+            return
+        if self._task is None:
+            self._redis = aioredis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._redis.aclose()
+        self._redis = None
+
+class TokenVerifier:
+    """Validated JWT claims, cached until the token expires.
+
+    The cache is an LRU keyed by the SHA-256 digest of the raw token, so a
+    client that reconnects or polls with the same token pays for one
+    signature verification; later requests cost a hash and a dict lookup.
+    Revocation is checked on every call, cached or not.
+    """
+
+    def __init__(self, revocations: TokenRevocations, maxsize: int = settings.TOKEN_CACHE_SIZE):
+        self.revocations = revocations
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] > time.time():
+            self._cache.move_to_end(key)
+            self.hits += 1
+            claims = entry[0]
+        else:
+            if entry is not None:
+                del self._cache[key]
+            try:
+                claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            except JWTError:
+                raise credentials_exception()
+            if claims.get("sub") is None:
+                raise credentials_exception()
+            self.misses += 1
+            self._cache[key] = (claims, float(claims.get("exp", 0)))
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        if self.revocations.is_revoked(claims.get("jti")):
+            raise credentials_exception()
+        return claims
+
+    def revoke(self, claims: Dict[str, Any]):
+        if claims.get("jti"):
+            self.revocations.revoke(claims["jti"], float(claims.get("exp", time.time())))
+
+    def metrics(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "cached_tokens": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "revoked_tokens": len(self.revocations),
+            "last_revocation_sync": self.revocations.last_sync,
+        }
+
+# Global token verification state
+token_revocations = TokenRevocations()
+token_verifier = TokenVerifier(token_revocations)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+
 def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return username
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+    return token_verifier.decode(token)["sub"]
+
+async def current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+    """FastAPI dependency returning the validated claims of the bearer token"""
+    return token_verifier.decode(token)
+
+async def admin_user(claims: Dict[str, Any] = Depends(current_user)) -> Dict[str, Any]:
+    """FastAPI dependency admitting only tokens issued to admins"""
+    if claims.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return claims
\ No newline at end of file
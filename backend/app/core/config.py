@@ -17,11 +17,62 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "neurolynx123")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "neurolynx_db")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
+    # Full async URL override, e.g. sqlite+aiosqlite:///./neurolynx.db for local runs
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+    ENROLLMENT_BATCH_SIZE: int = int(os.getenv("ENROLLMENT_BATCH_SIZE", "500"))
+    ENROLLMENT_BATCH_DELAY_MS: float = float(os.getenv("ENROLLMENT_BATCH_DELAY_MS", "10"))
+    ENROLLMENT_COUNTER_SHARDS: int = int(os.getenv("ENROLLMENT_COUNTER_SHARDS", "16"))
 
     # Neo4j Configuration
     NEO4J_URI: str = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     NEO4J_USER: str = os.getenv("NEO4J_USER", "neo4j")
     NEO4J_PASSWORD: str = os.getenv("NEO4J_PASSWORD", "neurolynx123")
+    NEO4J_DATABASE: str = os.getenv("NEO4J_DATABASE", "neo4j")
+    GRAPH_LOAD_BATCH_SIZE: int = int(os.getenv("GRAPH_LOAD_BATCH_SIZE", "1000"))
+    GRAPH_LOAD_CONCURRENCY: int = int(os.getenv("GRAPH_LOAD_CONCURRENCY", "4"))
+    GRAPH_SYNC_ENABLED: bool = os.getenv("GRAPH_SYNC_ENABLED", "false").lower() == "true"
+    GRAPH_SYNC_INTERVAL_SECONDS: float = float(os.getenv("GRAPH_SYNC_INTERVAL_SECONDS", "5"))
+    KNOWLEDGE_GRAPH_SOURCE: str = os.getenv("KNOWLEDGE_GRAPH_SOURCE", "json")  # json (demo data) or neo4j
+    KNOWLEDGE_GRAPH_CACHE_SIZE: int = int(os.getenv("KNOWLEDGE_GRAPH_CACHE_SIZE", "4096"))
+    LEARNING_PATH_MASTERY_THRESHOLD: float = float(os.getenv("LEARNING_PATH_MASTERY_THRESHOLD", "0.7"))  # mastery x confidence
+    LEARNING_PATH_MIN_STRENGTH: float = float(os.getenv("LEARNING_PATH_MIN_STRENGTH", "0.3"))
+    LEARNING_PATH_CACHE_SIZE: int = int(os.getenv("LEARNING_PATH_CACHE_SIZE", "10000"))
+    CENTRALITY_SNAPSHOT_PATH: str = os.getenv("CENTRALITY_SNAPSHOT_PATH", "data/graph_centrality.npz")  # empty disables
+    PAGERANK_DAMPING: float = float(os.getenv("PAGERANK_DAMPING", "0.85"))
+    PAGERANK_TOLERANCE: float = float(os.getenv("PAGERANK_TOLERANCE", "1e-8"))
+    BETWEENNESS_SAMPLES: int = int(os.getenv("BETWEENNESS_SAMPLES", "64"))
+    KNOWLEDGE_TRACING_DIR: str = os.getenv("KNOWLEDGE_TRACING_DIR", "data/knowledge_tracing")
+    KNOWLEDGE_TRACING_SNAPSHOT_SECONDS: float = float(os.getenv("KNOWLEDGE_TRACING_SNAPSHOT_SECONDS", "60"))
+    KNOWLEDGE_TRACING_MAX_NEW_USERS: int = int(os.getenv("KNOWLEDGE_TRACING_MAX_NEW_USERS", "100"))  # per answer batch
+    BKT_P_INIT: float = float(os.getenv("BKT_P_INIT", "0.2"))
+    BKT_P_LEARN: float = float(os.getenv("BKT_P_LEARN", "0.1"))
+    BKT_P_SLIP: float = float(os.getenv("BKT_P_SLIP", "0.1"))
+    BKT_P_GUESS: float = float(os.getenv("BKT_P_GUESS", "0.2"))
+
+    # AI Tutor Configuration
+    TUTOR_BACKEND: str = os.getenv("TUTOR_BACKEND", "local")  # local (deterministic stand-in) or ollama
+    OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama2:7b-chat")
+    TUTOR_GENERATOR_TIMEOUT_SECONDS: float = float(os.getenv("TUTOR_GENERATOR_TIMEOUT_SECONDS", "60"))
+    TUTOR_LOCAL_TOKEN_DELAY_MS: float = float(os.getenv("TUTOR_LOCAL_TOKEN_DELAY_MS", "15"))
+    TUTOR_CACHE_SIZE: int = int(os.getenv("TUTOR_CACHE_SIZE", "5000"))
+    TUTOR_CACHE_TTL_SECONDS: float = float(os.getenv("TUTOR_CACHE_TTL_SECONDS", "3600"))
+    CONVERSATION_WINDOW_TURNS: int = int(os.getenv("CONVERSATION_WINDOW_TURNS", "12"))
+    CONVERSATION_SUMMARY_ITEMS: int = int(os.getenv("CONVERSATION_SUMMARY_ITEMS", "8"))
+    CONVERSATION_CACHE_SESSIONS: int = int(os.getenv("CONVERSATION_CACHE_SESSIONS", "10000"))
+    CONVERSATION_BATCH_SIZE: int = int(os.getenv("CONVERSATION_BATCH_SIZE", "500"))
+    CONVERSATION_FLUSH_MS: float = float(os.getenv("CONVERSATION_FLUSH_MS", "200"))
+    TUTOR_MATERIAL_CHUNKS: int = int(os.getenv("TUTOR_MATERIAL_CHUNKS", "3"))  # course passages added to tutor prompts
+    RETRIEVAL_DIR: str = os.getenv("RETRIEVAL_DIR", "data/retrieval")  # empty keeps the index in memory
+    RETRIEVAL_DIM: int = int(os.getenv("RETRIEVAL_DIM", "256"))
+    RETRIEVAL_CHUNK_WORDS: int = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "80"))
+    RETRIEVAL_IVF_MIN_ROWS: int = int(os.getenv("RETRIEVAL_IVF_MIN_ROWS", "20000"))
+    RETRIEVAL_NPROBE: int = int(os.getenv("RETRIEVAL_NPROBE", "8"))
 
     # Redis Configuration
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
@@ -32,10 +83,45 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2"))  # seconds
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_REVOCATION_SYNC_SECONDS: float = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "5"))
 
     # EEG Configuration
     EEG_SAMPLING_RATE: int = int(os.getenv("EEG_SAMPLING_RATE", "250"))
     EEG_BUFFER_SIZE: int = int(os.getenv("EEG_BUFFER_SIZE", "1000"))
+    EEG_TICK_HZ: float = float(os.getenv("EEG_TICK_HZ", "4"))
+    EEG_MAX_LIVE_SESSIONS: int = int(os.getenv("EEG_MAX_LIVE_SESSIONS", "1024"))
+    EEG_FEATURE_WINDOW: int = int(os.getenv("EEG_FEATURE_WINDOW", "120"))  # ticks
+    LEARNING_STATE_MODEL_PATH: str = os.getenv("LEARNING_STATE_MODEL_PATH", "")
+    EEG_STORE_DIR: str = os.getenv("EEG_STORE_DIR", "data/eeg")
+    EEG_STORE_FLUSH_SECONDS: float = float(os.getenv("EEG_STORE_FLUSH_SECONDS", "5"))
+    EEG_RAW_PARTITION_MINUTES: int = int(os.getenv("EEG_RAW_PARTITION_MINUTES", "10"))
+    EEG_RAW_RETENTION_HOURS: float = float(os.getenv("EEG_RAW_RETENTION_HOURS", "24"))
+    EEG_SECOND_RETENTION_DAYS: float = float(os.getenv("EEG_SECOND_RETENTION_DAYS", "30"))
+    EEG_MINUTE_RETENTION_DAYS: float = float(os.getenv("EEG_MINUTE_RETENTION_DAYS", "365"))
+    EEG_COMPACTION_INTERVAL_SECONDS: float = float(os.getenv("EEG_COMPACTION_INTERVAL_SECONDS", "60"))
+    EEG_COMPACTION_IO_MBPS: float = float(os.getenv("EEG_COMPACTION_IO_MBPS", "8"))
+
+    # Demo Data
+    DEMO_DATA_PATH: str = os.getenv("DEMO_DATA_PATH", "demo_data.json")
+
+    # User Stats
+    USER_STATS_FLUSH_SECONDS: float = float(os.getenv("USER_STATS_FLUSH_SECONDS", "5"))
+    USER_STATS_LOG_DIR: str = os.getenv("USER_STATS_LOG_DIR", "data/user_stats")  # empty disables the log
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+    # Search
+    SEARCH_SNAPSHOT_PATH: str = os.getenv("SEARCH_SNAPSHOT_PATH", "")
+
+    # Monitoring
+    LOOP_LAG_INTERVAL_SECONDS: float = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.1"))
+    SLOW_CALLBACK_MS: float = float(os.getenv("SLOW_CALLBACK_MS", "100"))  # 0 disables the detector
+    PROFILER_MAX_SECONDS: float = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+    PROFILER_DEFAULT_HZ: int = int(os.getenv("PROFILER_DEFAULT_HZ", "100"))
 
     # External Services
     KEYCLOAK_SERVER_URL: str = os.getenv("KEYCLOAK_SERVER_URL", "http://localhost:8080")
@@ -46,6 +132,12 @@ class Settings(BaseSettings):
     def database_url(self) -> str:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def async_database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
+        return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,164 @@
+"""
+Database engine and sessions for NeuroLynxEdu AI
+Async SQLAlchemy with a pooled engine and per-request sessions
+"""
+
+import time
+from typing import AsyncIterator, Dict
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.base import Base
+
+# Columns added after the first release: create_all never alters an existing
+# table, and database/init only runs on an empty Postgres volume
+ADDED_COLUMNS = (
+    ("courses", "enrollment_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("user_stats", "metric_samples", "INTEGER DEFAULT 0"),
+    ("user_stats", "log_sequence", "BIGINT DEFAULT 0"),
+    ("learning_sessions", "module_id", "VARCHAR(100)"),
+    ("learning_sessions", "content_type", "VARCHAR(50)"),
+    ("learning_sessions", "duration_minutes", "INTEGER DEFAULT 0"),
+    ("learning_sessions", "avg_attention_level", "FLOAT"),
+    ("learning_sessions", "avg_focus_level", "FLOAT"),
+)
+# Indexes added after the first release, for the same reason
+ADDED_INDEXES = (
+    ("idx_learning_sessions_user_start", "learning_sessions", "user_id, start_time, id"),
+    ("idx_learning_sessions_user_course_start", "learning_sessions", "user_id, course_id, start_time, id"),
+)
+
+
+def build_engine(url: str = settings.async_database_url) -> AsyncEngine:
+    """Create the async engine with pool settings suited to the backend"""
+    parsed = make_url(url)
+    options = {"query_cache_size": 1200}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # In-memory databases live on a single shared connection
+            return create_async_engine(parsed, **options)
+    elif parsed.get_driver_name() == "asyncpg":
+        # Server-side prepared statements are cached per connection
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+
+    return create_async_engine(
+        parsed,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        **options,
+    )
+
+
+class PoolStats:
+    """Checkout counters fed by pool events"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.timeouts = 0
+        self.hold_time_total = 0.0
+        self._checked_out_at: Dict[int, float] = {}
+
+    def attach(self, engine: AsyncEngine):
+        pool = engine.sync_engine.pool
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self._checked_out_at[id(connection_record)] = time.perf_counter()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = self._checked_out_at.pop(id(connection_record), None)
+        if started is not None:
+            self.in_use -= 1
+            self.hold_time_total += time.perf_counter() - started
+
+
+engine = build_engine()
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+pool_stats = PoolStats()
+pool_stats.attach(engine)
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding one session per request"""
+    async with SessionLocal() as session:
+        yield session
+
+
+def add_missing_columns(conn: Connection):
+    """Bring tables created by an older schema up to date with ``ADDED_COLUMNS`` and ``ADDED_INDEXES``"""
+    inspector = inspect(conn)
+    for table, column, ddl in ADDED_COLUMNS:
+        if column not in {c["name"] for c in inspector.get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    for name, table, columns in ADDED_INDEXES:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+async def init_db():
+    """Create missing tables and columns (the Postgres schema also ships in database/init)"""
+    # Import models so every table is registered on the metadata
+    from app import models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+
+
+async def close_db():
+    await engine.dispose()
+
+
+def pool_metrics() -> Dict:
+    """Pool occupancy and saturation"""
+    pool = engine.sync_engine.pool
+    metrics = {
+        "pool_class": type(pool).__name__,
+        "checkouts": pool_stats.checkouts,
+        "in_use": pool_stats.in_use,
+        "peak_in_use": pool_stats.peak_in_use,
+        "timeouts": pool_stats.timeouts,
+        "avg_hold_ms": round(1000 * pool_stats.hold_time_total / max(pool_stats.checkouts - pool_stats.in_use, 1), 3),
+    }
+    if hasattr(pool, "size"):
+        capacity = pool.size() + settings.DB_MAX_OVERFLOW
+        metrics.update({
+            "size": pool.size(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+        })
+    return metrics
+
+
+async def database_unavailable_handler(request: Request, exc: Exception) -> JSONResponse:
+    """Map pool exhaustion and connection failures to 503 instead of a 500"""
+    if isinstance(exc, PoolTimeoutError):
+        pool_stats.timeouts += 1
+        detail = "Database connection pool exhausted"
+    else:
+        detail = "Database unavailable"
+    return JSONResponse(status_code=503, content={"detail": detail})
+
+
+# ProgrammingError covers a schema the code does not match, e.g. a missing column
+DATABASE_ERRORS = (OperationalError, ProgrammingError, PoolTimeoutError, ConnectionError)
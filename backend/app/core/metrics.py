@@ -0,0 +1,260 @@
+"""
+Metrics for NeuroLynxEdu AI
+Per-route request histograms, event-loop lag and service gauges in Prometheus text format
+"""
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Route label of requests no route matched, so stray paths cannot grow the label set
+UNMATCHED = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+GaugeValue = Union[float, Dict[str, float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Bucket counts for one label set; an observation is a bisect and three additions"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum!r}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Request, event-loop and service metrics of this process.
+
+    Everything is recorded from the event loop thread, so counters are
+    plain ints and dicts updated without locks: one coroutine's update
+    always completes before another runs. Service gauges are callbacks read
+    only when ``/metrics`` is scraped, so they cost nothing in between.
+    """
+
+    def __init__(self):
+        self._requests: Dict[Tuple[str, str], Histogram] = {}
+        self._statuses: Dict[Tuple[str, str, int], int] = {}
+        # id(scope) -> scope of requests and WebSocket connections being served;
+        # read at scrape time, when the router has filled in their routes
+        self.active: Dict[int, Dict[str, Any]] = {}
+        self.websockets: Dict[int, Dict[str, Any]] = {}
+        self._gauges: List[Tuple[str, str, str, Optional[str], Callable[[], GaugeValue]]] = []
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.last_loop_lag = 0.0
+        self.max_loop_lag = 0.0
+
+    # Recording
+
+    @staticmethod
+    def route(scope: Dict[str, Any]) -> str:
+        """Path template of the request, e.g. ``/api/v1/users/{user_id}``.
+
+        Rebuilt from the concrete path by putting each path parameter's name
+        back in place of its value, which works whether or not the router
+        records the matched route in the scope.
+        """
+        if "endpoint" not in scope:
+            return UNMATCHED
+        params = scope.get("path_params")
+        if not params:
+            return scope["path"]
+        segments = scope["path"].split("/")
+        end = len(segments)
+        for name, value in reversed(list(params.items())):
+            value = str(value)
+            for i in range(end - 1, 0, -1):
+                if segments[i] == value:
+                    segments[i], end = "{" + name + "}", i
+                    break
+        return "/".join(segments)
+
+    def observe_request(self, scope: Dict[str, Any], status: int, duration: float):
+        method, route = scope["method"], self.route(scope)
+        histogram = self._requests.get((method, route))
+        if histogram is None:
+            histogram = self._requests[(method, route)] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(duration)
+        key = (method, route, status)
+        self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def observe_loop_lag(self, lag: float):
+        self.loop_lag.observe(lag)
+        self.last_loop_lag = lag
+        self.max_loop_lag = max(self.max_loop_lag, lag)
+
+    def add_gauge(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], GaugeValue],
+        label: Optional[str] = None,
+        kind: str = "gauge",
+    ):
+        """Report ``read()`` on every scrape; a dict result is one sample per ``label`` value"""
+        self._gauges.append((name, help_text, kind, label, read))
+
+    # Rendering
+
+    def _by_route(self, scopes: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for scope in list(scopes.values()):
+            route = self.route(scope)
+            counts[route] = counts.get(route, 0) + 1
+        return counts
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP http_request_duration_seconds Time from receiving a request to sending the last of its response",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in list(self._requests.items()):
+            lines.extend(histogram.render("http_request_duration_seconds", (("method", method), ("route", route))))
+        lines += ["# HELP http_requests_total Completed requests", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in list(self._statuses.items()):
+            lines.append(f"http_requests_total{_labels((('method', method), ('route', route), ('status', str(status))))} {count}")
+        lines += ["# HELP http_requests_in_flight Requests being served", "# TYPE http_requests_in_flight gauge"]
+        for route, count in self._by_route(self.active).items():
+            lines.append(f"http_requests_in_flight{_labels((('route', route),))} {count}")
+        lines += ["# HELP websocket_connections Open WebSocket connections", "# TYPE websocket_connections gauge"]
+        for route, count in self._by_route(self.websockets).items():
+            lines.append(f"websocket_connections{_labels((('route', route),))} {count}")
+
+        lines += ["# HELP event_loop_lag_seconds How late the loop ran a timer that was due", "# TYPE event_loop_lag_seconds histogram"]
+        lines.extend(self.loop_lag.render("event_loop_lag_seconds", ()))
+        lines += [
+            "# HELP event_loop_lag_last_seconds Most recent event loop lag sample",
+            "# TYPE event_loop_lag_last_seconds gauge",
+            f"event_loop_lag_last_seconds {self.last_loop_lag!r}",
+            "# HELP event_loop_lag_max_seconds Largest event loop lag since start",
+            "# TYPE event_loop_lag_max_seconds gauge",
+            f"event_loop_lag_max_seconds {self.max_loop_lag!r}",
+        ]
+
+        for name, help_text, kind, label, read in self._gauges:
+            try:
+                value = read()
+            except Exception:
+                logger.exception("Reading metric %s failed", name)
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if isinstance(value, dict):
+                lines.extend(f"{name}{_labels(((label, key),))} {float(v)!r}" for key, v in value.items())
+            else:
+                lines.append(f"{name} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and tracking open WebSockets.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so a request costs two
+    clock reads, a wrapped ``send`` and a few dict operations.
+    """
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        registry = self.registry
+        if scope["type"] == "websocket":
+            registry.websockets[id(scope)] = scope
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                registry.websockets.pop(id(scope), None)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.active[id(scope)] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.active.pop(id(scope), None)
+            registry.observe_request(scope, status, time.perf_counter() - started)
+
+
+class LoopLagMonitor:
+    """Sleeps ``interval`` at a time and records how late each wake-up is.
+
+    A wake-up is late by however long other callbacks held the loop, which
+    is exactly the delay every other timer and socket read saw.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, interval: float = settings.LOOP_LAG_INTERVAL_SECONDS):
+        self.registry = registry or metrics
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.registry.observe_loop_lag(max(loop.time() - expected, 0.0))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global metrics registry and event loop lag monitor
+metrics = MetricsRegistry()
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,227 @@
+"""
+Profiling for NeuroLynxEdu AI
+On-demand stack sampling and detection of callbacks that block the event loop
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Deepest stack kept per sample or stall report
+MAX_DEPTH = 128
+# Innermost frames of a loop thread waiting for I/O: the selector with the
+# standard loop, the frame that started the loop with uvloop
+IDLE_FRAMES = frozenset({
+    ("selectors.py", "select"),
+    ("runners.py", "run"),
+    ("runners.py", "run_until_complete"),
+    ("base_events.py", "run_forever"),
+    ("base_events.py", "run_until_complete"),
+})
+
+
+# Library roots stripped from file names in stacks, most specific first
+_LIBRARY_ROOTS = sorted({sysconfig.get_paths()[name] + os.sep for name in ("purelib", "platlib", "stdlib")}, key=len, reverse=True)
+
+
+def _short_path(filename: str) -> str:
+    for root in _LIBRARY_ROOTS:
+        if filename.startswith(root):
+            return filename[len(root):]
+    return os.path.relpath(filename) if os.path.isabs(filename) else filename
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class StackSampler:
+    """Samples Python stacks from a separate thread and counts them as collapsed stacks.
+
+    The sampler never touches the event loop: it reads the frames of the
+    sampled threads with ``sys._current_frames`` at ``hz`` and adds one
+    line per distinct stack (``outer;...;inner count``), the format
+    flame graph tools read. The loop keeps running throughout; at 100 Hz
+    each sample costs tens of microseconds of one thread's time. Only one
+    profile runs at a time.
+    """
+
+    def __init__(self, max_seconds: float = settings.PROFILER_MAX_SECONDS, max_hz: int = 1000):
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self._lock = threading.Lock()
+        self._labels: Dict[Any, str] = {}
+        self.profiles = 0
+        self.last_samples = 0
+        self.last_overhead = 0.0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _stack(self, frame) -> Optional[str]:
+        labels = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels)) if labels else None
+
+    def sample(
+        self,
+        seconds: float,
+        hz: int = settings.PROFILER_DEFAULT_HZ,
+        thread_ids: Optional[List[int]] = None,
+        include_idle: bool = False,
+    ) -> Counter:
+        """Collapsed stacks of ``thread_ids`` (every thread but this one by default) over ``seconds``.
+
+        Samples of a loop waiting for I/O (see ``IDLE_FRAMES``) are left out
+        unless ``include_idle``.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            seconds = min(max(seconds, 0.0), self.max_seconds)
+            interval = 1.0 / min(max(hz, 1), self.max_hz)
+            own = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks: Counter = Counter()
+            samples, spent = 0, 0.0
+            deadline = time.monotonic() + seconds
+            next_sample = time.monotonic()
+            while next_sample < deadline:
+                started = time.perf_counter()
+                for ident, frame in sys._current_frames().items():
+                    if ident == own or (thread_ids is not None and ident not in thread_ids):
+                        continue
+                    if not include_idle and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                        continue
+                    stack = self._stack(frame)
+                    if stack:
+                        prefix = f"{names.get(ident, ident)};" if thread_ids is None or len(thread_ids) > 1 else ""
+                        stacks[prefix + stack] += 1
+                samples += 1
+                spent += time.perf_counter() - started
+                next_sample += interval
+                time.sleep(max(next_sample - time.monotonic(), 0.0))
+            self.profiles += 1
+            self.last_samples = samples
+            self.last_overhead = spent / seconds if seconds else 0.0
+            return stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def metrics(self) -> Dict:
+        return {
+            "profiles": self.profiles,
+            "running": self._lock.locked(),
+            "last_samples": self.last_samples,
+            "last_sampler_cpu_share": round(self.last_overhead, 5),
+        }
+
+
+class SlowCallbackDetector:
+    """Logs, with its stack, any callback that holds the event loop longer than ``threshold``.
+
+    A heartbeat timer on the loop stamps the time every ``threshold / 4``.
+    A watchdog thread checks the stamp; once the next beat is ``threshold``
+    overdue, the loop is stuck inside one callback, and the loop thread's stack is
+    captured right then, showing what is blocking rather than just which
+    handle it was. When the heartbeat runs again the stall is closed with
+    its full duration. Unlike asyncio debug mode this adds nothing to
+    callbacks that finish in time.
+    """
+
+    def __init__(self, threshold: float = settings.SLOW_CALLBACK_MS / 1000.0, history: int = 50):
+        self.threshold = threshold
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.stalls = 0
+        self.longest = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._beat = 0.0
+        self._open: Optional[Dict[str, Any]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def _overdue(self) -> float:
+        return time.monotonic() - self._beat - self.threshold / 4
+
+    def _heartbeat(self):
+        stall = self._open
+        if stall is not None:
+            overdue = self._overdue()
+            stall["duration_ms"] = round(overdue * 1000, 1)
+            self.longest = max(self.longest, overdue)
+            logger.warning("Event loop was blocked for %.0f ms", stall["duration_ms"])
+            self._open = None
+        self._beat = time.monotonic()
+        self._timer = self._loop.call_later(self.threshold / 4, self._heartbeat)
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 4):
+            if self._open is not None or self._overdue() < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = traceback.format_stack(frame, limit=-MAX_DEPTH) if frame is not None else []
+            if self._overdue() < self.threshold:
+                continue  # the loop moved on while the stack was read
+            stall = {"detected_at": time.time(), "duration_ms": None, "stack": "".join(stack)}
+            self._open = stall
+            self.recent.append(stall)
+            self.stalls += 1
+            logger.warning(
+                "Event loop blocked for over %.0f ms, currently in:\n%s", self.threshold * 1000, stall["stack"]
+            )
+
+    def start(self):
+        """Start watching the running loop"""
+        if self.threshold <= 0 or (self._watchdog is not None and self._watchdog.is_alive()):
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._timer = self._loop.call_later(self.threshold / 4, self._heartbeat)
+        self._watchdog = threading.Thread(target=self._watch, name="slow-callback-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def metrics(self) -> Dict:
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "enabled": self._watchdog is not None,
+            "stalls": self.stalls,
+            "longest_ms": round(self.longest * 1000, 1),
+        }
+
+
+# Global profiler and slow callback detector
+stack_sampler = StackSampler()
+slow_callback_detector = SlowCallbackDetector()
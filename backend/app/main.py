@@ -3,12 +3,45 @@ NeuroLynxEdu AI - Main FastAPI Application
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
 import uvicorn
 
 # Import routers
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.eeg import active_connections
+from app.core.auth import password_hasher, token_revocations
 from app.core.config import settings
+from app.core.database import (
+    DATABASE_ERRORS, SessionLocal, close_db, database_unavailable_handler, init_db, pool_metrics
+)
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, loop_lag_monitor, metrics
+from app.core.profiling import slow_callback_detector
+from app.services.attention_heatmap import attention_heatmaps
+from app.services.change_detection import change_events, change_point_detector
+from app.services.conversation_store import conversation_store
+from app.services.course_catalog import course_catalog
+from app.services.course_retrieval import course_retrieval, init_course_retrieval
+from app.services.course_search import course_search, init_course_search
+from app.services.course_store import DEFAULT_COURSES, fetch_courses, seed_courses
+from app.services.demo_data import load_courses
+from app.services.difficulty_controller import difficulty_controller
+from app.services.eeg_store import eeg_store
+from app.services.enrollment_pipeline import enrollment_queue
+from app.services.graph_centrality import graph_centrality
+from app.services.graph_loader import mastery_sync
+from app.services.knowledge_graph import knowledge_graph
+from app.services.knowledge_tracing import knowledge_tracer
+from app.services.learning_planner import learning_planner
+from app.services.learning_state import learning_state_classifier
+from app.services.live_sessions import DEMO_LIVE_USER_ID, live_session_manager
+from app.services.tutor_chat import tutor_chat
+from app.services.user_stats import user_stats
+from app.services.user_store import ensure_demo_user
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -26,10 +59,123 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so request timings include every other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+for error in DATABASE_ERRORS:
+    app.add_exception_handler(error, database_unavailable_handler)
+
+async def load_catalog_from_database(demo_courses):
+    """Load the database courses, or the demo courses (else the defaults) if it is unreachable.
+
+    Never both: the demo data repeats database courses under string ids
+    that cannot be enrolled in.
+    """
+    try:
+        await init_db()
+        async with SessionLocal() as db:
+            await seed_courses(db)
+            demo_user = await ensure_demo_user(db)
+            user_stats.alias(DEMO_LIVE_USER_ID, demo_user.id)
+            course_catalog.bulk_load(await fetch_courses(db))
+    except (*DATABASE_ERRORS, OSError):
+        logger.warning("Database unavailable, serving the demo or default course list", exc_info=True)
+        course_catalog.bulk_load(demo_courses or DEFAULT_COURSES)
+
+def register_service_metrics():
+    metrics.add_gauge("live_sessions", "Simulated EEG sessions being ticked", lambda: len(live_session_manager.sessions))
+    metrics.add_gauge(
+        "simulator_ticks_total", "Live session ticks run", lambda: live_session_manager.tick_count, kind="counter"
+    )
+    metrics.add_gauge(
+        "simulator_tick_overruns_total", "Ticks that started late because the previous one overran its period",
+        lambda: live_session_manager.tick_overruns, kind="counter",
+    )
+    metrics.add_gauge(
+        "simulator_tick_duration_seconds", "Duration of the last live session tick", lambda: live_session_manager.last_tick_duration
+    )
+    metrics.add_gauge(
+        "websocket_subscribers", "Clients subscribed to each EEG stream",
+        lambda: {"eeg_stream": len(active_connections), "change_events": change_events.subscriber_count}, label="stream",
+    )
+    metrics.add_gauge(
+        "change_event_backlog", "Events waiting in the fullest change event subscriber queue",
+        lambda: max(change_events.queue_depths(), default=0),
+    )
+    metrics.add_gauge(
+        "queue_depth", "Items waiting in background write queues",
+        lambda: {
+            "enrollments": enrollment_queue.metrics()["pending"],
+            "chat_messages": conversation_store.metrics()["pending"],
+            "user_stats": user_stats.metrics()["pending_users"],
+            "eeg_readings": eeg_store.metrics()["buffered_rows"],
+            "mastery_sync": mastery_sync.metrics()["pending"],
+        },
+        label="queue",
+    )
+    metrics.add_gauge("db_connections_in_use", "Database connections checked out", lambda: pool_metrics()["in_use"])
+    metrics.add_gauge(
+        "slow_callbacks_total", f"Callbacks that held the event loop over {settings.SLOW_CALLBACK_MS:g} ms",
+        lambda: slow_callback_detector.stalls, kind="counter",
+    )
+
+register_service_metrics()
+
+@app.on_event("startup")
+async def start_background_services():
+    loop_lag_monitor.start()
+    slow_callback_detector.start()
+    # Training the fallback model takes a few hundred milliseconds of CPU
+    await asyncio.to_thread(learning_state_classifier.load_model)
+    demo_courses = load_courses()
+    await load_catalog_from_database(demo_courses)
+    enrollment_queue.add_listener(lambda added: course_catalog.increment("enrollment_count", added))
+    init_course_search(course_catalog, settings.SEARCH_SNAPSHOT_PATH)
+    init_course_retrieval(course_catalog)
+    attention_heatmaps.register_courses(demo_courses)
+    knowledge_graph.add_listener(graph_centrality.on_graph)
+    await knowledge_graph.reload()
+    await learning_planner.load_demo_masteries()
+    if await knowledge_tracer.restore():
+        learning_planner.load_user_knowledge(knowledge_tracer.user_knowledge())
+    knowledge_tracer.add_listener(learning_planner.set_mastery)
+    if settings.GRAPH_SYNC_ENABLED:
+        learning_planner.add_listener(mastery_sync.record)
+        mastery_sync.start()
+    live_session_manager.add_tick_listener(learning_state_classifier.on_tick)
+    live_session_manager.add_tick_listener(difficulty_controller.on_tick)
+    live_session_manager.add_tick_listener(change_point_detector.on_tick)
+    live_session_manager.add_tick_listener(attention_heatmaps.on_tick)
+    live_session_manager.add_tick_listener(user_stats.on_tick)
+    live_session_manager.add_tick_listener(eeg_store.on_tick)
+    await user_stats.start()
+    eeg_store.start()
+    knowledge_tracer.start()
+    live_session_manager.start()
+    token_revocations.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await live_session_manager.stop()
+    await tutor_chat.stop()
+    await conversation_store.stop()
+    await course_retrieval.stop()
+    await user_stats.stop()
+    await eeg_store.stop()
+    if settings.SEARCH_SNAPSHOT_PATH:
+        course_search.save(settings.SEARCH_SNAPSHOT_PATH)
+    await enrollment_queue.stop()
+    await close_db()
+    password_hasher.shutdown()
+    await token_revocations.stop()
+    await knowledge_tracer.stop()
+    await mastery_sync.stop()
+    await loop_lag_monitor.stop()
+    slow_callback_detector.stop()
+
 @app.get("/")
 async def root():
     return {
@@ -42,6 +188,15 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/db")
+async def database_health():
+    return pool_metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, event loop and service metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
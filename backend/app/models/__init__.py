@@ -1,26 +1,21 @@
-"""
-Database models for NeuroLynxEdu AI
-"""
-
-from .user import User, UserStats
-from .course import Course, CourseContent, Enrollment, Progress
-from .eeg import EEGSession, EEGReading
-from .analytics import LearningSession, FocusMetric
-from .ai_tutor import TutorSession, TutorMessage, KnowledgeNode, LearningPath
-
-__all__ = [
-    "User",
-    "UserStats",
-    "Course",
-    "CourseContent",
-    "Enrollment",
-    "Progress",
-    "EEGSession",
-    "EEGReading",
-    "LearningSession",
-    "FocusMetric",
-    "TutorSession",
-    "TutorMessage",
-    "KnowledgeNode",
-    "LearningPath"
+"""
+Database models for NeuroLynxEdu AI
+"""
+
+from .base import Base
+from .user import User, UserStats
+from .course import Course, Enrollment, EnrollmentCounterShard
+from .session import LearningSession
+from .chat import ChatSession, ChatMessage
+
+__all__ = [
+    "Base",
+    "User",
+    "UserStats",
+    "Course",
+    "Enrollment",
+    "EnrollmentCounterShard",
+    "LearningSession",
+    "ChatSession",
+    "ChatMessage"
 ]
\ No newline at end of file
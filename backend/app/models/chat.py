@@ -0,0 +1,35 @@
+"""
+AI tutor chat models for PostgreSQL
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+from .base import Base
+
+class ChatSession(Base):
+    """A tutor conversation; ``context_data`` holds the rolling summary of turns older than the window"""
+    __tablename__ = "ai_chat_sessions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    session_id = Column(String(100), unique=True, nullable=False)
+    context_data = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChatMessage(Base):
+    """One chat turn; sender is 'user' or 'ai'"""
+    __tablename__ = "ai_chat_messages"
+    __table_args__ = (
+        # Context windows read the newest messages of one session
+        Index("idx_ai_chat_messages_session_id", "session_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String(100), ForeignKey("ai_chat_sessions.session_id", ondelete="CASCADE"), nullable=False)
+    sender = Column(String(10), nullable=False)
+    message = Column(Text, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    # "metadata" is reserved on declarative classes
+    message_metadata = Column("metadata", JSON().with_variant(JSONB, "postgresql"), nullable=True)
@@ -0,0 +1,64 @@
+"""
+Course models for PostgreSQL
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY
+from datetime import datetime
+
+from .base import Base
+
+class Course(Base):
+    __tablename__ = "courses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    difficulty = Column(String(20), default="beginner")
+    estimated_duration = Column(Integer, default=0)  # in minutes
+    thumbnail_url = Column(String(255), nullable=True)
+    rating = Column(Float, default=0.0)
+    enrollment_count = Column(Integer, default=0)
+    tags = Column(JSON().with_variant(ARRAY(String), "postgresql"), default=list)
+    is_active = Column(Boolean, default=True)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, extra_enrollments: int = 0) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description or "",
+            "difficulty": self.difficulty,
+            "estimated_duration": self.estimated_duration,
+            "rating": self.rating or 0.0,
+            "enrollment_count": (self.enrollment_count or 0) + extra_enrollments,
+            "tags": list(self.tags or []),
+        }
+
+class Enrollment(Base):
+    __tablename__ = "course_enrollments"
+    __table_args__ = (UniqueConstraint("user_id", "course_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    progress = Column(Float, default=0.0)
+
+    # Timestamps
+    enrolled_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+class EnrollmentCounterShard(Base):
+    """One of several rows whose sum is a course's enrollments since seeding.
+
+    Writers increment a random shard so concurrent enrollments do not all
+    contend for the course row; readers add the shard sum to
+    ``Course.enrollment_count``.
+    """
+    __tablename__ = "course_enrollment_counters"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,35 @@
+"""
+Learning session models for PostgreSQL
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
+from datetime import datetime
+
+from .base import Base
+
+class LearningSession(Base):
+    """One study session; EEG averages are copied in so history filters need no join"""
+    __tablename__ = "learning_sessions"
+    __table_args__ = (
+        # Keyset pagination walks (start_time, id) within one user
+        Index("idx_learning_sessions_user_start", "user_id", "start_time", "id"),
+        Index("idx_learning_sessions_user_course_start", "user_id", "course_id", "start_time", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=True)
+    eeg_session_id = Column(Integer, nullable=True)
+    module_id = Column(String(100), nullable=True)
+    content_type = Column(String(50), nullable=True)
+
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=True)
+    duration_minutes = Column(Integer, default=0)
+
+    completion_rate = Column(Float, default=0.0)
+    performance_score = Column(Float, nullable=True)
+    ai_interactions = Column(Integer, default=0)
+    avg_attention_level = Column(Float, nullable=True)
+    avg_focus_level = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
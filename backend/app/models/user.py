@@ -1,11 +1,10 @@
 """
 User model for PostgreSQL
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, JSON, Float
 from datetime import datetime
 
-Base = declarative_base()
+from .base import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -46,11 +45,15 @@ class UserStats(Base):
     # Focus and attention metrics
     avg_focus_level = Column(Float, default=0.0)
     avg_attention_level = Column(Float, default=0.0)
+    metric_samples = Column(Integer, default=0)  # readings behind the two averages
     total_ai_sessions = Column(Integer, default=0)
     
     # Performance metrics
     knowledge_mastery_score = Column(Float, default=0.0)
     learning_efficiency = Column(Float, default=0.0)
     
+    # Last write-behind log segment applied (see services/user_stats.py)
+    log_sequence = Column(BigInteger, default=0)
+    
     # Timestamps
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Module Attention Heatmaps for NeuroLynxEdu AI
+Aggregates attention over normalized module time, per course
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.live_sessions import FIELD_INDEX, LiveSessionManager
+
+
+@dataclass
+class CourseHeatmap:
+    """Running attention sums and sample counts for every module of a course"""
+    course_id: str
+    module_ids: List[str]
+    module_titles: List[str]
+    durations: np.ndarray  # seconds per module
+    sums: np.ndarray  # (modules, buckets)
+    counts: np.ndarray  # (modules, buckets)
+    version: int = 0
+    updated_at: Optional[float] = None
+
+
+class AttentionHeatmapStore:
+    """Incrementally maintained module-aligned attention heatmaps.
+
+    Readings are placed into fixed buckets of normalized module time
+    (0-100% of the module's estimated duration). Aggregates are kept as
+    dense per-course arrays, so serving a course heatmap is a single
+    lookup plus one division. They are fed by live sessions only: recorded
+    sessions keep EEG averages, not the readings a heatmap needs.
+    """
+
+    def __init__(self, buckets: int = 20):
+        self.buckets = buckets
+        self.courses: Dict[str, CourseHeatmap] = {}
+        self._modules: Dict[str, Tuple[str, int]] = {}  # module_id -> (course_id, row)
+        self._views: Dict[str, Tuple[int, Dict]] = {}
+
+    def register_courses(self, courses: Iterable[Dict]):
+        """Register courses in the demo course shape (modules with estimated_time)"""
+        for course in courses:
+            modules = sorted(course.get("modules", []), key=lambda m: m.get("order", 0))
+            if not modules:
+                continue
+            course_id = str(course["id"])
+            heatmap = CourseHeatmap(
+                course_id=course_id,
+                module_ids=[m["id"] for m in modules],
+                module_titles=[m.get("title", m["id"]) for m in modules],
+                durations=np.array([max(m.get("estimated_time", 60), 1) * 60.0 for m in modules]),
+                sums=np.zeros((len(modules), self.buckets), dtype=np.float64),
+                counts=np.zeros((len(modules), self.buckets), dtype=np.int64),
+            )
+            existing = self.courses.get(course_id)
+            if existing and existing.module_ids == heatmap.module_ids:
+                continue
+            if existing:
+                # Modules dropped from the course must stop collecting readings
+                for module_id in existing.module_ids:
+                    if self._modules.get(module_id, (None,))[0] == course_id:
+                        del self._modules[module_id]
+                self._views.pop(course_id, None)
+            self.courses[course_id] = heatmap
+            for row, module_id in enumerate(heatmap.module_ids):
+                self._modules[module_id] = (course_id, row)
+
+    def _locate(self, module_id: Optional[str]) -> Optional[Tuple[CourseHeatmap, int]]:
+        entry = self._modules.get(module_id) if module_id else None
+        if entry is None:
+            return None
+        course_id, row = entry
+        return self.courses[course_id], row
+
+    def _accumulate(self, heatmap: CourseHeatmap, rows: np.ndarray, offsets: np.ndarray, values: np.ndarray):
+        progress = offsets / heatmap.durations[rows]
+        inside = (progress >= 0) & (progress < 1)
+        if not inside.any():
+            return
+        buckets = (progress[inside] * self.buckets).astype(np.int64)
+        np.add.at(heatmap.sums, (rows[inside], buckets), values[inside])
+        np.add.at(heatmap.counts, (rows[inside], buckets), 1)
+        heatmap.version += 1
+        heatmap.updated_at = time.time()
+
+    def on_tick(self, manager: LiveSessionManager):
+        """Fold the latest reading of every live session into its module heatmap"""
+        if not manager.sessions:
+            return
+        grouped: Dict[str, Tuple[List[int], List[int], List[float]]] = {}
+        for session in manager.sessions.values():
+            entry = self._modules.get(session.module_id) if session.module_id else None
+            if entry is None or not session.samples:
+                continue
+            course_id, row = entry
+            rows, slots, offsets = grouped.setdefault(course_id, ([], [], []))
+            rows.append(row)
+            slots.append(session.slot)
+            offsets.append((session.samples - 1) / manager.tick_hz)
+
+        for course_id, (rows, slots, offsets) in grouped.items():
+            attention = manager.latest(np.array(slots))[:, FIELD_INDEX["attention"]].astype(np.float64)
+            self._accumulate(self.courses[course_id], np.array(rows), np.array(offsets), attention)
+
+    def get_course_heatmap(self, course_id: str) -> Optional[Dict]:
+        heatmap = self.courses.get(str(course_id))
+        if heatmap is None:
+            return None
+        cached = self._views.get(heatmap.course_id)
+        if cached and cached[0] == heatmap.version:
+            return cached[1]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.round(heatmap.sums / heatmap.counts, 2)
+        view = {
+            "course_id": heatmap.course_id,
+            "buckets": self.buckets,
+            "bucket_start_percent": [round(100 * i / self.buckets, 2) for i in range(self.buckets)],
+            "modules": [
+                {
+                    "module_id": module_id,
+                    "title": heatmap.module_titles[row],
+                    "mean_attention": [None if np.isnan(v) else float(v) for v in means[row]],
+                    "sample_count": heatmap.counts[row].tolist(),
+                }
+                for row, module_id in enumerate(heatmap.module_ids)
+            ],
+            "updated_at": heatmap.updated_at,
+        }
+        self._views[heatmap.course_id] = (heatmap.version, view)
+        return view
+
+
+# Global heatmap store
+attention_heatmaps = AttentionHeatmapStore()
@@ -0,0 +1,239 @@
+"""
+Online Change-Point Detection for NeuroLynxEdu AI
+Streams distraction, recovery and fatigue events for every live session
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Set
+
+import numpy as np
+
+from app.services.live_sessions import FIELD_INDEX, LiveSessionManager, live_session_manager
+
+DISTRACTION_ONSET = "distraction_onset"
+RECOVERY = "recovery"
+FATIGUE_ONSET = "fatigue_onset"
+
+
+@dataclass
+class ChangePointEvent:
+    """A detected change in a live session's attention or focus"""
+    type: str
+    session_id: str
+    user_id: str
+    timestamp: float
+    metric: str
+    value: float
+    baseline: float
+    statistic: float
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class EventChannel:
+    """In-process publish/subscribe channel with bounded subscriber queues.
+
+    Publishing never blocks the tick: a slow subscriber loses its oldest
+    events instead of holding up detection for everyone else.
+    """
+
+    def __init__(self, queue_size: int = 256, history_size: int = 500):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.recent: Deque[ChangePointEvent] = deque(maxlen=history_size)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: ChangePointEvent):
+        self.recent.append(event)
+        self.published += 1
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def queue_depths(self) -> List[int]:
+        return [queue.qsize() for queue in self._subscribers]
+
+
+class ChangePointDetector:
+    """Vectorized CUSUM and Page-Hinkley detectors over all live sessions.
+
+    Attention is standardized against each session's own warm-up baseline.
+    A one-sided CUSUM flags sustained drops (distraction onset) and, while
+    distracted, a second CUSUM flags the return to baseline (recovery). A
+    Page-Hinkley test on focus catches the slow downward drift of fatigue.
+    """
+
+    def __init__(
+        self,
+        manager: LiveSessionManager,
+        channel: EventChannel,
+        warmup_ticks: int = 20,
+        cusum_k: float = 0.5,
+        cusum_h: float = 5.0,
+        recovery_h: float = 4.0,
+        baseline_alpha: float = 0.01,
+        ph_delta: float = 0.1,
+        ph_lambda: float = 40.0,
+    ):
+        self.manager = manager
+        self.channel = channel
+        self.warmup_ticks = warmup_ticks
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.recovery_h = recovery_h
+        self.baseline_alpha = baseline_alpha
+        self.ph_delta = ph_delta
+        self.ph_lambda = ph_lambda
+
+        capacity = manager.capacity
+        self.generations = np.zeros(capacity, dtype=np.int64)
+        self.n = np.zeros(capacity, dtype=np.int64)
+        # Attention baseline (Welford during warm-up, slow EWMA afterwards)
+        self.att_mean = np.zeros(capacity, dtype=np.float64)
+        self.att_m2 = np.zeros(capacity, dtype=np.float64)
+        self.att_std = np.ones(capacity, dtype=np.float64)
+        self.s_down = np.zeros(capacity, dtype=np.float64)
+        self.s_up = np.zeros(capacity, dtype=np.float64)
+        self.distracted = np.zeros(capacity, dtype=bool)
+        # Page-Hinkley state on standardized focus
+        self.foc_mean = np.zeros(capacity, dtype=np.float64)
+        self.foc_m2 = np.zeros(capacity, dtype=np.float64)
+        self.foc_std = np.ones(capacity, dtype=np.float64)
+        self.ph_sum = np.zeros(capacity, dtype=np.float64)
+        self.ph_max = np.zeros(capacity, dtype=np.float64)
+        self.fatigued = np.zeros(capacity, dtype=bool)
+
+        self.last_update_seconds = 0.0
+
+    def _reset(self, slots: np.ndarray):
+        for arr in (self.n, self.att_mean, self.att_m2, self.s_down, self.s_up,
+                    self.foc_mean, self.foc_m2, self.ph_sum, self.ph_max):
+            arr[slots] = 0
+        self.att_std[slots] = 1.0
+        self.foc_std[slots] = 1.0
+        self.distracted[slots] = False
+        self.fatigued[slots] = False
+
+    def on_tick(self, manager: LiveSessionManager):
+        sessions, slots = manager.active()
+        if not sessions:
+            return
+        started = time.perf_counter()
+
+        reused = manager.generations[slots] != self.generations[slots]
+        if reused.any():
+            self._reset(slots[reused])
+            self.generations[slots[reused]] = manager.generations[slots[reused]]
+
+        latest = manager.latest(slots).astype(np.float64)
+        attention = latest[:, FIELD_INDEX["attention"]]
+        focus = latest[:, FIELD_INDEX["focus"]]
+
+        self.n[slots] += 1
+        n = self.n[slots]
+        warming = n <= self.warmup_ticks
+
+        # Warm-up: Welford estimates of each session's own baseline
+        if warming.any():
+            w = slots[warming]
+            for x, mean, m2, std in ((attention[warming], self.att_mean, self.att_m2, self.att_std),
+                                     (focus[warming], self.foc_mean, self.foc_m2, self.foc_std)):
+                delta = x - mean[w]
+                mean[w] += delta / n[warming]
+                m2[w] += delta * (x - mean[w])
+                std[w] = np.sqrt(np.maximum(m2[w] / np.maximum(n[warming] - 1, 1), 1.0))
+
+        live = ~warming
+        if not live.any():
+            self.last_update_seconds = time.perf_counter() - started
+            return
+        s = slots[live]
+        att = attention[live]
+        z = (att - self.att_mean[s]) / self.att_std[s]
+        distracted = self.distracted[s]
+
+        # Distraction onset: sustained drop below the personal baseline
+        self.s_down[s] = np.where(distracted, 0.0, np.maximum(0.0, self.s_down[s] - z - self.cusum_k))
+        onset = ~distracted & (self.s_down[s] > self.cusum_h)
+
+        # Recovery: sustained return to within k of the baseline
+        self.s_up[s] = np.where(distracted, np.maximum(0.0, self.s_up[s] + z + self.cusum_k), 0.0)
+        recovered = distracted & (self.s_up[s] > self.recovery_h)
+
+        # Baseline only follows attention while the learner is not distracted
+        steady = ~distracted & ~onset
+        self.att_mean[s[steady]] += self.baseline_alpha * (att[steady] - self.att_mean[s[steady]])
+
+        # Fatigue onset: Page-Hinkley test for a downward drift in focus
+        zf = (focus[live] - self.foc_mean[s]) / self.foc_std[s]
+        self.ph_sum[s] += zf + self.ph_delta
+        self.ph_max[s] = np.maximum(self.ph_max[s], self.ph_sum[s])
+        ph_stat = self.ph_max[s] - self.ph_sum[s]
+        fatigue = ~self.fatigued[s] & (ph_stat > self.ph_lambda)
+
+        onset_stat = self.s_down[s].copy()
+        recovery_stat = self.s_up[s].copy()
+        self.distracted[s[onset]] = True
+        self.distracted[s[recovered]] = False
+        self.s_down[s[onset]] = 0.0
+        self.s_up[s[recovered]] = 0.0
+        self.fatigued[s[fatigue]] = True
+
+        self.last_update_seconds = time.perf_counter() - started
+
+        if onset.any() or recovered.any() or fatigue.any():
+            now = time.time()
+            live_sessions = [session for session, ok in zip(sessions, live) if ok]
+            for i in np.flatnonzero(onset):
+                self._emit(DISTRACTION_ONSET, live_sessions[i], now, "attention",
+                           att[i], self.att_mean[s[i]], onset_stat[i])
+            for i in np.flatnonzero(recovered):
+                self._emit(RECOVERY, live_sessions[i], now, "attention",
+                           att[i], self.att_mean[s[i]], recovery_stat[i])
+            for i in np.flatnonzero(fatigue):
+                self._emit(FATIGUE_ONSET, live_sessions[i], now, "focus",
+                           focus[live][i], self.foc_mean[s[i]], ph_stat[i])
+
+    def _emit(self, event_type: str, session, now: float, metric: str,
+              value: float, baseline: float, statistic: float):
+        self.channel.publish(ChangePointEvent(
+            type=event_type,
+            session_id=session.session_id,
+            user_id=session.user_id,
+            timestamp=now,
+            metric=metric,
+            value=round(float(value), 2),
+            baseline=round(float(baseline), 2),
+            statistic=round(float(statistic), 2),
+        ))
+
+    def session_state(self, slot: int) -> Dict:
+        return {
+            "distracted": bool(self.distracted[slot]),
+            "fatigued": bool(self.fatigued[slot]),
+            "attention_baseline": round(float(self.att_mean[slot]), 2),
+        }
+
+
+# Global change-point event channel and detector
+change_events = EventChannel()
+change_point_detector = ChangePointDetector(live_session_manager, change_events)
@@ -0,0 +1,315 @@
+"""
+Conversation Store for NeuroLynxEdu AI
+Tutor chat history with batched writes and cached per-session context windows
+"""
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert as bulk_insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.chat import ChatMessage, ChatSession
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+AI = "ai"
+# Longest summary line kept for a turn that left the window
+SUMMARY_LINE_CHARS = 120
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_SENTENCE = re.compile(r"(?<=[.?!])\s")
+
+
+def _gist(message: str) -> str:
+    first = _SENTENCE.split(message.strip(), 1)[0]
+    return first if len(first) <= SUMMARY_LINE_CHARS else first[:SUMMARY_LINE_CHARS - 3] + "..."
+
+
+class ContextWindow:
+    """The last ``turns`` messages of a session plus a bounded summary of older ones.
+
+    A message pushed out of the window leaves one short line behind (the
+    first sentence of what the student asked), and only the newest
+    ``summary_items`` lines are kept, so the window's size is fixed however
+    long the conversation gets.
+    """
+
+    def __init__(self, turns: int, summary_items: int, context_data: Optional[Dict[str, Any]] = None):
+        context_data = context_data or {}
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=turns)
+        self.summary: Deque[str] = deque(context_data.get("summary", []), maxlen=summary_items)
+        self.summarized = context_data.get("summarized", 0)
+        self.total = context_data.get("total", 0)
+
+    def add(self, message: Dict[str, Any]):
+        if len(self.turns) == self.turns.maxlen:
+            dropped = self.turns[0]
+            self.summarized += 1
+            if dropped["sender"] == USER:
+                self.summary.append(_gist(dropped["message"]))
+        self.turns.append(message)
+        self.total += 1
+
+    def state(self) -> Dict[str, Any]:
+        """What is persisted in ``ai_chat_sessions.context_data``"""
+        return {"summary": list(self.summary), "summarized": self.summarized, "total": self.total}
+
+    def assemble(self, session_id: str) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
+            "summary": list(self.summary),
+            "summarized_messages": self.summarized,
+            "total_messages": self.total,
+            "turns": [
+                {"sender": m["sender"], "message": m["message"], "timestamp": m["timestamp"].isoformat()}
+                for m in self.turns
+            ],
+        }
+
+
+class ConversationStore:
+    """Appends chat messages and serves tutor context without re-reading history.
+
+    Messages go into the session's in-memory window at once and into a
+    queue written every ``flush_interval`` seconds, or as soon as
+    ``batch_size`` are waiting: one session upsert (carrying the window's
+    summary) and one multi-row message insert per flush. Windows of the
+    ``cache_sessions`` most recently used sessions are kept; an evicted or
+    unseen session is rebuilt from its stored summary and newest ``turns``
+    messages, plus any of its messages still queued.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = SessionLocal,
+        turns: int = settings.CONVERSATION_WINDOW_TURNS,
+        summary_items: int = settings.CONVERSATION_SUMMARY_ITEMS,
+        cache_sessions: int = settings.CONVERSATION_CACHE_SESSIONS,
+        batch_size: int = settings.CONVERSATION_BATCH_SIZE,
+        flush_interval: float = settings.CONVERSATION_FLUSH_MS / 1000.0,
+    ):
+        self.session_factory = session_factory
+        self.turns = turns
+        self.summary_items = summary_items
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._windows = LRUCache(cache_sessions)
+        self._pending: List[Dict[str, Any]] = []
+        # session_id -> {"user_id", "context_data"} to upsert on the next flush
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        # Held while flushing and while rebuilding a window, so a rebuild never
+        # misses messages that are between the queue and the database
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.appended = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.window_loads = 0
+        self.last_flush_duration = 0.0
+
+    # Windows
+
+    async def _window(self, session_id: str) -> ContextWindow:
+        window = self._windows.get(session_id)
+        if window is None:
+            async with self._lock:
+                window = self._windows.get(session_id)
+                if window is None:
+                    window = await self._load(session_id)
+                    self._windows.set(session_id, window)
+        return window
+
+    async def _load(self, session_id: str) -> ContextWindow:
+        queued = [m for m in self._pending if m["session_id"] == session_id]
+        if session_id in self._sessions:
+            # Queued state is newer than the database and already covers queued messages
+            context_data = self._sessions[session_id]["context_data"]
+            stored: List[Any] = []
+            if len(queued) < self.turns:
+                async with self.session_factory() as db:
+                    stored = await self._newest(db, session_id, self.turns - len(queued))
+        else:
+            async with self.session_factory() as db:
+                context_data = await db.scalar(select(ChatSession.context_data).where(ChatSession.session_id == session_id))
+                stored = await self._newest(db, session_id, self.turns)
+        window = ContextWindow(self.turns, self.summary_items, context_data)
+        window.turns.extend(
+            [{"sender": m.sender, "message": m.message, "timestamp": m.timestamp} for m in stored] + queued
+        )
+        self.window_loads += 1
+        return window
+
+    @staticmethod
+    async def _newest(db: AsyncSession, session_id: str, limit: int) -> List[ChatMessage]:
+        rows = await db.scalars(
+            select(ChatMessage).where(ChatMessage.session_id == session_id).order_by(ChatMessage.id.desc()).limit(limit)
+        )
+        return list(rows)[::-1]
+
+    def create(self, user_id: Optional[int] = None) -> str:
+        """Start a session; it is stored with its first flush"""
+        session_id = uuid.uuid4().hex
+        window = ContextWindow(self.turns, self.summary_items)
+        self._windows.set(session_id, window)
+        self._sessions[session_id] = {"user_id": user_id, "context_data": window.state()}
+        self._ensure_worker()
+        return session_id
+
+    async def append(
+        self,
+        session_id: str,
+        sender: str,
+        message: str,
+        user_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Add a message to the session (created if new); it is written on a later flush"""
+        window = await self._window(session_id)
+        entry = {"session_id": session_id, "sender": sender, "message": message, "timestamp": datetime.utcnow(), "metadata": metadata}
+        window.add(entry)
+        self._pending.append(entry)
+        session = self._sessions.setdefault(session_id, {"user_id": None})
+        if user_id is not None:
+            session["user_id"] = user_id
+        session["context_data"] = window.state()
+        self.appended += 1
+        self._ensure_worker()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return entry
+
+    async def context(self, session_id: str) -> Dict[str, Any]:
+        """Summary plus the last turns, assembled from the cached window"""
+        return (await self._window(session_id)).assemble(session_id)
+
+    async def history(self, session_id: str, before_id: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Stored messages, newest first, paged by message id"""
+        await self.flush()
+        async with self.session_factory() as db:
+            stmt = select(ChatMessage).where(ChatMessage.session_id == session_id)
+            if before_id is not None:
+                stmt = stmt.where(ChatMessage.id < before_id)
+            rows = await db.scalars(stmt.order_by(ChatMessage.id.desc()).limit(limit))
+            return [
+                {"id": m.id, "sender": m.sender, "message": m.message, "timestamp": m.timestamp.isoformat(), "metadata": m.message_metadata}
+                for m in rows
+            ]
+
+    # Batched writer
+
+    async def flush(self):
+        async with self._lock:
+            if not self._sessions:
+                return
+            started = time.perf_counter()
+            messages, sessions = self._pending, self._sessions
+            self._pending, self._sessions = [], {}
+            try:
+                async with self.session_factory() as db:
+                    await self._write(db, messages, sessions)
+            except asyncio.CancelledError:
+                self._requeue(messages, sessions)
+                raise
+            except Exception:
+                self._requeue(messages, sessions)
+                self.failures += 1
+                logger.exception("Conversation flush of %d messages failed", len(messages))
+                return
+            self.written += len(messages)
+            self.flushes += 1
+            self.last_flush_duration = time.perf_counter() - started
+
+    def _requeue(self, messages: List[Dict[str, Any]], sessions: Dict[str, Dict[str, Any]]):
+        # Back in front of anything queued meanwhile; session state set meanwhile is newer
+        self._pending = messages + self._pending
+        for session_id, session in sessions.items():
+            self._sessions.setdefault(session_id, session)
+
+    async def _write(self, db: AsyncSession, messages: List[Dict[str, Any]], sessions: Dict[str, Dict[str, Any]]):
+        insert = _INSERTS[db.get_bind().dialect.name]
+        user_ids = {s["user_id"] for s in sessions.values() if s["user_id"] is not None}
+        known_users = set(await db.scalars(select(User.id).where(User.id.in_(user_ids)))) if user_ids else set()
+        now = datetime.utcnow()
+        stmt = insert(ChatSession).values([
+            {
+                "session_id": session_id,
+                "user_id": session["user_id"] if session["user_id"] in known_users else None,
+                "context_data": session["context_data"],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for session_id, session in sessions.items()
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["session_id"],
+            set_={"context_data": stmt.excluded.context_data, "updated_at": stmt.excluded.updated_at},
+        ))
+        if messages:
+            await db.execute(bulk_insert(ChatMessage), [
+                {
+                    "session_id": m["session_id"],
+                    "sender": m["sender"],
+                    "message": m["message"],
+                    "timestamp": m["timestamp"],
+                    "message_metadata": m["metadata"],
+                }
+                for m in messages
+            ])
+        await db.commit()
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def stop(self):
+        """Write what is queued and stop the writer"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> Dict:
+        return {
+            "appended": self.appended,
+            "written": self.written,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "cached_windows": len(self._windows),
+            "window_loads": self.window_loads,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 3),
+        }
+
+
+# Global conversation store
+conversation_store = ConversationStore()
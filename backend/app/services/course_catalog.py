@@ -0,0 +1,238 @@
+"""
+Course Catalog Service for NeuroLynxEdu AI
+Indexed in-memory catalog with filtering and keyset pagination
+"""
+
+import base64
+import bisect
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+SORT_FIELDS = ("rating", "enrollment_count", "title", "id")
+
+# Fields left out of list responses; modules can run into the thousands
+DETAIL_ONLY_FIELDS = ("modules",)
+
+
+def encode_cursor(sort: str, sort_value: Any, course_key: str) -> str:
+    raw = json.dumps([sort, sort_value, course_key]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, str]:
+    """Position a cursor points after; it must have been issued for the same sort field"""
+    try:
+        field, sort_value, course_key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if field != sort:
+        raise ValueError("Cursor was issued for a different sort field")
+    if not isinstance(course_key, str):
+        raise ValueError("Invalid cursor")
+    if sort in ("id", "title"):
+        if not isinstance(sort_value, str):
+            raise ValueError("Invalid cursor")
+    elif isinstance(sort_value, bool) or not isinstance(sort_value, (int, float)):
+        raise ValueError("Invalid cursor")
+    else:
+        sort_value = float(sort_value)
+    return sort_value, course_key
+
+
+class CourseCatalog:
+    """Course records with a primary-key index and secondary indexes.
+
+    Difficulty and tag indexes are hash sets; rating, enrollment count and
+    title are kept as sorted ``(value, key)`` lists. A filtered query walks
+    the sorted list for the requested order starting from the cursor
+    position, so each page costs a binary search plus the rows it scans
+    rather than a sort of the whole catalog.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._by_difficulty: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._sorted: Dict[str, List[Tuple[Any, str]]] = {field: [] for field in SORT_FIELDS}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    @staticmethod
+    def _sort_value(course: Dict[str, Any], field: str) -> Any:
+        if field == "id":
+            return str(course["id"])
+        if field == "title":
+            return course.get("title", "").lower()
+        return float(course.get(field) or 0)
+
+    @staticmethod
+    def _normalize(course: Dict[str, Any]) -> Dict[str, Any]:
+        """Accept both the API course shape and the demo data course shape"""
+        record = dict(course)
+        record["difficulty"] = str(course.get("difficulty") or course.get("level") or "beginner").lower()
+        tags = course.get("tags")
+        if tags is None:
+            tags = [course["category"]] if course.get("category") else []
+        record["tags"] = list(tags)
+        record.setdefault("rating", 0.0)
+        record.setdefault("enrollment_count", 0)
+        return record
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Register a callback receiving ("upsert" | "remove", course) on every change"""
+        self._listeners.append(listener)
+
+    def _notify(self, change: str, record: Dict[str, Any]):
+        for listener in self._listeners:
+            listener(change, record)
+
+    # Writes
+
+    def upsert(self, course: Dict[str, Any]) -> Dict[str, Any]:
+        record = self._normalize(course)
+        key = str(record["id"])
+        if key in self._by_key:
+            self._unindex(key)
+        self._by_key[key] = record
+        self._by_difficulty.setdefault(record["difficulty"], set()).add(key)
+        for tag in record["tags"]:
+            self._by_tag.setdefault(tag.lower(), set()).add(key)
+        for field, entries in self._sorted.items():
+            bisect.insort(entries, (self._sort_value(record, field), key))
+        self._notify("upsert", record)
+        return record
+
+    def bulk_load(self, courses: Iterable[Dict[str, Any]]):
+        for course in courses:
+            self.upsert(course)
+
+    def increment(self, field: str, deltas: Dict[Any, float]):
+        """Add to a numeric field in place; counters are not content, so listeners are not notified"""
+        entries = self._sorted.get(field)
+        for course_id, delta in deltas.items():
+            key = str(course_id)
+            record = self._by_key.get(key)
+            if record is None:
+                continue
+            if entries is not None:
+                idx = bisect.bisect_left(entries, (self._sort_value(record, field), key))
+                del entries[idx]
+            record[field] = (record.get(field) or 0) + delta
+            if entries is not None:
+                bisect.insort(entries, (self._sort_value(record, field), key))
+
+    def remove(self, course_id: Any) -> bool:
+        key = str(course_id)
+        if key not in self._by_key:
+            return False
+        self._unindex(key)
+        self._notify("remove", self._by_key.pop(key))
+        return True
+
+    def _unindex(self, key: str):
+        record = self._by_key[key]
+        self._discard(self._by_difficulty, record["difficulty"], key)
+        for tag in record["tags"]:
+            self._discard(self._by_tag, tag.lower(), key)
+        for field, entries in self._sorted.items():
+            entry = (self._sort_value(record, field), key)
+            idx = bisect.bisect_left(entries, entry)
+            if idx < len(entries) and entries[idx] == entry:
+                del entries[idx]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], value: str, key: str):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+    # Reads
+
+    def get(self, course_id: Any) -> Optional[Dict[str, Any]]:
+        return self._by_key.get(str(course_id))
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._by_key.values())
+
+    def _candidates(self, difficulty: Optional[str], tags: Optional[List[str]]) -> Optional[Set[str]]:
+        """Intersect secondary indexes, smallest first; None means no set filter"""
+        sets = []
+        if difficulty:
+            sets.append(self._by_difficulty.get(difficulty.lower(), set()))
+        for tag in tags or []:
+            sets.append(self._by_tag.get(tag.lower(), set()))
+        if not sets:
+            return None
+        if len(sets) == 1:
+            return sets[0]
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def query(
+        self,
+        difficulty: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        sort: str = "rating",
+        descending: bool = True,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Filter, sort and page through the catalog"""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort}', expected one of {', '.join(SORT_FIELDS)}")
+        candidates = self._candidates(difficulty, tags)
+        entries = self._sorted[sort]
+        if candidates is not None and len(candidates) * 8 < len(entries):
+            # Selective filters: sorting the few matches beats skipping through the index
+            entries = sorted((self._sort_value(self._by_key[key], sort), key) for key in candidates)
+            candidates = None
+
+        if cursor:
+            position = decode_cursor(cursor, sort)
+            if descending:
+                idx = bisect.bisect_left(entries, position) - 1
+            else:
+                idx = bisect.bisect_right(entries, position)
+        else:
+            idx = len(entries) - 1 if descending else 0
+        rating_range = min_rating is not None and sort == "rating"
+        if rating_range and not descending:
+            idx = max(idx, bisect.bisect_left(entries, (float(min_rating), "")))
+        step = -1 if descending else 1
+
+        items: List[Dict[str, Any]] = []
+        last: Optional[Tuple[Any, str]] = None
+        while 0 <= idx < len(entries) and len(items) < limit:
+            value, key = entries[idx]
+            if rating_range and value < min_rating:
+                break  # the rest of a descending rating scan is below the floor
+            idx += step
+            if candidates is not None and key not in candidates:
+                continue
+            record = self._by_key[key]
+            if min_rating is not None and float(record.get("rating") or 0) < min_rating:
+                continue
+            items.append(record)
+            last = (value, key)
+
+        has_more = last is not None and len(items) == limit and 0 <= idx < len(entries)
+        return {
+            "items": [self.summary(record) for record in items],
+            "next_cursor": encode_cursor(sort, *last) if has_more else None,
+        }
+
+    @staticmethod
+    def summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {k: v for k, v in record.items() if k not in DETAIL_ONLY_FIELDS}
+        if "modules" in record:
+            summary["module_count"] = len(record["modules"])
+        return summary
+
+
+# Global course catalog
+course_catalog = CourseCatalog()
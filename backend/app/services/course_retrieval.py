@@ -0,0 +1,858 @@
+"""
+Course Retrieval for NeuroLynxEdu AI
+Hashed n-gram embeddings of course material with exact and IVF vector search
+"""
+
+import argparse
+import asyncio
+import functools
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import zlib
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.course_search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words of how a question is asked rather than what it is about
+QUESTION_WORDS = frozenset(
+    "about can could did do does explain how i me my please tell that this what when where which who why you your".split()
+)
+# lists[] value of a row that has not been assigned to an IVF list, and of a removed row
+UNASSIGNED = -1
+REMOVED = -2
+# Rows scored per matrix product in an exact search
+BLOCK_ROWS = 65536
+# Files rewritten per generation by compaction; generation 0 uses these names as they are
+DATA_FILES = ("vectors.f32", "lists.i32", "chunks.jsonl")
+
+
+class HashedNgramEmbedder:
+    """Feature-hashing text embedder; no model or vocabulary to load.
+
+    Word unigrams and bigrams, and character trigrams of each word with
+    boundary marks, are hashed with crc32 into ``dim`` signed buckets and
+    weighted by sublinear term frequency. Stopwords and question words
+    ("how", "explain") are left out, as they say nothing about the topic. Vectors are L2-normalised, so the
+    inner product of two embeddings is their cosine similarity. Trigrams
+    let "regression" match "regressions" and typos that share most of a
+    word.
+    """
+
+    def __init__(self, dim: int = settings.RETRIEVAL_DIM, char_weight: float = 0.5):
+        self.dim = dim
+        self.char_weight = char_weight
+        self._bucket = functools.lru_cache(maxsize=1 << 18)(self._hash)
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        h = zlib.crc32(feature.encode())
+        return (h & 0x7FFFFFFF) % self.dim, 1.0 if h >> 31 else -1.0
+
+    def features(self, text: str) -> Counter:
+        words = [word for word in tokenize(text) if word not in QUESTION_WORDS]
+        counts = Counter(words)
+        counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            marked = f"<{word}>"
+            counts.update(f"#{marked[i:i + 3]}" for i in range(len(marked) - 2))
+        return counts
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = self.features(text)
+            if not counts:
+                continue
+            buckets = np.empty(len(counts), dtype=np.int64)
+            weights = np.empty(len(counts))
+            for i, (feature, count) in enumerate(counts.items()):
+                bucket, sign = self._bucket(feature)
+                scale = self.char_weight if feature[0] == "#" else 1.0
+                buckets[i], weights[i] = bucket, sign * scale * (1.0 + math.log(count))
+            vector = np.bincount(buckets, weights=weights, minlength=self.dim)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                out[row] = vector / norm
+        return out
+
+
+def chunk_text(text: str, words: int = 80, overlap: int = 20) -> List[str]:
+    """Overlapping windows of ``words`` words; short text is one chunk"""
+    tokens = text.split()
+    if len(tokens) <= words:
+        return [" ".join(tokens)] if tokens else []
+    step = max(words - overlap, 1)
+    return [" ".join(tokens[start:start + words]) for start in range(0, len(tokens) - overlap, step)]
+
+
+def course_chunks(course: Dict[str, Any], words: int = 80, overlap: int = 20) -> List[Tuple[str, Dict[str, Any]]]:
+    """Retrievable passages of a course: an overview, then each module's title, description, topics and content.
+
+    Returns ``(key, record)`` pairs; the record carries the chunk text.
+    """
+    course_id = str(course["id"])
+    title = course.get("title", "")
+    overview = " ".join(filter(None, [
+        f"{title}.",
+        course.get("description", ""),
+        " ".join(course.get("learning_objectives", [])),
+    ]))
+    sections = [(None, title, overview)]
+    for module in course.get("modules", []):
+        text = " ".join(filter(None, [
+            f"{title}: {module.get('title', '')}.",
+            module.get("description", ""),
+            f"Topics: {', '.join(module['topics'])}." if module.get("topics") else "",
+            module.get("content", ""),
+        ]))
+        sections.append((module["id"], module.get("title", ""), text))
+
+    chunks = []
+    for module_id, section_title, text in sections:
+        for i, chunk in enumerate(chunk_text(text, words, overlap)):
+            chunks.append((f"{course_id}:{module_id or ''}:{i}", {
+                "course_id": course["id"],
+                "module_id": module_id,
+                "title": section_title,
+                "text": chunk,
+            }))
+    return chunks
+
+
+def _digest(record: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(record, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def _map(path: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+    """Map ``path`` read-write, extending the file to ``shape`` if it is shorter"""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+class VectorIndex:
+    """Unit vectors in one contiguous float32 matrix, searched exactly or through an IVF index.
+
+    Rows are only ever appended; removing or replacing a key tombstones its
+    row (``lists[row] == REMOVED``) until the next compaction. Exact search
+    scores blocks of ``BLOCK_ROWS`` rows per matrix product and keeps a
+    running top-k. Once trained, the IVF index (k-means centroids, with
+    rows grouped per list in a CSR block) scores only the ``nprobe``
+    lists nearest each query; rows added since the CSR block was built are
+    assigned a list at once and searched from a small delta.
+
+    With a ``directory`` the matrix and list assignments are memory-mapped
+    files written in place, and each row's record is appended to
+    ``chunks.jsonl``. Records are read back from the log by offset when a
+    result needs them, so only keys and course ids are held in memory.
+    ``index.json`` names the committed row count; rows past it are
+    ignored on open, so a crash loses at most the last unflushed rows.
+    Compaction writes the surviving rows to a new generation of files
+    and switches ``index.json`` to it last, so a crash part way through
+    leaves the previous generation intact.
+    """
+
+    def __init__(self, dim: int, directory: str = "", nprobe: int = settings.RETRIEVAL_NPROBE):
+        self.dim = dim
+        self.directory = directory
+        self.nprobe = nprobe
+        self.count = 0
+        self.live = 0
+        self.key_to_row: Dict[str, int] = {}
+        self.keys: List[Optional[str]] = []
+        self._groups: Dict[str, int] = {}
+        self.group = np.zeros(0, dtype=np.int32)  # course code per row
+        self.offsets = np.zeros(0, dtype=np.int64)  # chunks.jsonl offset per row
+        self._records: List[Optional[Dict[str, Any]]] = []  # in-memory mode only
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.lists = np.zeros(0, dtype=np.int32)
+        # (centroids, list offsets, members): swapped in as one value
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self.trained_rows = 0
+        self._centroids_changed = False
+        self._delta: List[int] = []
+        self._generation = 0
+        self._log = None
+        self._reader = None
+
+    # Storage
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _data_path(self, name: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        if generation:
+            stem, ext = os.path.splitext(name)
+            name = f"{stem}.{generation}{ext}"
+        return self._path(name)
+
+    def _data_files(self) -> List[str]:
+        """Data files of every generation on disk"""
+        paths = []
+        for name in DATA_FILES:
+            stem, ext = os.path.splitext(name)
+            paths.extend(glob.glob(self._path(f"{stem}*{ext}")))
+        return paths
+
+    def _drop_stale(self):
+        """Remove data files of other generations, left by a compaction or a crash during one"""
+        current = {self._data_path(name) for name in DATA_FILES}
+        for path in self._data_files():
+            if path not in current:
+                os.remove(path)
+
+    def close(self):
+        """Close the log handles; they are reopened on the next use"""
+        for handle in (self._log, self._reader):
+            if handle is not None:
+                handle.close()
+        self._log = self._reader = None
+
+    def _grow(self, needed: int):
+        capacity = len(self.lists)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+                self.lists.flush()
+            self.vectors = _map(self._data_path("vectors.f32"), np.float32, (capacity, self.dim))
+            self.lists = _map(self._data_path("lists.i32"), np.int32, (capacity,))
+        else:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            vectors[:self.count] = self.vectors[:self.count]
+            self.vectors = vectors
+            self.lists = np.concatenate([self.lists, np.full(capacity - len(self.lists), UNASSIGNED, dtype=np.int32)])
+        self.group = np.concatenate([self.group, np.zeros(capacity - len(self.group), dtype=np.int32)])
+        self.offsets = np.concatenate([self.offsets, np.zeros(capacity - len(self.offsets), dtype=np.int64)])
+
+    def _group_code(self, course_id: Any) -> int:
+        return self._groups.setdefault(str(course_id), len(self._groups))
+
+    def record(self, row: int) -> Dict[str, Any]:
+        if not self.directory:
+            return self._records[row]
+        if self._log is not None:
+            self._log.flush()
+        if self._reader is None:
+            self._reader = open(self._data_path("chunks.jsonl"), "rb")
+        self._reader.seek(int(self.offsets[row]))
+        return json.loads(self._reader.readline())["record"]
+
+    # Updates
+
+    def add(self, keys: List[str], records: List[Dict[str, Any]], vectors: np.ndarray):
+        """Append rows, replacing any rows already stored under the same keys"""
+        self.remove([key for key in keys if key in self.key_to_row])
+        start, n = self.count, len(keys)
+        self._grow(start + n)
+        rows = np.arange(start, start + n)
+        self.vectors[start:start + n] = vectors
+        self.lists[start:start + n] = UNASSIGNED
+        self.group[start:start + n] = [self._group_code(r["course_id"]) for r in records]
+        for row, key, record in zip(rows.tolist(), keys, records):
+            self.key_to_row[key] = row
+            self.keys.append(key)
+            if self.directory:
+                self.offsets[row] = self._append_log({"row": row, "key": key, "record": record})
+            else:
+                self._records.append(record)
+        self.count += n
+        self.live += n
+        if self._ivf is not None:
+            self._assign(rows)
+
+    def remove(self, keys: List[str]):
+        for key in keys:
+            row = self.key_to_row.pop(key, None)
+            if row is None:
+                continue
+            self.lists[row] = REMOVED
+            self.keys[row] = None
+            if self.directory:
+                self._append_log({"remove": row})
+            else:
+                self._records[row] = None
+            self.live -= 1
+
+    def _append_log(self, entry: Dict[str, Any]) -> int:
+        if self._log is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._log = open(self._data_path("chunks.jsonl"), "ab")
+        offset = self._log.tell()
+        self._log.write(json.dumps(entry).encode() + b"\n")
+        return offset
+
+    def flush(self):
+        """Commit appended rows: sync the mapped files and log, then record the row count"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+            self.lists.flush()
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        if self._centroids_changed:
+            np.save(self._path("centroids.npy"), self._ivf[0])
+            self._centroids_changed = False
+        meta = {"dim": self.dim, "count": self.count, "trained_rows": self.trained_rows, "generation": self._generation}
+        with open(self._path("index.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(self._path("index.json.tmp"), self._path("index.json"))
+
+    @classmethod
+    def open(cls, directory: str, dim: int, nprobe: int = settings.RETRIEVAL_NPROBE) -> "VectorIndex":
+        """Map an index written by ``flush``; an empty index if there is none or its dimension differs"""
+        index = cls(dim, directory, nprobe)
+        path = index._path("index.json")
+        if not os.path.exists(path):
+            return index
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != dim:
+            logger.warning("Discarding %d-dimensional retrieval index (now %d)", meta["dim"], dim)
+            for path in index._data_files() + [index._path("index.json"), index._path("centroids.npy")]:
+                if os.path.exists(path):
+                    os.remove(path)
+            return cls(dim, directory, nprobe)
+
+        count = meta["count"]
+        index._generation = meta.get("generation", 0)
+        index._drop_stale()
+        index._grow(count)
+        records: Dict[int, Tuple[str, Any, int]] = {}
+        offset = 0
+        log = index._data_path("chunks.jsonl")
+        # Absent if the index was committed before any row was added
+        if os.path.exists(log):
+            with open(log, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = json.loads(line)
+                    if "remove" in entry:
+                        records.pop(entry["remove"], None)
+                    elif entry["row"] < count:
+                        records[entry["row"]] = (entry["key"], entry["record"]["course_id"], offset)
+                    offset += len(line)
+            # Drop a line cut short by a crash
+            with open(log, "ab") as f:
+                f.truncate(offset)
+
+        index.count = count
+        index.keys = [None] * count
+        alive = np.zeros(count, dtype=bool)
+        for row, (key, course_id, record_offset) in records.items():
+            index.key_to_row[key] = row
+            index.keys[row] = key
+            index.group[row] = index._group_code(course_id)
+            index.offsets[row] = record_offset
+            alive[row] = True
+        index.lists[:count][~alive] = REMOVED
+        index.live = int(alive.sum())
+        if os.path.exists(index._path("centroids.npy")):
+            centroids = np.load(index._path("centroids.npy"))
+            index.trained_rows = meta.get("trained_rows", count)
+            index._ivf = (centroids, np.zeros(len(centroids) + 1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+            pending = np.flatnonzero(index.lists[:count] == UNASSIGNED)
+            if len(pending):
+                index._assign(pending)
+            index._build_lists()
+        else:
+            index.lists[:count][alive] = UNASSIGNED
+        return index
+
+    def _write_generation(self, alive: np.ndarray, generation: int) -> Tuple[np.memmap, np.memmap, np.ndarray]:
+        """Write the ``alive`` rows to ``generation``'s files, leaving the current ones untouched"""
+        n, capacity = len(alive), len(self.lists)
+        vectors = _map(self._data_path("vectors.f32", generation), np.float32, (capacity, self.dim))
+        lists = _map(self._data_path("lists.i32", generation), np.int32, (capacity,))
+        vectors[:n] = self.vectors[alive]
+        lists[:n] = self.lists[alive]
+        lists[n:] = UNASSIGNED
+        vectors.flush()
+        lists.flush()
+        offsets = np.zeros(capacity, dtype=np.int64)
+        with open(self._data_path("chunks.jsonl", generation), "wb") as f:
+            for new_row, row in enumerate(alive.tolist()):
+                offsets[new_row] = f.tell()
+                f.write(json.dumps({"row": new_row, "key": self.keys[row], "record": self.record(row)}).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return vectors, lists, offsets
+
+    def compact(self):
+        """Drop tombstoned rows; on disk into a new generation of files that ``index.json`` then switches to"""
+        alive = np.flatnonzero(self.lists[:self.count] != REMOVED)
+        n = len(alive)
+        if self.directory:
+            generation = self._generation + 1
+            vectors, lists, offsets = self._write_generation(alive, generation)
+            self.close()
+            self.vectors, self.lists, self.offsets = vectors, lists, offsets
+        else:
+            self.vectors[:n] = self.vectors[alive]
+            self.lists[:n] = self.lists[alive]
+            self._records = [self._records[row] for row in alive.tolist()]
+        self.group[:n] = self.group[alive]
+        self.keys = [self.keys[row] for row in alive.tolist()]
+        self.key_to_row = {key: row for row, key in enumerate(self.keys)}
+        self.count = self.live = n
+        self.lists[n:] = UNASSIGNED
+        if self._ivf is not None:
+            self._build_lists()
+        if self.directory:
+            self._generation = generation
+            self.flush()
+            self._drop_stale()
+
+    # IVF
+
+    @staticmethod
+    def kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+        """Spherical k-means: centroids are renormalised means of their members"""
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, vectors)
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            norms[empty] = 1.0
+            centroids = (sums / norms[:, None]).astype(np.float32)
+        return centroids
+
+    def train(self, nlist: int = 0, sample: int = 0, iterations: int = 10) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Cluster the live rows; returns centroids, their assignment and the row count covered.
+
+        Pure computation over a snapshot of the rows, so it can run in a worker
+        thread while searches continue; ``install`` swaps the result in.
+        """
+        n = self.count
+        rows = np.flatnonzero(self.lists[:n] != REMOVED)
+        nlist = nlist or int(np.clip(round(math.sqrt(len(rows))), 16, 4096))
+        nlist = min(nlist, len(rows))
+        sample = sample or nlist * 64
+        rng = np.random.default_rng(0)
+        picked = rows if len(rows) <= sample else np.sort(rng.choice(rows, sample, replace=False))
+        centroids = self.kmeans(np.asarray(self.vectors[picked]), nlist, iterations)
+        assignment = np.full(n, REMOVED, dtype=np.int32)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            assignment[block] = np.argmax(self.vectors[block] @ centroids.T, axis=1)
+        return centroids, assignment, n
+
+    def install(self, centroids: np.ndarray, assignment: np.ndarray, n: int):
+        """Adopt a ``train`` result; rows added or removed meanwhile are reconciled"""
+        self._ivf = (centroids, np.zeros(len(centroids) + 1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._centroids_changed = True
+        current = self.lists[:n]
+        removed = current == REMOVED
+        current[:] = np.where(removed, REMOVED, np.maximum(assignment, UNASSIGNED))
+        late = np.flatnonzero(current == UNASSIGNED)
+        if n < self.count:
+            late = np.concatenate([late, np.flatnonzero(self.lists[n:self.count] != REMOVED) + n])
+        if len(late):
+            self._assign(late)
+        self.trained_rows = self.live
+        self._build_lists()
+
+    def _assign(self, rows: np.ndarray):
+        centroids = self._ivf[0]
+        self.lists[rows] = np.argmax(self.vectors[rows] @ centroids.T, axis=1)
+        self._delta.extend(rows.tolist())
+        if len(self._delta) > max(1024, self.live // 64):
+            self._build_lists()
+
+    def _build_lists(self):
+        centroids = self._ivf[0]
+        lists = self.lists[:self.count]
+        members = np.flatnonzero(lists >= 0)
+        members = members[np.argsort(lists[members], kind="stable")]
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists[members], minlength=len(centroids)), out=offsets[1:])
+        self._ivf = (centroids, offsets, members)
+        self._delta = []
+
+    def needs_training(self, min_rows: int) -> bool:
+        """Large enough for IVF and not trained yet, or grown 4x since it was"""
+        return self.live >= min_rows and (self._ivf is None or self.live > 4 * self.trained_rows)
+
+    # Search
+
+    @staticmethod
+    def _merge(
+        best: Tuple[np.ndarray, np.ndarray], scores: np.ndarray, rows: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.concatenate([best[0], scores], axis=1)
+        rows = np.concatenate([best[1], np.broadcast_to(rows, scores[:, best[0].shape[1]:].shape)], axis=1)
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores, rows = np.take_along_axis(scores, top, 1), np.take_along_axis(rows, top, 1)
+        return scores, rows
+
+    def _exact(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        best = (np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64))
+        total = self.count if rows is None else len(rows)
+        for start in range(0, total, BLOCK_ROWS):
+            if rows is None:
+                block = np.arange(start, min(start + BLOCK_ROWS, total))
+                vectors, lists = self.vectors[start:start + len(block)], self.lists[start:start + len(block)]
+            else:
+                block = rows[start:start + BLOCK_ROWS]
+                vectors, lists = self.vectors[block], self.lists[block]
+            scores = queries @ vectors.T
+            scores[:, lists == REMOVED] = -np.inf
+            best = self._merge(best, scores, block, k)
+        return best
+
+    def _probe(self, queries: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        centroids, offsets, members = self._ivf
+        nprobe = min(nprobe, len(centroids))
+        nearest = np.argpartition(-(queries @ centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        delta = np.array(self._delta, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        rows = np.zeros((len(queries), k), dtype=np.int64)
+        for q, lists in enumerate(nearest):
+            candidates = np.concatenate([members[offsets[l]:offsets[l + 1]] for l in lists] + [delta])
+            candidates = np.sort(candidates[self.lists[candidates] != REMOVED])
+            if not len(candidates):
+                continue
+            found = self.vectors[candidates] @ queries[q]
+            top = np.argpartition(-found, k - 1)[:k] if len(found) > k else np.arange(len(found))
+            scores[q, :len(top)], rows[q, :len(top)] = found[top], candidates[top]
+        return scores, rows
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        course_id: Any = None,
+        exact: Optional[bool] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """Top ``k`` (row, score) pairs per query, best first.
+
+        Uses the IVF index when trained unless ``exact``. A ``course_id``
+        restricts the search to that course's rows, which are scored exactly.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not self.live or k <= 0:
+            return [[] for _ in queries]
+        if course_id is not None:
+            code = self._groups.get(str(course_id))
+            if code is None:
+                return [[] for _ in queries]
+            rows = np.flatnonzero(self.group[:self.count] == code)
+            scores, found = self._exact(queries, k, rows)
+        elif self._ivf is not None and not exact:
+            scores, found = self._probe(queries, k, nprobe or self.nprobe)
+        else:
+            scores, found = self._exact(queries, k)
+        results = []
+        for row_scores, row_ids in zip(scores, found):
+            order = np.argsort(-row_scores, kind="stable")
+            results.append([(int(row_ids[i]), float(row_scores[i])) for i in order if np.isfinite(row_scores[i])])
+        return results
+
+    def metrics(self) -> Dict:
+        return {
+            "rows": self.live,
+            "tombstoned": self.count - self.live,
+            "dim": self.dim,
+            "ivf_lists": len(self._ivf[0]) if self._ivf is not None else 0,
+            "ivf_delta": len(self._delta),
+            "nprobe": self.nprobe,
+        }
+
+
+class CourseRetrieval:
+    """Course material retrieval for the tutor.
+
+    Chunks of every catalog course are embedded and kept in a persistent
+    ``VectorIndex`` that follows the catalog: a changed course re-embeds
+    only chunks whose text changed. An IVF index is trained in a worker
+    thread once ``ivf_min_rows`` chunks are stored, and retrained when the
+    corpus has grown fourfold; until then search is exact.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.RETRIEVAL_DIR,
+        dim: int = settings.RETRIEVAL_DIM,
+        nprobe: int = settings.RETRIEVAL_NPROBE,
+        ivf_min_rows: int = settings.RETRIEVAL_IVF_MIN_ROWS,
+        chunk_words: int = settings.RETRIEVAL_CHUNK_WORDS,
+        window: int = 1000,
+    ):
+        self.directory = directory
+        self.ivf_min_rows = ivf_min_rows
+        self.chunk_words = chunk_words
+        self.embedder = HashedNgramEmbedder(dim)
+        self.index = VectorIndex(dim, directory, nprobe)
+        self._course_keys: Dict[str, List[str]] = {}
+        self._training: Optional[asyncio.Task] = None
+
+        self.searches = 0
+        self.embedded = 0
+        self.reused = 0
+        self.trainings = 0
+        self.last_training_duration = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def open(self):
+        """Map the persisted index, if any"""
+        if self.directory:
+            self.index.close()
+            self.index = VectorIndex.open(self.directory, self.index.dim, self.index.nprobe)
+        self._course_keys = {}
+        for key in self.index.keys:
+            if key is not None:
+                self._course_keys.setdefault(key.rsplit(":", 2)[0], []).append(key)
+        logger.info("Opened course retrieval index with %d chunks", self.index.live)
+
+    # Indexing
+
+    def index_course(self, course: Dict[str, Any], flush: bool = True) -> int:
+        """Bring a course's chunks up to date; returns how many were embedded"""
+        course_id = str(course["id"])
+        chunks = course_chunks(course, self.chunk_words, self.chunk_words // 4)
+        wanted = {key for key, _ in chunks}
+        self.index.remove([key for key in self._course_keys.get(course_id, []) if key not in wanted])
+        changed = []
+        for key, record in chunks:
+            record["digest"] = _digest(record)
+            row = self.index.key_to_row.get(key)
+            if row is not None and self.index.record(row).get("digest") == record["digest"]:
+                self.reused += 1
+                continue
+            changed.append((key, record))
+        if changed:
+            keys, records = zip(*changed)
+            self.index.add(list(keys), list(records), self.embedder.embed(r["text"] for r in records))
+            self.embedded += len(changed)
+        self._course_keys[course_id] = [key for key, _ in chunks]
+        if flush:
+            self.index.flush()
+        self._maybe_train()
+        return len(changed)
+
+    def remove_course(self, course_id: Any):
+        self.index.remove(self._course_keys.pop(str(course_id), []))
+        self.index.flush()
+
+    def on_catalog_change(self, change: str, course: Dict[str, Any]):
+        """Keep the index in step with the course catalog"""
+        if change == "remove":
+            self.remove_course(course["id"])
+        else:
+            self.index_course(course)
+
+    def sync(self, courses: Iterable[Dict[str, Any]]):
+        """Index every course and drop chunks of courses no longer listed"""
+        listed = set()
+        for course in courses:
+            listed.add(str(course["id"]))
+            self.index_course(course, flush=False)
+        for course_id in [c for c in self._course_keys if c not in listed]:
+            self.index.remove(self._course_keys.pop(course_id))
+        # Row numbers change on compaction, so never while a training thread holds them
+        training = self._training is not None and not self._training.done()
+        if not training and self.index.count - self.index.live > max(1024, self.index.live):
+            self.index.compact()
+        self.index.flush()
+
+    def _maybe_train(self):
+        if not self.index.needs_training(self.ivf_min_rows) or (self._training and not self._training.done()):
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.train()
+            return
+        self._training = asyncio.create_task(self.train_async())
+
+    def train(self):
+        started = time.perf_counter()
+        self.index.install(*self.index.train())
+        self.index.flush()
+        self._trained(started)
+
+    async def train_async(self):
+        """Cluster in a worker thread, then swap the IVF index in on the event loop"""
+        started = time.perf_counter()
+        result = await asyncio.to_thread(self.index.train)
+        self.index.install(*result)
+        self.index.flush()
+        self._trained(started)
+
+    def _trained(self, started: float):
+        self.trainings += 1
+        self.last_training_duration = time.perf_counter() - started
+        logger.info(
+            "Trained %d IVF lists over %d chunks in %.1f s",
+            self.index.metrics()["ivf_lists"], self.index.live, self.last_training_duration,
+        )
+
+    async def stop(self):
+        """Abandon a training run still in progress and commit the index"""
+        if self._training is not None and not self._training.done():
+            self._training.cancel()
+            try:
+                await self._training
+            except asyncio.CancelledError:
+                pass
+        self._training = None
+        self.index.flush()
+        self.index.close()
+
+    # Retrieval
+
+    def retrieve_batch(
+        self, queries: List[str], k: int = 5, course_id: Any = None, exact: Optional[bool] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Best matching chunks for each query"""
+        started = time.perf_counter()
+        found = self.index.search(self.embedder.embed(queries), k, course_id, exact)
+        results = [
+            [
+                {**{f: v for f, v in self.index.record(row).items() if f != "digest"}, "score": round(score, 4)}
+                for row, score in matches
+            ]
+            for matches in found
+        ]
+        elapsed = (time.perf_counter() - started) / max(len(queries), 1)
+        self._latencies.extend([elapsed] * len(queries))
+        self.searches += len(queries)
+        return results
+
+    def retrieve(self, query: str, k: int = 5, course_id: Any = None) -> List[Dict[str, Any]]:
+        return self.retrieve_batch([query], k, course_id)[0]
+
+    def metrics(self) -> Dict:
+        latency = {"p50": None, "p99": None}
+        if self._latencies:
+            p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+            latency = {"p50": round(float(p50), 3), "p99": round(float(p99), 3)}
+        return {
+            **self.index.metrics(),
+            "courses": len(self._course_keys),
+            "searches": self.searches,
+            "embedded": self.embedded,
+            "reused": self.reused,
+            "trainings": self.trainings,
+            "last_training_s": round(self.last_training_duration, 3),
+            "search_ms": latency,
+        }
+
+
+# Global course retrieval index
+course_retrieval = CourseRetrieval()
+
+
+def init_course_retrieval(catalog):
+    """Open the persisted index, index what changed, then follow the catalog"""
+    course_retrieval.open()
+    course_retrieval.sync(catalog.all())
+    catalog.add_listener(course_retrieval.on_catalog_change)
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int = 2048, noise: float = 1.0, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random topics, a stand-in for embedded chunks at scale.
+
+    ``noise`` is the length of each vector's random offset from its topic before normalising.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((clusters, dim)).astype(np.float32)
+    topics /= np.linalg.norm(topics, axis=1, keepdims=True)
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, BLOCK_ROWS):
+        n = min(BLOCK_ROWS, rows - start)
+        block = topics[rng.integers(0, clusters, n)] + noise / math.sqrt(dim) * rng.standard_normal((n, dim)).astype(np.float32)
+        vectors[start:start + n] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return vectors
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build the course retrieval index or benchmark it at scale")
+    parser.add_argument("--source", default=settings.DEMO_DATA_PATH, help="demo_data.json to read courses from")
+    parser.add_argument("--directory", default=settings.RETRIEVAL_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on this many synthetic chunks (in a scratch directory) instead")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not args.synthetic:
+        from app.services.demo_data import load_courses
+
+        retrieval = CourseRetrieval(directory=args.directory)
+        retrieval.open()
+        retrieval.sync(load_courses(args.source))
+        print(json.dumps(retrieval.metrics(), indent=2))
+        return
+
+    dim = settings.RETRIEVAL_DIM
+    scratch = tempfile.TemporaryDirectory()
+    index = VectorIndex(dim, scratch.name)
+    vectors = synthetic_vectors(args.synthetic + args.queries, dim)
+    started = time.perf_counter()
+    for start in range(0, args.synthetic, BLOCK_ROWS):
+        n = min(BLOCK_ROWS, args.synthetic - start)
+        index.add(
+            [f"synthetic:{start + i}" for i in range(n)],
+            [{"course_id": "synthetic", "text": ""}] * n,
+            vectors[start:start + n],
+        )
+    index.flush()
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    index.install(*index.train())
+    trained = time.perf_counter() - started
+    queries = vectors[args.synthetic:]
+
+    def timed(**options) -> Tuple[np.ndarray, List[List[Tuple[int, float]]]]:
+        latencies, results = [], []
+        for query in queries:
+            began = time.perf_counter()
+            results.append(index.search(query, args.k, **options)[0])
+            latencies.append(time.perf_counter() - began)
+        return np.array(latencies) * 1000, results
+
+    ivf_ms, approximate = timed()
+    exact_ms, reference = timed(exact=True)
+    recall = np.mean([
+        len({row for row, _ in a} & {row for row, _ in r}) / max(len(r), 1) for a, r in zip(approximate, reference)
+    ])
+    print(json.dumps({
+        **index.metrics(),
+        "load_s": round(loaded, 2),
+        "train_s": round(trained, 2),
+        "ivf_ms": {"p50": round(float(np.percentile(ivf_ms, 50)), 3), "p99": round(float(np.percentile(ivf_ms, 99)), 3)},
+        "exact_ms": {"p50": round(float(np.percentile(exact_ms, 50)), 3), "p99": round(float(np.percentile(exact_ms, 99)), 3)},
+        f"recall_at_{args.k}": round(float(recall), 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,525 @@
+"""
+Course Search Service for NeuroLynxEdu AI
+In-memory BM25 full-text index over courses and modules
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or the to with".split()
+)
+
+# Term frequency weight of each indexed field
+FIELD_BOOSTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "module_titles": 1.5,
+    "topics": 1.5,
+    "description": 1.0,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def course_digest(course: Dict[str, Any]) -> str:
+    """Hash of everything a course contributes to the index, to spot changes since a snapshot"""
+    raw = json.dumps(course_documents(course), sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def course_documents(course: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], Dict[str, str]]]:
+    """Split a course into searchable documents: the course itself and each module.
+
+    Returns ``(doc_key, metadata, fields)`` triples.
+    """
+    course_id = str(course["id"])
+    modules = course.get("modules", [])
+    docs = [(
+        f"course:{course_id}",
+        {"type": "course", "course_id": course["id"], "title": course.get("title", "")},
+        {
+            "title": course.get("title", ""),
+            "description": course.get("description", ""),
+            "tags": " ".join(course.get("tags") or [course.get("category", "")]),
+            "module_titles": " ".join(m.get("title", "") for m in modules),
+        },
+    )]
+    for module in modules:
+        docs.append((
+            f"module:{course_id}:{module['id']}",
+            {
+                "type": "module",
+                "course_id": course["id"],
+                "module_id": module["id"],
+                "title": module.get("title", ""),
+            },
+            {
+                "title": module.get("title", ""),
+                "description": module.get("description", ""),
+                "topics": " ".join(module.get("topics", [])),
+            },
+        ))
+    return docs
+
+
+class SearchIndex:
+    """BM25 inverted index with incremental updates and compact snapshots.
+
+    Postings live in a CSR block (``offsets``/``doc_ids``/``tfs`` arrays)
+    built at compaction or snapshot load, plus small per-term delta lists
+    for documents indexed since. Removed documents are tombstoned and
+    dropped at the next compaction, which runs in a worker thread when
+    triggered by a catalog change. Scoring a query is a few vectorized
+    array operations per query term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._df = np.zeros(0, dtype=np.int32)
+
+        # Compacted postings
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.float32)
+        # Postings added since the last compaction
+        self._delta: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._delta_arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._delta_postings = 0
+
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._doc_terms: List[Optional[np.ndarray]] = []  # term ids per doc, for df upkeep
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._is_module = np.zeros(0, dtype=bool)
+        self._key_to_doc: Dict[str, int] = {}
+        self._course_docs: Dict[str, List[str]] = {}
+        self._course_digests: Dict[str, str] = {}
+        self._total_len = 0.0
+        self._live_docs = 0
+        # Vocabulary in sorted order for prefix lookups, plus terms added since it was brought up to date
+        self._sorted_terms: List[str] = []
+        self._sorted_tids: List[int] = []
+        self._unsorted_tids: List[int] = []
+        # Bumped by every change, so a compaction built off the loop can tell it went stale
+        self._version = 0
+        self._compacting: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    # Indexing
+
+    def _term_id(self, term: str) -> int:
+        tid = self._term_ids.get(term)
+        if tid is None:
+            tid = len(self._terms)
+            self._term_ids[term] = tid
+            self._terms.append(term)
+            self._unsorted_tids.append(tid)
+            if tid >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(max(len(self._df), 1024), dtype=np.int32)])
+                self._offsets = np.concatenate(
+                    [self._offsets, np.full(len(self._df) + 1 - len(self._offsets), self._offsets[-1])]
+                )
+        return tid
+
+    def _grow_docs(self, needed: int):
+        if needed <= len(self._doc_len):
+            return
+        size = max(needed, 2 * len(self._doc_len), 1024)
+        self._doc_len = np.concatenate([self._doc_len, np.zeros(size - len(self._doc_len), dtype=np.float32)])
+        self._alive = np.concatenate([self._alive, np.zeros(size - len(self._alive), dtype=bool)])
+        self._is_module = np.concatenate([self._is_module, np.zeros(size - len(self._is_module), dtype=bool)])
+
+    def add_document(self, key: str, metadata: Dict[str, Any], fields: Dict[str, str]):
+        if key in self._key_to_doc:
+            self.remove_document(key)
+
+        weights: Dict[int, float] = {}
+        length = 0.0
+        for field, text in fields.items():
+            boost = FIELD_BOOSTS.get(field, 1.0)
+            for token in tokenize(text or ""):
+                tid = self._term_id(token)
+                weights[tid] = weights.get(tid, 0.0) + boost
+                length += boost
+
+        doc = len(self._docs)
+        self._grow_docs(doc + 1)
+        self._docs.append(metadata)
+        term_ids = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+        self._doc_terms.append(term_ids)
+        self._doc_len[doc] = length
+        self._alive[doc] = True
+        self._is_module[doc] = metadata.get("type") == "module"
+        self._key_to_doc[key] = doc
+        self._total_len += length
+        self._live_docs += 1
+        self._version += 1
+
+        for tid, tf in weights.items():
+            ids, tfs = self._delta.setdefault(tid, ([], []))
+            ids.append(doc)
+            tfs.append(tf)
+            self._delta_arrays.pop(tid, None)
+        self._delta_postings += len(weights)
+        if len(term_ids):
+            np.add.at(self._df, term_ids, 1)
+
+    def remove_document(self, key: str) -> bool:
+        doc = self._key_to_doc.pop(key, None)
+        if doc is None:
+            return False
+        self._alive[doc] = False
+        self._total_len -= float(self._doc_len[doc])
+        self._live_docs -= 1
+        term_ids = self._doc_terms[doc]
+        if term_ids is not None and len(term_ids):
+            np.subtract.at(self._df, term_ids, 1)
+        self._docs[doc] = None
+        self._doc_terms[doc] = None
+        self._version += 1
+        return True
+
+    def index_course(self, course: Dict[str, Any], auto_compact: bool = True):
+        """(Re)index a course and its modules"""
+        self.remove_course(course["id"])
+        keys = []
+        for key, metadata, fields in course_documents(course):
+            self.add_document(key, metadata, fields)
+            keys.append(key)
+        self._course_docs[str(course["id"])] = keys
+        self._course_digests[str(course["id"])] = course_digest(course)
+        if auto_compact:
+            self._maybe_compact()
+
+    def remove_course(self, course_id: Any):
+        self._course_digests.pop(str(course_id), None)
+        for key in self._course_docs.pop(str(course_id), []):
+            self.remove_document(key)
+
+    def on_catalog_change(self, change: str, course: Dict[str, Any]):
+        """Keep the index in step with the course catalog"""
+        if change == "remove":
+            self.remove_course(course["id"])
+        else:
+            self.index_course(course)
+
+    def bulk_index(self, courses: Iterable[Dict[str, Any]]):
+        for course in courses:
+            self.index_course(course, auto_compact=False)
+        self.compact()
+
+    def _maybe_compact(self):
+        tombstoned = len(self._docs) - self._live_docs
+        if not (self._delta_postings > 65536 or (tombstoned > 1024 and tombstoned > self._live_docs)):
+            return
+        if self._compacting is not None and not self._compacting.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.compact()
+            return
+        self._compacting = asyncio.create_task(self.compact_async())
+
+    def compact(self):
+        """Merge delta postings into the CSR block and drop removed documents"""
+        self._install(self._build(self._snapshot()))
+
+    async def compact_async(self, attempts: int = 3):
+        """Build the compacted postings in a worker thread, then swap them in on the event loop.
+
+        A build that catalog changes overtook is thrown away and redone; after
+        ``attempts`` of those the last one runs on the loop.
+        """
+        for _ in range(attempts):
+            version = self._version
+            built = await asyncio.to_thread(self._build, self._snapshot())
+            if version == self._version:
+                self._install(built)
+                return
+        self.compact()
+
+    def _snapshot(self) -> Tuple:
+        """What a compaction reads, captured on the event loop.
+
+        The CSR arrays are replaced rather than modified, so references to
+        them stay valid; the delta lists are copied.
+        """
+        n_docs = len(self._docs)
+        delta = {
+            tid: (np.array(ids, dtype=np.int32), np.array(tfs, dtype=np.float32))
+            for tid, (ids, tfs) in self._delta.items()
+        }
+        return (
+            len(self._terms), len(self._df), self._alive[:n_docs].copy(),
+            self._offsets, self._doc_ids, self._tfs, delta,
+        )
+
+    @staticmethod
+    def _build(snapshot: Tuple) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Compacted CSR postings of a snapshot; touches no index state, so it can run in any thread"""
+        n_terms, df_size, alive_mask, offsets, doc_ids, tfs, delta = snapshot
+        remap = np.full(len(alive_mask), -1, dtype=np.int64)
+        alive = np.flatnonzero(alive_mask)
+        remap[alive] = np.arange(len(alive))
+
+        counts = np.zeros(n_terms, dtype=np.int64)
+        parts_ids, parts_tfs = [], []
+        for tid in range(n_terms):
+            ids, weights = doc_ids[offsets[tid]:offsets[tid + 1]], tfs[offsets[tid]:offsets[tid + 1]]
+            if tid in delta:
+                ids, weights = np.concatenate([ids, delta[tid][0]]), np.concatenate([weights, delta[tid][1]])
+            keep = remap[ids] >= 0
+            ids, weights = remap[ids[keep]], weights[keep]
+            counts[tid] = len(ids)
+            parts_ids.append(ids)
+            parts_tfs.append(weights)
+
+        new_offsets = np.zeros(df_size + 1, dtype=np.int64)
+        new_offsets[1:n_terms + 1] = np.cumsum(counts)
+        new_offsets[n_terms + 1:] = new_offsets[n_terms]
+        new_doc_ids = np.concatenate(parts_ids).astype(np.int32) if parts_ids else np.zeros(0, np.int32)
+        new_tfs = np.concatenate(parts_tfs).astype(np.float32) if parts_tfs else np.zeros(0, np.float32)
+        return alive, remap, new_offsets, new_doc_ids, new_tfs
+
+    def _install(self, built: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]):
+        alive, remap, self._offsets, self._doc_ids, self._tfs = built
+        self._version += 1
+        self._delta.clear()
+        self._delta_arrays.clear()
+        self._delta_postings = 0
+
+        self._docs = [self._docs[i] for i in alive]
+        self._doc_terms = [self._doc_terms[i] for i in alive]
+        doc_len, is_module = self._doc_len[alive], self._is_module[alive]
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._is_module = np.zeros(0, dtype=bool)
+        self._grow_docs(len(alive))
+        self._doc_len[:len(alive)] = doc_len
+        self._is_module[:len(alive)] = is_module
+        self._alive[:len(alive)] = True
+        self._key_to_doc = {key: int(remap[doc]) for key, doc in self._key_to_doc.items()}
+
+    def _postings(self, tid: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self._offsets[tid], self._offsets[tid + 1]
+        ids, tfs = self._doc_ids[start:end], self._tfs[start:end]
+        if tid in self._delta:
+            cached = self._delta_arrays.get(tid)
+            if cached is None:
+                delta_ids, delta_tfs = self._delta[tid]
+                cached = (np.array(delta_ids, dtype=np.int32), np.array(delta_tfs, dtype=np.float32))
+                self._delta_arrays[tid] = cached
+            ids, tfs = np.concatenate([ids, cached[0]]), np.concatenate([tfs, cached[1]])
+        return ids, tfs
+
+    # Queries
+
+    def _sort_new_terms(self):
+        """Fold terms added since the last lookup into the sorted vocabulary.
+
+        A few are inserted by bisection; a bulk load's worth is merged with
+        one sort, which is linear on two sorted runs.
+        """
+        new = self._unsorted_tids
+        if len(new) <= 64:
+            for tid in new:
+                position = bisect.bisect_left(self._sorted_terms, self._terms[tid])
+                self._sorted_terms.insert(position, self._terms[tid])
+                self._sorted_tids.insert(position, tid)
+        else:
+            new.sort(key=self._terms.__getitem__)
+            self._sorted_tids = sorted(self._sorted_tids + new, key=self._terms.__getitem__)
+            self._sorted_terms = [self._terms[i] for i in self._sorted_tids]
+        self._unsorted_tids = []
+
+    def _expand_prefix(self, prefix: str, limit: int) -> List[str]:
+        if self._unsorted_tids:
+            self._sort_new_terms()
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\uffff")
+        tids = np.array(self._sorted_tids[start:end], dtype=np.int64)
+        df = self._df[tids]
+        tids, df = tids[df > 0], df[df > 0]
+        if len(tids) > limit:
+            keep = np.argpartition(-df, limit - 1)[:limit]
+            tids, df = tids[keep], df[keep]
+        return [self._terms[i] for i in tids[np.argsort(-df, kind="stable")]]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        doc_type: Optional[str] = None,
+        prefix: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """BM25-ranked documents; the last query word also matches as a prefix"""
+        tokens = tokenize(query)
+        if not tokens or not self._live_docs:
+            return []
+        term_weights: Dict[int, float] = {}
+        for token in tokens[:-1] if prefix else tokens:
+            if token in self._term_ids:
+                tid = self._term_ids[token]
+                term_weights[tid] = term_weights.get(tid, 0.0) + 1.0
+        if prefix:
+            for i, term in enumerate(self._expand_prefix(tokens[-1], 5)):
+                tid = self._term_ids[term]
+                # The exact word counts fully, completions progressively less
+                weight = 1.0 if term == tokens[-1] else 0.5 / (i + 1)
+                term_weights[tid] = max(term_weights.get(tid, 0.0), weight)
+        if not term_weights:
+            return []
+
+        n = len(self._docs)
+        avgdl = self._total_len / max(self._live_docs, 1)
+        scores = np.zeros(n, dtype=np.float32)
+        for tid, qweight in term_weights.items():
+            df = int(self._df[tid])
+            if df <= 0:
+                continue
+            ids, tfs = self._postings(tid)
+            idf = math.log(1.0 + (self._live_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self._doc_len[ids] / avgdl)
+            scores[ids] += qweight * idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        scores[~self._alive[:n]] = 0
+        if doc_type == "course":
+            scores[self._is_module[:n]] = 0
+        elif doc_type == "module":
+            scores[~self._is_module[:n]] = 0
+        k = min(limit, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [dict(self._docs[i], score=round(float(scores[i]), 4)) for i in top]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Indexed terms starting with the prefix, most common first"""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        return self._expand_prefix(tokens[-1], limit)
+
+    # Snapshots
+
+    def save(self, path: str):
+        """Write a compact snapshot (CSR postings + metadata) to an .npz file"""
+        self.compact()
+        n = len(self._docs)
+        keys = [None] * n
+        for key, doc in self._key_to_doc.items():
+            keys[doc] = key
+        meta = {
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self._docs,
+            "keys": keys,
+            "course_docs": self._course_docs,
+            "course_digests": self._course_digests,
+        }
+        n_terms = len(self._terms)
+        np.savez(
+            path,
+            terms=np.frombuffer("\n".join(self._terms).encode("utf-8"), dtype=np.uint8),
+            offsets=self._offsets[:n_terms + 1],
+            doc_ids=self._doc_ids,
+            tfs=self._tfs,
+            df=self._df[:n_terms],
+            doc_len=self._doc_len[:n],
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        index = cls()
+        index.restore(path)
+        return index
+
+    def restore(self, path: str):
+        """Replace the indexed contents with a snapshot written by ``save``"""
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            raw_terms = data["terms"].tobytes().decode("utf-8")
+            terms = raw_terms.split("\n") if raw_terms else []
+            offsets = data["offsets"].astype(np.int64)
+            doc_ids = data["doc_ids"]
+            tfs = data["tfs"]
+            df = data["df"].astype(np.int32)
+            doc_len = data["doc_len"]
+
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self._terms = terms
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self._sorted_tids = sorted(range(len(terms)), key=terms.__getitem__)
+        self._sorted_terms = [terms[i] for i in self._sorted_tids]
+        self._unsorted_tids = []
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._tfs = tfs
+        self._df = df
+        self._delta = {}
+        self._delta_arrays = {}
+        self._delta_postings = 0
+
+        self._docs = meta["docs"]
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._is_module = np.zeros(0, dtype=bool)
+        self._grow_docs(len(self._docs))
+        self._doc_len[:len(doc_len)] = doc_len
+        self._alive[:len(self._docs)] = True
+        self._is_module[:len(self._docs)] = [doc["type"] == "module" for doc in self._docs]
+        self._key_to_doc = {key: i for i, key in enumerate(meta["keys"])}
+        self._course_docs = meta["course_docs"]
+        # Snapshots written before digests were kept have none, so every course counts as changed
+        self._course_digests = meta.get("course_digests", {})
+        self._total_len = float(doc_len.sum())
+        self._live_docs = len(self._docs)
+
+        # Per-document term lists are only needed for df upkeep on removal
+        term_of_posting = np.repeat(np.arange(len(terms), dtype=np.int32), np.diff(offsets))
+        order = np.argsort(doc_ids, kind="stable")
+        bounds = np.searchsorted(doc_ids[order], np.arange(len(self._docs) + 1))
+        self._doc_terms = [term_of_posting[order[bounds[i]:bounds[i + 1]]] for i in range(len(self._docs))]
+        # A compaction built from the previous contents must not be installed
+        self._version += 1
+
+
+# Global course search index
+course_search = SearchIndex()
+
+
+def init_course_search(catalog, snapshot_path: str = ""):
+    """Load the snapshot if one exists and bring it up to date with the catalog, then follow the catalog"""
+    if snapshot_path and os.path.exists(snapshot_path):
+        course_search.restore(snapshot_path)
+        courses = {str(course["id"]): course for course in catalog.all()}
+        for course_id in [c for c in course_search._course_docs if c not in courses]:
+            course_search.remove_course(course_id)
+        for course_id, course in courses.items():
+            if course_search._course_digests.get(course_id) != course_digest(course):
+                course_search.index_course(course, auto_compact=False)
+        course_search._maybe_compact()
+    else:
+        course_search.bulk_index(catalog.all())
+    catalog.add_listener(course_search.on_catalog_change)
@@ -0,0 +1,79 @@
+"""
+Course Persistence for NeuroLynxEdu AI
+Async queries behind the course catalog
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.course import Course, EnrollmentCounterShard
+
+# Seeded into an empty courses table, and served when the database is unreachable
+DEFAULT_COURSES = [
+    {
+        "id": 1,
+        "title": "Introduction to Machine Learning",
+        "description": "Learn the basics of ML with EEG integration",
+        "difficulty": "beginner",
+        "rating": 4.5,
+        "enrollment_count": 1250,
+        "tags": ["Machine Learning", "EEG"]
+    },
+    {
+        "id": 2,
+        "title": "Advanced Neural Networks",
+        "description": "Deep learning with real-time brain feedback",
+        "difficulty": "advanced",
+        "rating": 4.8,
+        "enrollment_count": 320,
+        "tags": ["Neural Networks", "Deep Learning"]
+    }
+]
+
+_COURSE_COLUMNS = {"title", "description", "difficulty", "estimated_duration", "thumbnail_url", "rating", "enrollment_count", "tags"}
+
+
+def db_course_id(course_id: Any) -> Optional[int]:
+    """Database key for an API course id; demo-data courses have none"""
+    try:
+        return int(course_id)
+    except (TypeError, ValueError):
+        return None
+
+
+async def seed_courses(session: AsyncSession, courses: List[Dict[str, Any]] = DEFAULT_COURSES) -> int:
+    if await session.scalar(select(func.count()).select_from(Course)):
+        return 0
+    session.add_all(Course(**{k: v for k, v in course.items() if k in _COURSE_COLUMNS}) for course in courses)
+    await session.commit()
+    return len(courses)
+
+
+def _shard_totals():
+    return (
+        select(EnrollmentCounterShard.course_id, func.sum(EnrollmentCounterShard.count).label("total"))
+        .group_by(EnrollmentCounterShard.course_id)
+        .subquery()
+    )
+
+
+def _courses_with_counts():
+    totals = _shard_totals()
+    return (
+        select(Course, func.coalesce(totals.c.total, 0))
+        .outerjoin(totals, totals.c.course_id == Course.id)
+        .where(Course.is_active.is_(True))
+    )
+
+
+async def fetch_courses(session: AsyncSession) -> List[Dict[str, Any]]:
+    """All active courses in the catalog record shape, counter shards merged"""
+    result = await session.execute(_courses_with_counts().order_by(Course.id))
+    return [course.to_dict(int(extra)) for course, extra in result]
+
+
+async def fetch_course(session: AsyncSession, course_id: int) -> Optional[Dict[str, Any]]:
+    row = (await session.execute(_courses_with_counts().where(Course.id == course_id))).first()
+    return row[0].to_dict(int(row[1])) if row else None
@@ -0,0 +1,115 @@
+"""
+Demo Data Access for NeuroLynxEdu AI
+Reads sections of the generated demo_data.json without loading the whole file
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator, List, Sequence, Union
+
+from app.core.config import settings
+
+_WHITESPACE = " \t\r\n"
+
+KNOWLEDGE_GRAPH_SECTIONS = ("nodes", "relationships", "user_knowledge")
+
+
+def iter_json_array(
+    path: str, key: Union[str, Sequence[str]], chunk_size: int = 64 * 1024
+) -> Iterator[Dict[str, Any]]:
+    """Yield the objects of an array one at a time.
+
+    ``key`` names a top-level array, or is a sequence of keys leading to a
+    nested one (``("knowledge_graph", "nodes")``), each looked for after
+    the previous. The file is read in fixed-size chunks and consumed text
+    is discarded after every element, so memory use is bounded by the
+    chunk size and the largest single element rather than by the size of
+    the file.
+    """
+    decoder = json.JSONDecoder()
+    keys = [key] if isinstance(key, str) else list(key)
+    key = keys[-1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf += chunk
+            return True
+
+        # Locate `"outer": ... "key": [`
+        for marker in map(json.dumps, keys):
+            while True:
+                idx = buf.find(marker)
+                if idx >= 0:
+                    buf = buf[idx + len(marker):]
+                    break
+                buf = buf[-len(marker):]
+                if not fill():
+                    return
+        while True:
+            stripped = buf.lstrip(_WHITESPACE + ":")
+            if stripped:
+                if stripped[0] != "[":
+                    raise ValueError(f"'{key}' is not an array in {path}")
+                buf = stripped[1:]
+                break
+            buf = ""
+            if not fill():
+                return
+
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buf):
+                buf, pos = "", 0
+                if not fill():
+                    raise ValueError(f"Unterminated array '{key}' in {path}")
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element spans a chunk boundary
+                buf, pos = buf[pos:], 0
+                if not fill():
+                    raise
+                continue
+            yield item
+            buf, pos = buf[end:], 0
+
+
+def iter_learning_sessions(path: str = settings.DEMO_DATA_PATH) -> Iterator[Dict[str, Any]]:
+    """Stream stored learning sessions"""
+    if not os.path.exists(path):
+        return iter(())
+    return iter_json_array(path, "learning_sessions")
+
+
+def load_courses(path: str = settings.DEMO_DATA_PATH) -> List[Dict[str, Any]]:
+    """Demo course catalog with modules, empty if no demo data was generated"""
+    if not os.path.exists(path):
+        return []
+    return list(iter_json_array(path, "courses"))
+
+
+def load_knowledge_graph(
+    path: str = settings.DEMO_DATA_PATH, sections: Sequence[str] = KNOWLEDGE_GRAPH_SECTIONS
+) -> Dict[str, Any]:
+    """Demo knowledge graph sections (nodes, relationships, user_knowledge), empty if no demo data was generated.
+
+    Each section is streamed on its own, so only the graph is held in
+    memory, never the rest of the file, and callers that need one section
+    skip decoding the others.
+    """
+    if not os.path.exists(path):
+        return {section: [] for section in sections}
+    return {section: list(iter_json_array(path, ("knowledge_graph", section))) for section in sections}
@@ -0,0 +1,187 @@
+"""
+Adaptive Difficulty Controller for NeuroLynxEdu AI
+Closes the loop between live EEG readings and content difficulty
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from app.services.live_sessions import FIELD_INDEX, LiveSessionManager, live_session_manager
+
+# Hysteresis zones
+STRUGGLING = -1
+NEUTRAL = 0
+COASTING = 1
+
+
+@dataclass
+class ControllerConfig:
+    """Thresholds and limits for difficulty decisions"""
+    period_ticks: int = 4  # evaluate once every N manager ticks
+    lookback_ticks: int = 20  # readings averaged per decision
+    min_samples: int = 8
+
+    # Enter the struggling zone below/above these, leave it only past the recovery values
+    low_attention: float = 45.0
+    recover_attention: float = 60.0
+    high_load: float = 75.0
+    relax_load: float = 60.0
+
+    # Enter the coasting zone above/below these, leave it below/above the exit values
+    coast_attention: float = 75.0
+    coast_exit_attention: float = 65.0
+    coast_load: float = 45.0
+    coast_exit_load: float = 55.0
+
+    step: float = 0.1  # largest difficulty change per decision
+    min_interval_seconds: float = 30.0  # rate limit per session
+    min_difficulty: float = 0.1
+    max_difficulty: float = 0.9
+    history_size: int = 50
+
+
+class DifficultyController:
+    """Batched closed-loop controller over all live sessions.
+
+    Per-slot controller state lives in arrays indexed like the live session
+    buffer, so each evaluation is a handful of vector operations no matter
+    how many sessions are running.
+    """
+
+    def __init__(self, manager: LiveSessionManager, config: Optional[ControllerConfig] = None):
+        self.manager = manager
+        self.config = config or ControllerConfig()
+        capacity = manager.capacity
+        self.zones = np.zeros(capacity, dtype=np.int8)
+        self.last_change = np.zeros(capacity, dtype=np.float64)
+        self.generations = np.zeros(capacity, dtype=np.int64)
+        self.actions: Dict[str, Deque[Dict]] = {}
+
+        # Metrics
+        self.evaluations = 0
+        self.decisions = 0
+        self.overruns = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.avg_latency = 0.0
+
+    def on_tick(self, manager: LiveSessionManager):
+        if manager.tick_count % self.config.period_ticks:
+            return
+        started = time.perf_counter()
+        self.evaluate(manager)
+        self._record_latency(time.perf_counter() - started, manager)
+
+    def evaluate(self, manager: LiveSessionManager):
+        """Run one batched decision pass over every live session"""
+        cfg = self.config
+        sessions, slots = manager.active()
+        if not sessions:
+            self.actions = {}
+            return
+
+        # Reset state for slots that were handed to a new session
+        reused = manager.generations[slots] != self.generations[slots]
+        if reused.any():
+            fresh = slots[reused]
+            self.zones[fresh] = NEUTRAL
+            self.last_change[fresh] = 0.0
+            self.generations[fresh] = manager.generations[fresh]
+
+        windows, valid = manager.window_view(slots)
+        windows, valid = windows[:, -cfg.lookback_ticks:], valid[:, -cfg.lookback_ticks:]
+        n_valid = valid.sum(axis=1)
+        weights = valid / np.maximum(n_valid, 1)[:, None]
+        attention = (windows[..., FIELD_INDEX["attention"]] * weights).sum(axis=1)
+        load = (windows[..., FIELD_INDEX["cognitive_load"]] * weights).sum(axis=1)
+        ready = n_valid >= cfg.min_samples
+
+        zones = self.zones[slots]
+        enter_struggle = (attention < cfg.low_attention) | (load > cfg.high_load)
+        exit_struggle = (attention > cfg.recover_attention) & (load < cfg.relax_load)
+        enter_coast = (attention > cfg.coast_attention) & (load < cfg.coast_load)
+        exit_coast = (attention < cfg.coast_exit_attention) | (load > cfg.coast_exit_load)
+
+        new_zones = zones.copy()
+        new_zones[(zones == STRUGGLING) & exit_struggle] = NEUTRAL
+        new_zones[(zones == COASTING) & exit_coast] = NEUTRAL
+        new_zones[(new_zones == NEUTRAL) & enter_coast] = COASTING
+        new_zones[enter_struggle] = STRUGGLING
+        new_zones[~ready] = zones[~ready]
+        self.zones[slots] = new_zones
+
+        now = time.time()
+        difficulty = np.fromiter(
+            (s.simulator.content_difficulty for s in sessions), dtype=np.float64, count=len(sessions)
+        )
+        allowed = ready & (now - self.last_change[slots] >= cfg.min_interval_seconds)
+        target = np.clip(difficulty + new_zones * cfg.step, cfg.min_difficulty, cfg.max_difficulty)
+        changed = allowed & (np.abs(target - difficulty) > 1e-9)
+
+        live_ids = set()
+        for i, session in enumerate(sessions):
+            live_ids.add(session.session_id)
+            if not changed[i]:
+                continue
+            self._apply(session, difficulty[i], target[i], attention[i], load[i], now)
+        self.last_change[slots[changed]] = now
+        self.decisions += int(changed.sum())
+
+        # Forget histories of sessions that have ended
+        for session_id in [sid for sid in self.actions if sid not in live_ids]:
+            del self.actions[session_id]
+
+    def _apply(self, session, old: float, new: float, attention: float, load: float, now: float):
+        simulator = session.simulator
+        simulator.set_content_context(float(new), simulator.content_engagement)
+
+        if new < old:
+            reason = "high_cognitive_load_detected" if load > self.config.high_load else "low_attention_detected"
+            verb = "Reduced"
+        else:
+            reason = "sustained_focus_detected"
+            verb = "Increased"
+        history = self.actions.setdefault(session.session_id, deque(maxlen=self.config.history_size))
+        history.append({
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+            "action": "difficulty_adjustment",
+            "reason": reason,
+            "details": f"{verb} content difficulty from {old:.1f} to {new:.1f}",
+            "attention": round(float(attention), 1),
+            "cognitive_load": round(float(load), 1),
+        })
+
+    def _record_latency(self, latency: float, manager: LiveSessionManager):
+        self.evaluations += 1
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.avg_latency += (latency - self.avg_latency) / min(self.evaluations, 100)
+        if latency > 1.0 / manager.tick_hz:
+            self.overruns += 1
+
+    def get_actions(self, session_id: str) -> List[Dict]:
+        return list(self.actions.get(session_id, ()))
+
+    def metrics(self) -> Dict:
+        return {
+            "evaluations": self.evaluations,
+            "decisions": self.decisions,
+            "decision_latency_ms": {
+                "last": round(self.last_latency * 1000, 3),
+                "avg": round(self.avg_latency * 1000, 3),
+                "max": round(self.max_latency * 1000, 3),
+            },
+            "controller_overruns": self.overruns,
+            "tick_overruns": self.manager.tick_overruns,
+            "active_sessions": len(self.manager.sessions),
+            "period_seconds": self.config.period_ticks / self.manager.tick_hz,
+        }
+
+
+# Global difficulty controller
+difficulty_controller = DifficultyController(live_session_manager)
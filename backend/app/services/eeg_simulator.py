@@ -41,8 +41,9 @@ class UserProfile:
 class EEGSimulator:
     """Realistic EEG data simulator"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.sampling_rate = 250  # Hz
+        self.rng = random.Random(seed)  # own generator, so a seed makes a run reproducible
         self.is_running = False
         self.current_session = None
         self.user_profiles = self._create_user_profiles()
@@ -108,11 +109,11 @@ class EEGSimulator:
     def _generate_base_waves(self, t: float) -> Dict[str, float]:
         """Generate base brainwave frequencies"""
         # Create realistic frequency patterns
-        alpha = 10 + 2 * math.sin(2 * math.pi * 0.1 * t) + random.gauss(0, 0.5)
-        beta = 20 + 5 * math.sin(2 * math.pi * 0.05 * t) + random.gauss(0, 1.0)
-        theta = 6 + 1.5 * math.sin(2 * math.pi * 0.08 * t) + random.gauss(0, 0.3)
-        delta = 2 + 0.8 * math.sin(2 * math.pi * 0.02 * t) + random.gauss(0, 0.2)
-        gamma = 40 + 10 * math.sin(2 * math.pi * 0.15 * t) + random.gauss(0, 2.0)
+        alpha = 10 + 2 * math.sin(2 * math.pi * 0.1 * t) + self.rng.gauss(0, 0.5)
+        beta = 20 + 5 * math.sin(2 * math.pi * 0.05 * t) + self.rng.gauss(0, 1.0)
+        theta = 6 + 1.5 * math.sin(2 * math.pi * 0.08 * t) + self.rng.gauss(0, 0.3)
+        delta = 2 + 0.8 * math.sin(2 * math.pi * 0.02 * t) + self.rng.gauss(0, 0.2)
+        gamma = 40 + 10 * math.sin(2 * math.pi * 0.15 * t) + self.rng.gauss(0, 2.0)
         
         return {
             "alpha": max(0, alpha),
@@ -138,7 +139,7 @@ class EEGSimulator:
         fatigue_penalty = -profile.fatigue_rate * (self.session_duration / 60)  # per minute
         
         # Add natural variability
-        variability = random.gauss(0, profile.attention_variability)
+        variability = self.rng.gauss(0, profile.attention_variability)
         
         # Calculate attention
         attention = base_attention + difficulty_impact + engagement_boost + fatigue_penalty + variability
@@ -0,0 +1,456 @@
+"""
+EEG Reading Store for NeuroLynxEdu AI
+Time-partitioned segment files with downsampling tiers and retention
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.live_sessions import READING_FIELDS, LiveSessionManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    resolution: float  # seconds per row, 0 for raw readings
+    span: float  # seconds covered by one partition
+    retention: float  # seconds a partition is kept after it ends
+
+
+TIERS = (
+    Tier("raw", 0, settings.EEG_RAW_PARTITION_MINUTES * 60, settings.EEG_RAW_RETENTION_HOURS * 3600),
+    Tier("1s", 1, 86400, settings.EEG_SECOND_RETENTION_DAYS * 86400),
+    Tier("1m", 60, 7 * 86400, settings.EEG_MINUTE_RETENTION_DAYS * 86400),
+)
+
+# (session ids per row, timestamps, values, sample counts)
+Rows = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _empty_rows() -> Rows:
+    return (
+        np.zeros(0, dtype="U1"),
+        np.zeros(0, dtype=np.float64),
+        np.zeros((0, len(READING_FIELDS)), dtype=np.float32),
+        np.zeros(0, dtype=np.int32),
+    )
+
+
+def _concat(parts: List[Rows]) -> Rows:
+    parts = [p for p in parts if len(p[1])]
+    if not parts:
+        return _empty_rows()
+    return tuple(np.concatenate([p[i] for p in parts]) for i in range(4))
+
+
+def aggregate(rows: Rows, resolution: float) -> Rows:
+    """Count-weighted means per (session, time bucket)"""
+    sessions, ts, values, counts = rows
+    if not len(ts):
+        return _empty_rows()
+    uniq, codes = np.unique(sessions, return_inverse=True)
+    buckets = np.floor(ts / resolution) * resolution
+    order = np.lexsort((buckets, codes))
+    codes, buckets = codes[order], buckets[order]
+    weights = counts[order].astype(np.float64)
+    starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])])
+    totals = np.add.reduceat(weights, starts)
+    sums = np.add.reduceat(values[order].astype(np.float64) * weights[:, None], starts, axis=0)
+    return (
+        uniq[codes[starts]],
+        buckets[starts],
+        (sums / totals[:, None]).astype(np.float32),
+        totals.astype(np.int32),
+    )
+
+
+class IOBudget:
+    """Token bucket limiting compactor disk traffic to a byte rate"""
+
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self._available = bytes_per_second
+        self._updated = time.monotonic()
+        self.total_bytes = 0
+
+    async def spend(self, nbytes: int):
+        self.total_bytes += nbytes
+        now = time.monotonic()
+        self._available = min(self.rate, self._available + (now - self._updated) * self.rate)
+        self._updated = now
+        self._available -= nbytes
+        if self._available < 0:
+            await asyncio.sleep(-self._available / self.rate)
+
+
+class EEGReadingStore:
+    """Per-sample EEG readings in time-partitioned segment files.
+
+    Each tier directory holds one entry per partition: a directory of small
+    ``.npz`` chunks while the partition is still being written, and a
+    sealed directory of ``.npy`` arrays once it has ended. Every segment is
+    grouped by session (CSR ``offsets`` over sorted session ids) and
+    sorted by time, so reading one session is a memory-mapped slice.
+
+    The compactor seals ended partitions, downsamples them into the next
+    tier (raw -> 1 s -> 1 min), and drops partitions past their tier's
+    retention, all paced by an I/O budget. Queries use the finest tier
+    that still covers each part of the requested range.
+
+    Sealing first renames the chunk directory to ``.sealing``, so later
+    chunks start a new round, and names the round after its newest chunk.
+    The sealed segment records the last round merged into it and the
+    downsampled rows are written under a name derived from the round, so
+    a round interrupted by a crash is finished at the next compaction
+    without merging or aggregating anything twice. A finished round is
+    renamed to ``.swept`` before it is deleted.
+    """
+
+    def __init__(
+        self,
+        root: str = settings.EEG_STORE_DIR,
+        tiers: Tuple[Tier, ...] = TIERS,
+        flush_interval: float = settings.EEG_STORE_FLUSH_SECONDS,
+        compaction_interval: float = settings.EEG_COMPACTION_INTERVAL_SECONDS,
+        io_bytes_per_second: float = settings.EEG_COMPACTION_IO_MBPS * 1024 * 1024,
+    ):
+        self.root = root
+        self.tiers = tiers
+        self.flush_interval = flush_interval
+        self.compaction_interval = compaction_interval
+        self.io_budget = IOBudget(io_bytes_per_second)
+        self._buffer: List[Rows] = []
+        self._buffered = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.rows_written = 0
+        self.partitions_sealed = 0
+        self.partitions_dropped = 0
+        self.last_compaction_duration = 0.0
+
+    # Layout
+
+    def _tier_dir(self, tier: Tier) -> str:
+        return os.path.join(self.root, tier.name)
+
+    def _partition_start(self, tier: Tier, ts: float) -> int:
+        return int(ts // tier.span * tier.span)
+
+    def _partitions(self, tier: Tier) -> Dict[int, Dict[str, str]]:
+        """partition start -> {"chunks": dir, "sealing": dir, "sealed": dir} for what exists on disk"""
+        found: Dict[int, Dict[str, str]] = {}
+        directory = self._tier_dir(tier)
+        if not os.path.isdir(directory):
+            return found
+        for name in os.listdir(directory):
+            start, _, kind = name.partition(".")
+            if start.isdigit() and kind in ("chunks", "sealing", "sealed", "swept"):
+                found.setdefault(int(start), {})[kind] = os.path.join(directory, name)
+        return found
+
+    # Segment files
+
+    @staticmethod
+    def _segment_arrays(rows: Rows) -> Dict[str, np.ndarray]:
+        sessions, ts, values, counts = rows
+        uniq, codes = np.unique(sessions, return_inverse=True)
+        order = np.lexsort((ts, codes))
+        offsets = np.searchsorted(codes[order], np.arange(len(uniq) + 1))
+        return {
+            "sessions": uniq,
+            "offsets": offsets.astype(np.int64),
+            "ts": ts[order],
+            "values": values[order],
+            "counts": counts[order],
+        }
+
+    def _write_chunk(self, path: str, rows: Rows, name: Optional[str] = None) -> int:
+        os.makedirs(path, exist_ok=True)
+        target = os.path.join(path, f"{name or f'{time.time_ns()}-{uuid.uuid4().hex[:6]}'}.npz")
+        np.savez(target + ".tmp.npz", **self._segment_arrays(rows))
+        os.replace(target + ".tmp.npz", target)
+        return os.path.getsize(target)
+
+    def _write_sealed(self, path: str, rows: Rows, round_id: str) -> int:
+        staging = path + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        written = 0
+        for name, array in self._segment_arrays(rows).items():
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+            written += array.nbytes
+        with open(os.path.join(staging, "round"), "w", encoding="utf-8") as f:
+            f.write(round_id)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+        return written
+
+    @staticmethod
+    def _chunk_names(path: str) -> List[str]:
+        return sorted(
+            name[:-len(".npz")] for name in os.listdir(path) if name.endswith(".npz") and not name.endswith(".tmp.npz")
+        )
+
+    @staticmethod
+    def _sealed_round(path: str) -> Optional[str]:
+        """Newest sealing round merged into a sealed segment"""
+        try:
+            with open(os.path.join(path, "round"), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def _open_segments(cls, entry: Dict[str, str]) -> List[Dict[str, np.ndarray]]:
+        segments = []
+        if "sealed" in entry:
+            sealed = entry["sealed"]
+            segments.append({
+                name: np.load(os.path.join(sealed, f"{name}.npy"), mmap_mode="r")
+                for name in ("sessions", "offsets", "ts", "values", "counts")
+            })
+        for kind in ("sealing", "chunks"):
+            if kind not in entry:
+                continue
+            names = cls._chunk_names(entry[kind])
+            if kind == "sealing" and names and "sealed" in entry and cls._sealed_round(entry["sealed"]) == names[-1]:
+                continue  # already merged, only the cleanup is left
+            for name in names:
+                with np.load(os.path.join(entry[kind], f"{name}.npz")) as data:
+                    segments.append({key: data[key] for key in data.files})
+        return segments
+
+    @staticmethod
+    def _segment_rows(segment: Dict[str, np.ndarray]) -> Rows:
+        offsets = segment["offsets"]
+        sessions = np.repeat(np.asarray(segment["sessions"]), np.diff(offsets))
+        return sessions, np.asarray(segment["ts"]), np.asarray(segment["values"]), np.asarray(segment["counts"])
+
+    @staticmethod
+    def _session_slice(segment: Dict[str, np.ndarray], session_id: str, start: float, end: float) -> Rows:
+        sessions = segment["sessions"]
+        idx = int(np.searchsorted(sessions, session_id))
+        if idx >= len(sessions) or sessions[idx] != session_id:
+            return _empty_rows()
+        lo, hi = int(segment["offsets"][idx]), int(segment["offsets"][idx + 1])
+        ts = segment["ts"][lo:hi]
+        a, b = lo + int(np.searchsorted(ts, start)), lo + int(np.searchsorted(ts, end))
+        ts = np.asarray(segment["ts"][a:b])
+        return np.full(len(ts), session_id), ts, np.asarray(segment["values"][a:b]), np.asarray(segment["counts"][a:b])
+
+    # Ingest
+
+    def append(self, session_ids: np.ndarray, timestamps: np.ndarray, values: np.ndarray):
+        """Buffer raw readings; they reach disk at the next flush"""
+        values = np.asarray(values, dtype=np.float32)
+        self._buffer.append((
+            np.asarray(session_ids, dtype=str),
+            np.asarray(timestamps, dtype=np.float64),
+            values,
+            np.ones(len(values), dtype=np.int32),
+        ))
+        self._buffered += len(values)
+
+    def on_tick(self, manager: LiveSessionManager):
+        """Record the reading every live session produced this tick"""
+        sessions, slots = manager.active()
+        if not sessions:
+            return
+        now = time.time()
+        self.append(
+            np.array([s.session_id for s in sessions]),
+            np.full(len(sessions), now),
+            manager.latest(slots),
+        )
+
+    def _write_rows(self, tier: Tier, rows: Rows, name: Optional[str] = None) -> int:
+        """Append rows as chunks of the partitions they fall in; a ``name`` replaces any chunk written under it"""
+        starts = (rows[1] // tier.span * tier.span).astype(np.int64)
+        written = 0
+        for start in np.unique(starts):
+            mask = starts == start
+            path = os.path.join(self._tier_dir(tier), f"{start}.chunks")
+            written += self._write_chunk(path, tuple(part[mask] for part in rows), name)
+        return written
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        rows, self._buffer, self._buffered = _concat(self._buffer), [], 0
+        written = await asyncio.to_thread(self._write_rows, self.tiers[0], rows)
+        self.rows_written += len(rows[1])
+        await self.io_budget.spend(written)
+
+    # Compaction
+
+    def _seal(self, level: int, start: int, entry: Dict[str, str]) -> int:
+        """Finish an interrupted sealing round, then seal the partition's chunks"""
+        io = 0
+        sealing = os.path.join(self._tier_dir(self.tiers[level]), f"{start}.sealing")
+        if "sealing" in entry:
+            io += self._seal_round(level, start, sealing)
+        if "chunks" in entry:
+            os.replace(entry["chunks"], sealing)
+            io += self._seal_round(level, start, sealing)
+        return io
+
+    def _seal_round(self, level: int, start: int, sealing: str) -> int:
+        """Merge a ``.sealing`` directory into the sealed segment and downsample it a tier down"""
+        tier = self.tiers[level]
+        names = self._chunk_names(sealing)
+        if not names:
+            shutil.rmtree(sealing)
+            return 0
+        round_id = names[-1]
+        chunk_rows = _concat([self._segment_rows(seg) for seg in self._open_segments({"sealing": sealing})])
+        read = sum(a.nbytes for a in chunk_rows)
+        written = 0
+        sealed = os.path.join(self._tier_dir(tier), f"{start}.sealed")
+        exists = os.path.isdir(sealed)
+        if not exists or self._sealed_round(sealed) != round_id:
+            existing = [self._segment_rows(seg) for seg in self._open_segments({"sealed": sealed})] if exists else []
+            read += sum(a.nbytes for rows in existing for a in rows)
+            written += self._write_sealed(sealed, _concat(existing + [chunk_rows]), round_id)
+        if level + 1 < len(self.tiers) and len(chunk_rows[1]):
+            coarser = self.tiers[level + 1]
+            written += self._write_rows(coarser, aggregate(chunk_rows, coarser.resolution), f"{tier.name}-{start}-{round_id}")
+        swept = os.path.join(self._tier_dir(tier), f"{start}.swept")
+        os.replace(sealing, swept)
+        shutil.rmtree(swept)
+        return read + written
+
+    async def compact(self, now: Optional[float] = None):
+        """Seal ended partitions, cascade downsampling, then apply retention"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        grace = 2 * self.flush_interval
+        for level, tier in enumerate(self.tiers):
+            for start, entry in sorted(self._partitions(tier).items()):
+                if "swept" in entry:
+                    await asyncio.to_thread(shutil.rmtree, entry.pop("swept"))
+                if "sealing" in entry or ("chunks" in entry and start + tier.span <= now - grace):
+                    io = await asyncio.to_thread(self._seal, level, start, entry)
+                    self.partitions_sealed += 1
+                    await self.io_budget.spend(io)
+            for start, entry in sorted(self._partitions(tier).items()):
+                if set(entry) == {"sealed"} and start + tier.span + tier.retention <= now:
+                    await asyncio.to_thread(shutil.rmtree, entry["sealed"])
+                    self.partitions_dropped += 1
+        self.last_compaction_duration = time.perf_counter() - started
+
+    async def _run(self):
+        last_compaction = 0.0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_compaction >= self.compaction_interval:
+                    last_compaction = time.monotonic()
+                    await self.compact()
+            except Exception:
+                logger.exception("EEG store flush/compaction failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    # Queries
+
+    def _horizon(self, tier: Tier) -> Optional[int]:
+        partitions = self._partitions(tier)
+        return min(partitions) if partitions else None
+
+    def query(self, session_id: str, start: float, end: float) -> Dict:
+        """Readings for a session in [start, end), finest available tier first"""
+        pieces = []
+        upper = end
+        for level, tier in enumerate(self.tiers):
+            horizon = self._horizon(tier)
+            if level == 0:
+                buffered = _concat(self._buffer)
+                mask = (buffered[0] == session_id) & (buffered[1] >= start) & (buffered[1] < end)
+                if mask.any():
+                    horizon = min(horizon if horizon is not None else end, float(buffered[1][mask].min()))
+            if horizon is None or upper <= start:
+                continue
+            lower = max(start, horizon)
+            if lower >= upper:
+                continue
+            rows = self._read_range(tier, session_id, lower, upper)
+            if level == 0:
+                rows = _concat([rows, tuple(part[mask] for part in buffered)])
+                order = np.argsort(rows[1], kind="stable")
+                rows = tuple(part[order] for part in rows)
+                rows = tuple(part[(rows[1] >= lower) & (rows[1] < upper)] for part in rows)
+            else:
+                # Late chunks may repeat buckets; merge them
+                rows = aggregate(rows, tier.resolution)
+            if len(rows[1]):
+                pieces.append((tier, rows))
+            upper = lower
+
+        pieces.reverse()
+        return {
+            "session_id": session_id,
+            "fields": list(READING_FIELDS),
+            "segments": [
+                {
+                    "resolution": tier.name,
+                    "timestamps": rows[1].tolist(),
+                    "values": np.round(rows[2], 3).tolist(),
+                    "sample_counts": rows[3].tolist(),
+                }
+                for tier, rows in pieces
+            ],
+        }
+
+    def _read_range(self, tier: Tier, session_id: str, start: float, end: float) -> Rows:
+        parts = []
+        for partition, entry in sorted(self._partitions(tier).items()):
+            if partition + tier.span <= start or partition >= end:
+                continue
+            try:
+                segments = self._open_segments(entry)
+            except FileNotFoundError:
+                # Sealed by the compactor while listing; reopen the new layout
+                segments = self._open_segments(self._partitions(tier).get(partition, {}))
+            parts.extend(self._session_slice(seg, session_id, start, end) for seg in segments)
+        rows = _concat(parts)
+        order = np.argsort(rows[1], kind="stable")
+        return tuple(part[order] for part in rows)
+
+    def metrics(self) -> Dict:
+        return {
+            "buffered_rows": self._buffered,
+            "rows_written": self.rows_written,
+            "partitions": {tier.name: len(self._partitions(tier)) for tier in self.tiers},
+            "partitions_sealed": self.partitions_sealed,
+            "partitions_dropped": self.partitions_dropped,
+            "compaction_io_bytes": self.io_budget.total_bytes,
+            "last_compaction_ms": round(self.last_compaction_duration * 1000, 3),
+        }
+
+
+# Global EEG reading store
+eeg_store = EEGReadingStore()
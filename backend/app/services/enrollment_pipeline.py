@@ -0,0 +1,192 @@
+"""
+Enrollment Pipeline for NeuroLynxEdu AI
+Coalesces enrollment requests into batched, idempotent inserts
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.course import Course, Enrollment, EnrollmentCounterShard
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Outcome of one enrollment request
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already_enrolled"
+UNKNOWN_USER = "unknown_user"
+UNKNOWN_COURSE = "unknown_course"
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class EnrollmentQueue:
+    """Batches concurrent enrollments into one transaction per flush.
+
+    Requests wait at most ``max_delay`` seconds for company. Each flush
+    inserts the batch with ``ON CONFLICT DO NOTHING`` against the
+    ``(user_id, course_id)`` unique constraint, so retries and duplicate
+    clicks are harmless, and adds the number of new rows per course to a
+    randomly chosen counter shard.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = SessionLocal,
+        batch_size: int = settings.ENROLLMENT_BATCH_SIZE,
+        max_delay: float = settings.ENROLLMENT_BATCH_DELAY_MS / 1000.0,
+        shards: int = settings.ENROLLMENT_COUNTER_SHARDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.shards = shards
+        self._pending: List[Tuple[int, int, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._listeners: List[Callable[[Dict[int, int]], None]] = []
+
+        self.requests = 0
+        self.batches = 0
+        self.inserted = 0
+        self.largest_batch = 0
+        self.last_flush_duration = 0.0
+
+    def add_listener(self, listener: Callable[[Dict[int, int]], None]):
+        """Register a callback receiving {course_id: new enrollments} after each flush"""
+        self._listeners.append(listener)
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, user_id: int, course_id: int) -> str:
+        return (await self.submit_many(course_id, [user_id]))[user_id]
+
+    async def submit_many(self, course_id: int, user_ids: List[int]) -> Dict[int, str]:
+        """Enroll users in a course; returns the outcome per user id"""
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures: Dict[int, asyncio.Future] = {}
+        for user_id in user_ids:
+            if user_id not in futures:
+                futures[user_id] = loop.create_future()
+                self._pending.append((user_id, course_id, futures[user_id]))
+        self.requests += len(futures)
+        self._wakeup.set()
+        outcomes = await asyncio.gather(*futures.values())
+        return dict(zip(futures.keys(), outcomes))
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.batch_size and not self._stopping:
+                await asyncio.sleep(self.max_delay)
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            if not self._pending:
+                self._wakeup.clear()
+            if batch:
+                await self._flush(batch)
+            if self._stopping and not self._pending:
+                return
+
+    async def _flush(self, batch: List[Tuple[int, int, asyncio.Future]]):
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as session:
+                outcomes, added = await self._write(session, {(u, c) for u, c, _ in batch})
+        except Exception as e:
+            logger.exception("Enrollment batch of %d failed", len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for user_id, course_id, future in batch:
+            if not future.done():
+                future.set_result(outcomes[(user_id, course_id)])
+        self.batches += 1
+        self.inserted += sum(added.values())
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.last_flush_duration = time.perf_counter() - started
+        if added:
+            for listener in self._listeners:
+                listener(added)
+
+    async def _write(self, session: AsyncSession, pairs: set) -> Tuple[Dict[Tuple[int, int], str], Dict[int, int]]:
+        insert = _INSERTS[session.get_bind().dialect.name]
+        user_ids = {u for u, _ in pairs}
+        course_ids = {c for _, c in pairs}
+        known_users = set(await session.scalars(select(User.id).where(User.id.in_(user_ids))))
+        known_courses = set(await session.scalars(select(Course.id).where(Course.id.in_(course_ids))))
+
+        outcomes: Dict[Tuple[int, int], str] = {}
+        rows = []
+        for user_id, course_id in pairs:
+            if course_id not in known_courses:
+                outcomes[(user_id, course_id)] = UNKNOWN_COURSE
+            elif user_id not in known_users:
+                outcomes[(user_id, course_id)] = UNKNOWN_USER
+            else:
+                outcomes[(user_id, course_id)] = ALREADY_ENROLLED
+                rows.append({"user_id": user_id, "course_id": course_id})
+        if not rows:
+            return outcomes, {}
+
+        result = await session.execute(
+            insert(Enrollment)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "course_id"])
+            .returning(Enrollment.user_id, Enrollment.course_id)
+        )
+        added: Dict[int, int] = {}
+        for user_id, course_id in result:
+            outcomes[(user_id, course_id)] = ENROLLED
+            added[course_id] = added.get(course_id, 0) + 1
+
+        if added:
+            stmt = insert(EnrollmentCounterShard).values([
+                {"course_id": course_id, "shard": random.randrange(self.shards), "count": count}
+                for course_id, count in added.items()
+            ])
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=["course_id", "shard"],
+                set_={"count": EnrollmentCounterShard.count + stmt.excluded.count},
+            ))
+        await session.commit()
+        return outcomes, added
+
+    async def stop(self):
+        """Flush what is queued and stop the worker"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._stopping = False
+        self._task = None
+
+    def metrics(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "inserted": self.inserted,
+            "pending": len(self._pending),
+            "largest_batch": self.largest_batch,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 3),
+        }
+
+
+# Global enrollment queue
+enrollment_queue = EnrollmentQueue()
@@ -0,0 +1,180 @@
+"""
+In-memory Neo4j driver for NeuroLynxEdu AI
+Stands in for the async driver when exercising the graph loader without a database
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.graph_loader import KNOWLEDGE_LABEL, MASTERY_TYPE, USER_LABEL
+
+
+class FakeTransientError(Exception):
+    """Raised by injected failures; retried by ``execute_write`` like a deadlock"""
+
+
+@dataclass
+class FakeCounters:
+    nodes_created: int = 0
+    relationships_created: int = 0
+    properties_set: int = 0
+    constraints_added: int = 0
+
+
+@dataclass
+class FakeSummary:
+    counters: FakeCounters
+
+
+class FakeResult:
+    def __init__(self, counters: FakeCounters):
+        self._counters = counters
+
+    async def consume(self) -> FakeSummary:
+        return FakeSummary(self._counters)
+
+
+class FakeTransaction:
+    def __init__(self, driver: "FakeGraphDriver"):
+        self.driver = driver
+        self.changes: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        await asyncio.sleep(self.driver.latency)
+        params = {**(parameters or {}), **kwargs}
+        kind, _, arg = query.lstrip().split("\n", 1)[0].lstrip("/ ").partition(":")
+        self.changes.append((kind, arg, params))
+        self.driver.statements.append((kind, arg, len(params.get("rows", []))))
+        return FakeResult(self.driver.dry_run(kind, arg, params))
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeGraphDriver", database: Optional[str]):
+        self.driver = driver
+        self.database = database
+
+    async def __aenter__(self) -> "FakeSession":
+        self.driver.active_sessions += 1
+        self.driver.peak_sessions = max(self.driver.peak_sessions, self.driver.active_sessions)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.driver.active_sessions -= 1
+
+    async def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **kwargs) -> FakeResult:
+        """Auto-commit statement"""
+        tx = FakeTransaction(self.driver)
+        result = await tx.run(query, parameters, **kwargs)
+        self.driver.commit(tx)
+        return result
+
+    async def execute_write(self, work, *args, **kwargs):
+        """Managed transaction: applied on success, retried on transient errors"""
+        for attempt in range(self.driver.max_retries + 1):
+            tx = FakeTransaction(self.driver)
+            try:
+                if self.driver.failures_to_inject:
+                    self.driver.failures_to_inject -= 1
+                    raise FakeTransientError("injected deadlock")
+                result = await work(tx, *args, **kwargs)
+            except FakeTransientError:
+                self.driver.retries += 1
+                if attempt == self.driver.max_retries:
+                    raise
+                continue
+            self.driver.commit(tx)
+            return result
+
+
+class FakeGraphDriver:
+    """Understands the statements ``GraphBulkLoader`` issues, keyed on their
+    ``// kind:argument`` first line, and applies them with MERGE semantics to
+    plain dictionaries. ``latency`` simulates the network round trip and
+    ``failures_to_inject`` makes the next writes fail transiently.
+    """
+
+    def __init__(self, latency: float = 0.0, max_retries: int = 3):
+        self.latency = latency
+        self.max_retries = max_retries
+        self.nodes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.labels: Dict[Tuple[str, str], set] = {}
+        self.relationships: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.constraints: set = set()
+        self.statements: List[Tuple[str, str, int]] = []
+        self.active_sessions = 0
+        self.peak_sessions = 0
+        self.failures_to_inject = 0
+        self.retries = 0
+
+    def session(self, database: Optional[str] = None) -> FakeSession:
+        return FakeSession(self, database)
+
+    async def close(self):
+        pass
+
+    def dry_run(self, kind: str, arg: str, params: Dict[str, Any]) -> FakeCounters:
+        """Counters the statement would produce against the current state"""
+        return self._apply(kind, arg, params, write=False)
+
+    def commit(self, tx: FakeTransaction):
+        for kind, arg, params in tx.changes:
+            self._apply(kind, arg, params, write=True)
+
+    def _apply(self, kind: str, arg: str, params: Dict[str, Any], write: bool) -> FakeCounters:
+        counters = FakeCounters()
+        created = set()
+        rows = params.get("rows", [])
+        if kind == "constraint":
+            if arg not in self.constraints:
+                counters.constraints_added += 1
+                if write:
+                    self.constraints.add(arg)
+        elif kind == "nodes":
+            for row in rows:
+                key = (KNOWLEDGE_LABEL, row["id"])
+                if key not in self.nodes and key not in created:
+                    created.add(key)
+                    counters.nodes_created += 1
+                counters.properties_set += len(row["props"])
+                if write:
+                    self.nodes.setdefault(key, {"id": row["id"]}).update(row["props"])
+                    self.labels.setdefault(key, {KNOWLEDGE_LABEL}).add(arg)
+        elif kind == "relationships":
+            for row in rows:
+                if (KNOWLEDGE_LABEL, row["from"]) not in self.nodes or (KNOWLEDGE_LABEL, row["to"]) not in self.nodes:
+                    continue
+                key = (row["from"], arg, row["to"])
+                if key not in self.relationships and key not in created:
+                    created.add(key)
+                    counters.relationships_created += 1
+                counters.properties_set += 1
+                if write:
+                    self.relationships.setdefault(key, {})["strength"] = row["strength"]
+        elif kind == "mastery":
+            for row in rows:
+                if (KNOWLEDGE_LABEL, row["concept_id"]) not in self.nodes:
+                    continue
+                user = (USER_LABEL, row["user_id"])
+                if user not in self.nodes and user not in created:
+                    created.add(user)
+                    counters.nodes_created += 1
+                key = (row["user_id"], MASTERY_TYPE, row["concept_id"])
+                current = self.relationships.get(key)
+                if current is None and key not in created:
+                    created.add(key)
+                    counters.relationships_created += 1
+                if current is not None and current.get("updated_at", 0) > row["updated_at"]:
+                    continue
+                counters.properties_set += 3
+                if write:
+                    self.nodes.setdefault(user, {"id": row["user_id"]})
+                    self.labels.setdefault(user, {USER_LABEL})
+                    self.relationships[key] = {
+                        "level": row["mastery_level"],
+                        "confidence": row["confidence"],
+                        "updated_at": row["updated_at"],
+                    }
+        else:
+            raise ValueError(f"Fake driver does not understand statement kind {kind!r}")
+        return counters
@@ -0,0 +1,295 @@
+"""
+Graph Centrality for NeuroLynxEdu AI
+Precomputed PageRank, degree and betweenness scores over the knowledge graph
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.knowledge_graph import KnowledgeGraph, KnowledgeGraphService, _gather, knowledge_graph
+
+logger = logging.getLogger(__name__)
+
+
+def graph_signature(graph: KnowledgeGraph) -> str:
+    """Changes whenever a node or weighted edge does"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\0".join(graph.ids).encode())
+    for array in (graph.in_offsets, graph.in_sources, graph.in_weights):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def pagerank(
+    graph: KnowledgeGraph,
+    damping: float = 0.85,
+    tolerance: float = 1e-8,
+    max_iterations: int = 200,
+    start: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, int]:
+    """Weighted PageRank where every node passes its rank to its prerequisites.
+
+    Rank therefore pools in foundational concepts that much of the graph
+    builds on. Each iteration is a sparse matrix-vector product over the
+    ``in_*`` CSR arrays; ``start`` warm-starts from earlier scores.
+    """
+    n = graph.size
+    if not n:
+        return np.zeros(0), 0
+    dependents = np.repeat(np.arange(n), np.diff(graph.in_offsets))
+    passed_on = np.bincount(dependents, weights=graph.in_weights, minlength=n)
+    share = np.divide(graph.in_weights, passed_on[dependents], out=np.zeros(len(dependents)), where=passed_on[dependents] > 0)
+    dangling = passed_on == 0
+
+    scores = np.full(n, 1 / n) if start is None else start / start.sum()
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        updated = np.bincount(graph.in_sources, weights=share * scores[dependents], minlength=n)
+        updated = damping * (updated + scores[dangling].sum() / n) + (1 - damping) / n
+        change = np.abs(updated - scores).sum()
+        scores = updated
+        if change < tolerance:
+            break
+    return scores, iterations
+
+
+def betweenness(graph: KnowledgeGraph, samples: int, seed: int = 0) -> np.ndarray:
+    """Normalised betweenness estimated from ``samples`` BFS sources (Brandes).
+
+    Each source runs a level-synchronous BFS over the CSR arrays: path
+    counts flow forward one level at a time and dependencies flow back the
+    same way, so the work per level is a handful of array operations.
+    """
+    n = graph.size
+    total = np.zeros(n)
+    if n < 3 or not graph.edge_count:
+        return total
+    sources = np.arange(n) if samples >= n else np.random.default_rng(seed).choice(n, samples, replace=False)
+    counts = np.diff(graph.out_offsets)
+    for source in sources:
+        distance = np.full(n, -1, dtype=np.int64)
+        distance[source] = 0
+        paths = np.zeros(n)
+        paths[source] = 1
+        levels = []
+        frontier = np.array([source])
+        depth = 0
+        while len(frontier):
+            tails = np.repeat(frontier, counts[frontier])
+            heads = _gather(graph.out_offsets, graph.out_targets, frontier)
+            reached = np.unique(heads[distance[heads] < 0])
+            distance[reached] = depth + 1
+            shortest = distance[heads] == depth + 1
+            tails, heads = tails[shortest], heads[shortest]
+            np.add.at(paths, heads, paths[tails])
+            levels.append((tails, heads))
+            frontier = reached
+            depth += 1
+        dependency = np.zeros(n)
+        for tails, heads in reversed(levels):
+            np.add.at(dependency, tails, paths[tails] / paths[heads] * (1 + dependency[heads]))
+        dependency[source] = 0
+        total += dependency
+    return total * (n / len(sources)) / ((n - 1) * (n - 2))
+
+
+@dataclass
+class GraphScores:
+    """Per-node scores of one graph, indexed like its nodes"""
+    signature: str
+    ids: List[str]
+    pagerank: np.ndarray
+    importance: np.ndarray  # PageRank scaled to a maximum of 1
+    in_degree: np.ndarray  # prerequisites
+    out_degree: np.ndarray  # dependents
+    betweenness: np.ndarray
+    iterations: int = 0
+    warm_start: bool = False
+    duration: float = 0.0
+
+    def describe(self, node: int) -> Dict[str, Any]:
+        return {
+            "importance": round(float(self.importance[node]), 6),
+            "pagerank": float(self.pagerank[node]),
+            "betweenness": round(float(self.betweenness[node]), 6),
+            "in_degree": int(self.in_degree[node]),
+            "out_degree": int(self.out_degree[node]),
+        }
+
+
+class GraphCentrality:
+    """Scores for the current knowledge graph, recomputed when it is reloaded.
+
+    A recompute warm-starts PageRank from the previous scores mapped by
+    node id, so a reload that changes a few edges converges in a few
+    iterations. Scores are saved to ``snapshot_path`` after every
+    recompute; a graph matching the snapshot's signature (the offline job's
+    output, or the last run's) is served from it without computing.
+    """
+
+    def __init__(
+        self,
+        graphs: KnowledgeGraphService = knowledge_graph,
+        snapshot_path: str = settings.CENTRALITY_SNAPSHOT_PATH,
+        damping: float = settings.PAGERANK_DAMPING,
+        tolerance: float = settings.PAGERANK_TOLERANCE,
+        betweenness_samples: int = settings.BETWEENNESS_SAMPLES,
+    ):
+        self.graphs = graphs
+        self.snapshot_path = snapshot_path
+        self.damping = damping
+        self.tolerance = tolerance
+        self.betweenness_samples = betweenness_samples
+        self._graph: Optional[KnowledgeGraph] = None
+        self._scores: Optional[GraphScores] = None
+        self.recomputes = 0
+        self.reused = 0
+
+    def compute(self, graph: KnowledgeGraph, previous: Optional[GraphScores] = None) -> GraphScores:
+        started = time.perf_counter()
+        start = None
+        if previous is not None and graph.size:
+            known = {node_id: i for i, node_id in enumerate(previous.ids)}
+            start = np.full(graph.size, 1 / graph.size)
+            mapped = np.array([known.get(node_id, -1) for node_id in graph.ids])
+            start[mapped >= 0] = previous.pagerank[mapped[mapped >= 0]]
+        ranks, iterations = pagerank(graph, self.damping, self.tolerance, start=start)
+        return GraphScores(
+            signature=graph_signature(graph),
+            ids=graph.ids,
+            pagerank=ranks,
+            importance=ranks / ranks.max() if graph.size else ranks,
+            in_degree=np.diff(graph.in_offsets),
+            out_degree=np.diff(graph.out_offsets),
+            betweenness=betweenness(graph, self.betweenness_samples),
+            iterations=iterations,
+            warm_start=start is not None,
+            duration=time.perf_counter() - started,
+        )
+
+    def on_graph(self, graph: KnowledgeGraph):
+        """Graph load listener: score the new graph before it is served"""
+        previous = self._scores if self._scores is not None else self.load_snapshot()
+        if previous is not None and previous.signature == graph_signature(graph):
+            scores = replace(previous, in_degree=np.diff(graph.in_offsets), out_degree=np.diff(graph.out_offsets))
+            self.reused += 1
+        else:
+            scores = self.compute(graph, previous)
+            self.recomputes += 1
+            logger.info(
+                "Scored knowledge graph in %.1f ms (%d PageRank iterations, warm start: %s)",
+                scores.duration * 1000, scores.iterations, scores.warm_start,
+            )
+            if self.snapshot_path:
+                try:
+                    self.save_snapshot(scores)
+                except OSError:
+                    logger.exception("Could not save graph centrality snapshot")
+        self._graph, self._scores = graph, scores
+
+    def scores(self, graph: Optional[KnowledgeGraph] = None) -> GraphScores:
+        """Precomputed scores of ``graph`` (the current one by default)"""
+        graph = graph if graph is not None else self.graphs.graph
+        if graph is not self._graph:
+            self.on_graph(graph)
+        return self._scores
+
+    def top(self, limit: int, node_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most important nodes, optionally of one type"""
+        graph = self.graphs.graph
+        scores = self.scores(graph)
+        candidates = np.arange(graph.size)
+        if node_type is not None:
+            if node_type not in graph.type_names:
+                return []
+            candidates = np.flatnonzero(graph.node_types == graph.type_names.index(node_type))
+        best = candidates[np.argsort(-scores.importance[candidates], kind="stable")[:limit]]
+        return [{**node, **scores.describe(i)} for node, i in zip(graph.describe(best), best.tolist())]
+
+    # Snapshots
+
+    def save_snapshot(self, scores: GraphScores):
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.snapshot_path + ".tmp.npz"
+        np.savez(
+            temporary,
+            signature=np.array(scores.signature),
+            ids=np.asarray(scores.ids, dtype=str),
+            pagerank=scores.pagerank,
+            betweenness=scores.betweenness,
+        )
+        os.replace(temporary, self.snapshot_path)
+
+    def load_snapshot(self) -> Optional[GraphScores]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with np.load(self.snapshot_path, allow_pickle=False) as data:
+                ids = data["ids"].tolist()
+                pagerank_scores = data["pagerank"]
+                return GraphScores(
+                    signature=str(data["signature"]),
+                    ids=ids,
+                    pagerank=pagerank_scores,
+                    importance=pagerank_scores / pagerank_scores.max() if len(ids) else pagerank_scores,
+                    in_degree=np.zeros(0, dtype=np.int64),  # filled in from the graph it is matched to
+                    out_degree=np.zeros(0, dtype=np.int64),
+                    betweenness=data["betweenness"],
+                )
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable graph centrality snapshot: %s", e)
+            return None
+
+    def metrics(self) -> Dict:
+        scores = self._scores
+        return {
+            "nodes": len(scores.ids) if scores else 0,
+            "recomputes": self.recomputes,
+            "reused": self.reused,
+            "last_iterations": scores.iterations if scores else 0,
+            "last_warm_start": scores.warm_start if scores else False,
+            "last_compute_ms": round(scores.duration * 1000, 3) if scores else 0.0,
+        }
+
+
+# Global graph centrality scores
+graph_centrality = GraphCentrality()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute knowledge graph centrality scores")
+    parser.add_argument("--source", default=settings.DEMO_DATA_PATH, help="demo_data.json to read the graph from")
+    parser.add_argument("--concepts", type=int, default=0, help="Generate a graph with this many nodes instead")
+    parser.add_argument("--output", default=settings.CENTRALITY_SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+    if not args.concepts and not os.path.exists(args.source):
+        parser.error(f"{args.source} not found; run scripts/create_demo_data.py or pass --concepts to generate a graph")
+
+    if args.concepts:
+        from app.services.graph_loader import generate_knowledge_graph
+
+        data = generate_knowledge_graph(args.concepts, users=0)
+    else:
+        with open(args.source, "r", encoding="utf-8") as f:
+            data = json.load(f)["knowledge_graph"]
+    graphs = KnowledgeGraphService()
+    centrality = GraphCentrality(graphs=graphs, snapshot_path=args.output)
+    graphs.add_listener(centrality.on_graph)
+    graphs.load(data)
+    print(json.dumps({**centrality.metrics(), "top": [node["id"] for node in centrality.top(10)]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Knowledge Graph Loader for NeuroLynxEdu AI
+Batched UNWIND/MERGE writes of the knowledge graph and mastery state to Neo4j
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.knowledge_graph import NODE_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Every graph node also carries this label, so relationships and mastery
+# can MATCH on one uniquely constrained id whatever the node's type
+KNOWLEDGE_LABEL = "KnowledgeNode"
+USER_LABEL = "User"
+MASTERY_TYPE = "HAS_MASTERY"
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# The first line of each statement names its kind, which keeps query logs
+# readable and lets the in-memory driver interpret statements without Cypher
+CONSTRAINT_QUERY = """// constraint:{label}
+CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE
+"""
+NODE_QUERY = """// nodes:{label}
+UNWIND $rows AS row
+MERGE (n:""" + KNOWLEDGE_LABEL + """ {{id: row.id}})
+SET n:{label}, n += row.props
+"""
+RELATIONSHIP_QUERY = """// relationships:{type}
+UNWIND $rows AS row
+MATCH (a:""" + KNOWLEDGE_LABEL + """ {{id: row.from}})
+MATCH (b:""" + KNOWLEDGE_LABEL + """ {{id: row.to}})
+MERGE (a)-[r:{type}]->(b)
+SET r.strength = row.strength
+"""
+MASTERY_QUERY = """// mastery
+UNWIND $rows AS row
+MATCH (c:""" + KNOWLEDGE_LABEL + """ {id: row.concept_id})
+MERGE (u:""" + USER_LABEL + """ {id: row.user_id})
+MERGE (u)-[m:""" + MASTERY_TYPE + """]->(c)
+WITH m, row WHERE m.updated_at IS NULL OR m.updated_at <= row.updated_at
+SET m.level = row.mastery_level, m.confidence = row.confidence, m.updated_at = row.updated_at
+"""
+
+
+def _identifier(name: str) -> str:
+    """Labels and relationship types cannot be parameters, so only plain names are interpolated"""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid label or relationship type: {name!r}")
+    return name
+
+
+@dataclass
+class LoadStats:
+    batches: int = 0
+    rows: int = 0
+    nodes_created: int = 0
+    relationships_created: int = 0
+    properties_set: int = 0
+    seconds: float = 0.0
+    partitions: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, counters: Any, rows: int):
+        self.batches += 1
+        self.rows += rows
+        self.nodes_created += counters.nodes_created
+        self.relationships_created += counters.relationships_created
+        self.properties_set += counters.properties_set
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "nodes_created": self.nodes_created,
+            "relationships_created": self.relationships_created,
+            "properties_set": self.properties_set,
+            "rows_per_second": round(self.rows / self.seconds, 1) if self.seconds else None,
+            "seconds": round(self.seconds, 3),
+            "partitions": self.partitions,
+        }
+
+
+async def _run_batch(tx, query: str, rows: List[Dict[str, Any]]):
+    result = await tx.run(query, rows=rows)
+    summary = await result.consume()
+    return summary.counters
+
+
+class GraphBulkLoader:
+    """Writes the knowledge graph shape to Neo4j in parameterised UNWIND batches.
+
+    Rows are grouped into partitions (one per node label, relationship type
+    or user hash bucket); each partition is written by its own session, up
+    to ``concurrency`` at a time, in batches of ``batch_size`` rows. Every
+    statement MERGEs on uniquely constrained ids, so reloading the same data
+    is harmless and a failed load can simply be rerun.
+    """
+
+    def __init__(
+        self,
+        driver,
+        database: Optional[str] = settings.NEO4J_DATABASE,
+        batch_size: int = settings.GRAPH_LOAD_BATCH_SIZE,
+        concurrency: int = settings.GRAPH_LOAD_CONCURRENCY,
+    ):
+        self.driver = driver
+        self.database = database or None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    async def ensure_constraints(self, labels: Iterable[str] = (KNOWLEDGE_LABEL, USER_LABEL)):
+        """Unique id constraints; without them every MERGE scans the label"""
+        async with self.driver.session(database=self.database) as session:
+            for label in labels:
+                label = _identifier(label)
+                query = CONSTRAINT_QUERY.format(label=label, name=f"{label.lower()}_id")
+                await session.run(query)
+
+    async def _write_partition(self, query: str, rows: List[Dict[str, Any]], stats: LoadStats):
+        async with self.driver.session(database=self.database) as session:
+            for lo in range(0, len(rows), self.batch_size):
+                batch = rows[lo:lo + self.batch_size]
+                counters = await session.execute_write(_run_batch, query, batch)
+                stats.add(counters, len(batch))
+
+    async def _write_partitions(
+        self,
+        partitions: Dict[str, Tuple[str, List[Dict[str, Any]]]],
+        stats: LoadStats,
+        concurrency: Optional[int] = None,
+    ):
+        gate = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def write(name: str, query: str, rows: List[Dict[str, Any]]):
+            async with gate:
+                await self._write_partition(query, rows, stats)
+            stats.partitions[name] = len(rows)
+
+        await asyncio.gather(*(write(name, query, rows) for name, (query, rows) in partitions.items() if rows))
+
+    async def load_nodes(self, nodes: Iterable[Dict[str, Any]], stats: Optional[LoadStats] = None) -> LoadStats:
+        stats = stats or LoadStats()
+        partitions: Dict[str, Tuple[str, List]] = {}
+        for node in nodes:
+            label = _identifier(node.get("type") or "Concept")
+            if label not in partitions:
+                partitions[label] = (NODE_QUERY.format(label=label), [])
+            props = {k: v for k, v in node.items() if k not in ("id", "type") and v is not None}
+            partitions[label][1].append({"id": node["id"], "props": props})
+        await self._write_partitions(partitions, stats)
+        return stats
+
+    async def load_relationships(self, relationships: Iterable[Dict[str, Any]], stats: Optional[LoadStats] = None) -> LoadStats:
+        stats = stats or LoadStats()
+        partitions: Dict[str, Tuple[str, List]] = {}
+        for rel in relationships:
+            rel_type = _identifier(rel["type"])
+            if rel_type not in partitions:
+                partitions[rel_type] = (RELATIONSHIP_QUERY.format(type=rel_type), [])
+            partitions[rel_type][1].append(
+                {"from": rel["from"], "to": rel["to"], "strength": float(rel.get("strength", 1.0))}
+            )
+        # Types share endpoint nodes; running them one at a time avoids lock waits between partitions
+        await self._write_partitions(partitions, stats, concurrency=1)
+        return stats
+
+    async def sync_masteries(self, rows: List[Dict[str, Any]], stats: Optional[LoadStats] = None) -> LoadStats:
+        """Upsert ``{user_id, concept_id, mastery_level, confidence, updated_at}`` rows.
+
+        Users are spread over ``concurrency`` partitions by hash, so one
+        user's rows always go through the same session in order. Rows older
+        than what the graph already holds are ignored.
+        """
+        stats = stats or LoadStats()
+        buckets: Dict[str, Tuple[str, List]] = {}
+        for row in rows:
+            bucket = f"mastery-{zlib.crc32(str(row['user_id']).encode()) % self.concurrency}"
+            buckets.setdefault(bucket, (MASTERY_QUERY, []))[1].append(row)
+        await self._write_partitions(buckets, stats)
+        return stats
+
+    async def load(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Full load of ``{"nodes", "relationships", "user_knowledge"}``"""
+        started = time.perf_counter()
+        await self.ensure_constraints()
+        stats = LoadStats()
+        await self.load_nodes(data.get("nodes", []), stats)
+        await self.load_relationships(data.get("relationships", []), stats)
+        now = time.time()
+        await self.sync_masteries(
+            [
+                {
+                    "user_id": str(entry["user_id"]),
+                    "concept_id": mastery["concept_id"],
+                    "mastery_level": float(mastery["mastery_level"]),
+                    "confidence": float(mastery.get("confidence", 1.0)),
+                    "updated_at": now,
+                }
+                for entry in data.get("user_knowledge", [])
+                for mastery in entry.get("concept_masteries", [])
+            ],
+            stats,
+        )
+        stats.seconds = time.perf_counter() - started
+        return stats.to_dict()
+
+
+class MasterySync:
+    """Incremental mastery sync: coalesces changes and upserts them in batches.
+
+    Only the latest value per ``(user, concept)`` is kept between flushes,
+    so a burst of updates to one concept becomes a single row.
+    """
+
+    def __init__(self, interval: float = settings.GRAPH_SYNC_INTERVAL_SECONDS):
+        self.interval = interval
+        self.loader: Optional[GraphBulkLoader] = None
+        self._driver = None
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.rows_synced = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def record(self, user_id: str, updates: Iterable[Dict[str, Any]]):
+        """Planner listener: queue mastery changes for the next flush"""
+        now = time.time()
+        for update in updates:
+            self._pending[(user_id, update["concept_id"])] = {
+                "user_id": user_id,
+                "concept_id": update["concept_id"],
+                "mastery_level": float(update["mastery_level"]),
+                "confidence": float(update.get("confidence", 1.0)),
+                "updated_at": now,
+            }
+
+    async def flush(self):
+        if not self._pending or self.loader is None:
+            return
+        rows, self._pending = list(self._pending.values()), {}
+        try:
+            stats = await self.loader.sync_masteries(rows)
+        except Exception:
+            # Keep the rows for the next attempt unless newer values arrived meanwhile
+            for row in rows:
+                self._pending.setdefault((row["user_id"], row["concept_id"]), row)
+            self.failures += 1
+            logger.exception("Mastery sync of %d rows failed", len(rows))
+            return
+        self.rows_synced += stats.rows
+        self.flushes += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self, driver=None):
+        """Start syncing through ``driver``, or a new driver for the configured Neo4j"""
+        if self._task is not None:
+            return
+        if driver is None:
+            from neo4j import AsyncGraphDatabase  # only needed when syncing to Neo4j
+
+            driver = self._driver = AsyncGraphDatabase.driver(
+                settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+            )
+        self.loader = GraphBulkLoader(driver)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        if self._driver is not None:
+            await self._driver.close()
+            self._driver = None
+
+    def metrics(self) -> Dict:
+        return {
+            "enabled": self._task is not None,
+            "pending": len(self._pending),
+            "rows_synced": self.rows_synced,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+def generate_knowledge_graph(concepts: int, users: int, masteries_per_user: int = 20, seed: int = 7) -> Dict[str, Any]:
+    """A larger graph in the demo-data shape, for load testing"""
+    rng = random.Random(seed)
+    types = list(NODE_TYPES)
+    nodes = [
+        {"id": f"node_{i}", "type": types[0] if i % 10 else rng.choice(types[1:]), "name": f"Node {i}", "difficulty": round(rng.random(), 2)}
+        for i in range(concepts)
+    ]
+    relationships = [
+        {"from": f"node_{i}", "to": f"node_{rng.randrange(i)}", "type": rng.choice(["REQUIRES", "INCLUDES", "BUILDS_ON", "USES"]), "strength": round(rng.uniform(0.3, 1.0), 2)}
+        for i in range(1, concepts)
+        for _ in range(2)
+    ]
+    user_knowledge = [
+        {
+            "user_id": f"user_{u}",
+            "concept_masteries": [
+                {"concept_id": f"node_{c}", "mastery_level": round(rng.random(), 2), "confidence": round(rng.random(), 2)}
+                for c in rng.sample(range(concepts), min(masteries_per_user, concepts))
+            ],
+        }
+        for u in range(users)
+    ]
+    return {"nodes": nodes, "relationships": relationships, "user_knowledge": user_knowledge}
+
+
+async def _main(args):
+    if args.concepts:
+        data = generate_knowledge_graph(args.concepts, args.users, args.masteries_per_user)
+    else:
+        with open(args.source, "r", encoding="utf-8") as f:
+            data = json.load(f)["knowledge_graph"]
+
+    if args.fake:
+        from app.services.fake_graph_driver import FakeGraphDriver
+
+        driver = FakeGraphDriver(latency=args.fake_latency_ms / 1000)
+    else:
+        from neo4j import AsyncGraphDatabase
+
+        driver = AsyncGraphDatabase.driver(settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD))
+    try:
+        loader = GraphBulkLoader(driver, batch_size=args.batch_size, concurrency=args.concurrency)
+        print(json.dumps(await loader.load(data), indent=2))
+    finally:
+        await driver.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk load the knowledge graph into Neo4j")
+    parser.add_argument("--source", default=settings.DEMO_DATA_PATH, help="demo_data.json to read the graph from")
+    parser.add_argument("--concepts", type=int, default=0, help="Generate a graph with this many nodes instead")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--masteries-per-user", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=settings.GRAPH_LOAD_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.GRAPH_LOAD_CONCURRENCY)
+    parser.add_argument("--fake", action="store_true", help="Write to the in-memory driver instead of Neo4j")
+    parser.add_argument("--fake-latency-ms", type=float, default=2.0, help="Simulated round trip per statement")
+    args = parser.parse_args(argv)
+    if not args.concepts and not os.path.exists(args.source):
+        parser.error(f"{args.source} not found; run scripts/create_demo_data.py or pass --concepts to generate a graph")
+    asyncio.run(_main(args))
+
+
+# Global mastery sync (started when GRAPH_SYNC_ENABLED is set)
+mastery_sync = MasterySync()
+
+
+if __name__ == "__main__":
+    main()
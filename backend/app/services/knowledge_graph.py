@@ -0,0 +1,276 @@
+"""
+Knowledge Graph Engine for NeuroLynxEdu AI
+In-process CSR adjacency over concepts, skills and learning objectives
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.services.demo_data import load_knowledge_graph
+
+logger = logging.getLogger(__name__)
+
+# Node labels loaded from Neo4j
+NODE_TYPES = ("Concept", "Skill", "LearningObjective")
+
+# Relationship types whose source is learned before its target ("statistics
+# SUPPORTS understand_ml"). Every other type points from the dependent to its
+# prerequisite ("neural_networks REQUIRES gradient_descent").
+PREREQUISITE_SOURCE_TYPES = frozenset({"ENABLES", "SUPPORTS"})
+
+NEO4J_NODE_QUERY = """
+MATCH (n) WHERE n.id IS NOT NULL AND any(label IN labels(n) WHERE label IN $labels)
+RETURN n.id AS id, [label IN labels(n) WHERE label IN $labels][0] AS type, properties(n) AS props
+"""
+NEO4J_EDGE_QUERY = """
+MATCH (a)-[r]->(b)
+WHERE any(label IN labels(a) WHERE label IN $labels) AND any(label IN labels(b) WHERE label IN $labels)
+RETURN a.id AS from, b.id AS to, type(r) AS type, coalesce(r.strength, 1.0) AS strength
+"""
+
+
+def _csr(n: int, rows: np.ndarray, cols: np.ndarray, *payload: np.ndarray):
+    """Offsets plus row-sorted columns and payload arrays"""
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return (offsets, cols[order]) + tuple(p[order] for p in payload)
+
+
+def _gather(offsets: np.ndarray, values: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenated CSR rows of several nodes"""
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return values[:0]
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return values[positions]
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+class KnowledgeGraph:
+    """Immutable prerequisite graph with integer node ids.
+
+    Edges are normalised to point from prerequisite to dependent and kept
+    twice in CSR form: ``out_*`` lists a node's dependents, ``in_*`` its
+    prerequisites, each with the relationship ``strength`` as weight. A
+    topological rank is computed once at build time, so every traversal
+    result comes back already in learning order. Traversals are cached per
+    graph; loading a new graph replaces the cache with it.
+    """
+
+    def __init__(self, data: Dict[str, Any], cache_size: int = settings.KNOWLEDGE_GRAPH_CACHE_SIZE):
+        nodes = data.get("nodes", [])
+        self.ids: List[str] = [node["id"] for node in nodes]
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.nodes = nodes
+        self.size = n = len(nodes)
+        self.type_names = sorted({node.get("type", "") for node in nodes})
+        type_codes = {name: i for i, name in enumerate(self.type_names)}
+        self.node_types = np.array([type_codes[node.get("type", "")] for node in nodes], dtype=np.int16)
+        self.difficulty = np.array([float(node.get("difficulty", 0.5)) for node in nodes], dtype=np.float32)
+
+        sources, targets, weights, relations = [], [], [], []
+        self.dropped_edges = 0
+        for rel in data.get("relationships", []):
+            a, b = self.index.get(rel["from"]), self.index.get(rel["to"])
+            if a is None or b is None:
+                self.dropped_edges += 1
+                continue
+            if rel["type"] not in PREREQUISITE_SOURCE_TYPES:
+                a, b = b, a
+            sources.append(a)
+            targets.append(b)
+            weights.append(float(rel.get("strength", 1.0)))
+            relations.append(rel["type"])
+        self.relation_names = sorted(set(relations))
+        relation_codes = {name: i for i, name in enumerate(self.relation_names)}
+
+        src = np.array(sources, dtype=np.int32)
+        dst = np.array(targets, dtype=np.int32)
+        weight = np.array(weights, dtype=np.float32)
+        relation = np.array([relation_codes[r] for r in relations], dtype=np.int16)
+        self.edge_count = len(src)
+        self.out_offsets, self.out_targets, self.out_weights, self.out_relations = _csr(n, src, dst, weight, relation)
+        self.in_offsets, self.in_sources, self.in_weights, self.in_relations = _csr(n, dst, src, weight, relation)
+
+        self.order, self.cyclic_nodes = self._topological_sort()
+        self.rank = np.empty(n, dtype=np.int32)
+        self.rank[self.order] = np.arange(n, dtype=np.int32)
+        self.cache = LRUCache(cache_size)
+
+    def _topological_sort(self):
+        """Kahn's algorithm, easier nodes first among those ready"""
+        indegree = np.diff(self.in_offsets).tolist()
+        offsets, targets = self.out_offsets.tolist(), self.out_targets.tolist()
+        difficulty = self.difficulty.tolist()
+        ready = [(difficulty[i], i) for i in range(self.size) if indegree[i] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, node = heapq.heappop(ready)
+            order.append(node)
+            for nxt in targets[offsets[node]:offsets[node + 1]]:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    heapq.heappush(ready, (difficulty[nxt], nxt))
+        cyclic = 0
+        if len(order) < self.size:
+            placed = set(order)
+            rest = sorted((i for i in range(self.size) if i not in placed), key=lambda i: (difficulty[i], i))
+            cyclic = len(rest)
+            logger.warning("Knowledge graph has %d nodes on prerequisite cycles; ordering them by difficulty", cyclic)
+            order.extend(rest)
+        return _frozen(np.array(order, dtype=np.int32)), cyclic
+
+    # Traversal
+
+    def _reach(self, offsets: np.ndarray, neighbours: np.ndarray, start: np.ndarray) -> np.ndarray:
+        seen = np.zeros(self.size, dtype=bool)
+        seen[start] = True
+        frontier = start
+        while len(frontier):
+            found = _gather(offsets, neighbours, frontier)
+            found = np.unique(found[~seen[found]])
+            seen[found] = True
+            frontier = found
+        return np.flatnonzero(seen)
+
+    def _in_order(self, nodes: np.ndarray) -> np.ndarray:
+        return _frozen(nodes[np.argsort(self.rank[nodes], kind="stable")].astype(np.int32))
+
+    def _cached(self, key, compute) -> np.ndarray:
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.set(key, result)
+        return result
+
+    def ancestors(self, node: int) -> np.ndarray:
+        """Every transitive prerequisite of a node, in learning order"""
+        def compute():
+            found = self._reach(self.in_offsets, self.in_sources, np.array([node]))
+            return self._in_order(found[found != node])
+        return self._cached(("ancestors", node), compute)
+
+    def descendants(self, node: int) -> np.ndarray:
+        """Every node that transitively depends on this one, in learning order"""
+        def compute():
+            found = self._reach(self.out_offsets, self.out_targets, np.array([node]))
+            return self._in_order(found[found != node])
+        return self._cached(("descendants", node), compute)
+
+    def prerequisites(self, node: int) -> np.ndarray:
+        """Direct prerequisites"""
+        return self._in_order(self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]])
+
+    def dependents(self, node: int) -> np.ndarray:
+        """Direct dependents"""
+        return self._in_order(self.out_targets[self.out_offsets[node]:self.out_offsets[node + 1]])
+
+    def prerequisite_closure(self, nodes: Iterable[int]) -> np.ndarray:
+        """The given nodes plus all their prerequisites, in learning order"""
+        key = tuple(sorted(set(int(i) for i in nodes)))
+        return self._cached(
+            ("closure", key),
+            lambda: self._in_order(self._reach(self.in_offsets, self.in_sources, np.array(key, dtype=np.int64))),
+        )
+
+    def topological_order(self, nodes: Optional[Iterable[int]] = None) -> np.ndarray:
+        if nodes is None:
+            return self.order
+        return self._in_order(np.fromiter(nodes, dtype=np.int32))
+
+    # Lookup helpers
+
+    def node_index(self, node_id: str) -> Optional[int]:
+        return self.index.get(node_id)
+
+    def describe(self, nodes: Iterable[int]) -> List[Dict[str, Any]]:
+        return [
+            {"id": self.ids[i], "name": self.nodes[i].get("name", self.ids[i]), "type": self.nodes[i].get("type")}
+            for i in (int(i) for i in nodes)
+        ]
+
+    def metrics(self) -> Dict:
+        return {
+            "nodes": self.size,
+            "edges": self.edge_count,
+            "dropped_edges": self.dropped_edges,
+            "cyclic_nodes": self.cyclic_nodes,
+            "cached_results": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+
+def fetch_from_neo4j(
+    uri: str = settings.NEO4J_URI,
+    user: str = settings.NEO4J_USER,
+    password: str = settings.NEO4J_PASSWORD,
+) -> Dict[str, Any]:
+    """Read the graph from Neo4j into the demo-data JSON shape"""
+    from neo4j import GraphDatabase  # only needed when the graph comes from Neo4j
+
+    with GraphDatabase.driver(uri, auth=(user, password)) as driver:
+        node_records = driver.execute_query(NEO4J_NODE_QUERY, labels=list(NODE_TYPES)).records
+        edge_records = driver.execute_query(NEO4J_EDGE_QUERY, labels=list(NODE_TYPES)).records
+    nodes = [{**record["props"], "id": record["id"], "type": record["type"]} for record in node_records]
+    relationships = [
+        {"from": record["from"], "to": record["to"], "type": record["type"], "strength": record["strength"]}
+        for record in edge_records
+    ]
+    return {"nodes": nodes, "relationships": relationships}
+
+
+class KnowledgeGraphService:
+    """Holds the current graph; a reload builds a new one and swaps it in"""
+
+    def __init__(self):
+        self.graph = KnowledgeGraph({})
+        self.source: Optional[str] = None
+        self.load_duration = 0.0
+        self._listeners: List[Callable[[KnowledgeGraph], None]] = []
+
+    def add_listener(self, listener: Callable[[KnowledgeGraph], None]):
+        """Register a callback run on each newly built graph before it is swapped in"""
+        self._listeners.append(listener)
+
+    def load(self, data: Dict[str, Any], source: str = "json") -> KnowledgeGraph:
+        started = time.perf_counter()
+        graph = KnowledgeGraph(data)
+        for listener in self._listeners:
+            listener(graph)
+        self.graph, self.source = graph, source
+        self.load_duration = time.perf_counter() - started
+        logger.info("Loaded knowledge graph from %s: %d nodes, %d edges", source, graph.size, graph.edge_count)
+        return graph
+
+    async def reload(self, source: str = settings.KNOWLEDGE_GRAPH_SOURCE) -> KnowledgeGraph:
+        """Load from Neo4j or the demo data; falls back to the demo data if Neo4j fails"""
+        if source == "neo4j":
+            try:
+                data = await asyncio.to_thread(fetch_from_neo4j)
+                return await asyncio.to_thread(self.load, data, "neo4j")
+            except Exception as e:
+                logger.warning("Could not load knowledge graph from Neo4j, using demo data: %s", e)
+        return await asyncio.to_thread(lambda: self.load(load_knowledge_graph(), "json"))
+
+    def metrics(self) -> Dict:
+        return {"source": self.source, "load_ms": round(self.load_duration * 1000, 3), **self.graph.metrics()}
+
+
+# Global knowledge graph service
+knowledge_graph = KnowledgeGraphService()
@@ -0,0 +1,339 @@
+"""
+Knowledge Tracing for NeuroLynxEdu AI
+Vectorised Bayesian Knowledge Tracing over a users x concepts mastery matrix
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.demo_data import load_knowledge_graph
+from app.services.knowledge_graph import KnowledgeGraphService, knowledge_graph
+
+logger = logging.getLogger(__name__)
+
+# Evidence (attention-weighted answers) at which confidence reaches 0.5
+CONFIDENCE_HALF_EVIDENCE = 3.0
+# Answers given with less attention than this still count this much
+MIN_ATTENTION_WEIGHT = 0.2
+_P_MIN, _P_MAX = 1e-4, 1 - 1e-4
+
+Listener = Callable[[str, List[Dict[str, Any]]], None]
+
+
+class KnowledgeTracer:
+    """Bayesian Knowledge Tracing with attention-weighted evidence.
+
+    ``mastery`` holds P(known) and ``evidence`` the accumulated answer
+    weight per (user, concept), both dense float32 with spare capacity on
+    each axis. Per-concept learn/slip/guess parameters come from the
+    defaults, with the learn rate scaled down for difficult concepts.
+
+    Each answer moves P(known) towards its Bayesian posterior by its
+    weight (the learner's attention when answering), then applies the
+    learning transition scaled the same way. A batch is sorted by
+    (user, concept) and applied in rounds: round k updates the k-th answer
+    of every pair at once. Pairs are distinct within a round, so the
+    scatter is safe and a pair's answers keep their order.
+
+    Snapshots are ``.npy`` files that are memory-mapped copy-on-write at
+    startup, so a restart reads only the pages it touches.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.KNOWLEDGE_TRACING_DIR,
+        graphs: KnowledgeGraphService = knowledge_graph,
+        p_init: float = settings.BKT_P_INIT,
+        p_learn: float = settings.BKT_P_LEARN,
+        p_slip: float = settings.BKT_P_SLIP,
+        p_guess: float = settings.BKT_P_GUESS,
+        snapshot_interval: float = settings.KNOWLEDGE_TRACING_SNAPSHOT_SECONDS,
+        max_new_users: int = settings.KNOWLEDGE_TRACING_MAX_NEW_USERS,
+    ):
+        self.directory = directory
+        self.max_new_users = max_new_users
+        self.graphs = graphs
+        self.p_init = p_init
+        self.defaults = (p_learn, p_slip, p_guess)
+        self.snapshot_interval = snapshot_interval
+
+        self.user_ids: List[str] = []
+        self.user_index: Dict[str, int] = {}
+        self.concept_ids: List[str] = []
+        self.concept_index: Dict[str, int] = {}
+        self.mastery = np.full((16, 16), p_init, dtype=np.float32)
+        self.evidence = np.zeros((16, 16), dtype=np.float32)
+        self.params = np.zeros((3, 16), dtype=np.float32)  # learn, slip, guess per concept
+        self._listeners: List[Listener] = []
+        self._dirty = False
+        self._generation = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.answers_applied = 0
+        self.batches = 0
+        self.last_batch_duration = 0.0
+        self.last_snapshot_duration = 0.0
+
+    def add_listener(self, listener: Listener):
+        """Register a callback receiving (user_id, mastery updates) after each batch"""
+        self._listeners.append(listener)
+
+    # Index management
+
+    def _grow(self, rows: int, cols: int):
+        old_rows, old_cols = self.mastery.shape
+        if rows <= old_rows and cols <= old_cols:
+            return
+        shape = (max(rows, old_rows * 2) if rows > old_rows else old_rows,
+                 max(cols, old_cols * 2) if cols > old_cols else old_cols)
+        mastery = np.full(shape, self.p_init, dtype=np.float32)
+        evidence = np.zeros(shape, dtype=np.float32)
+        params = np.zeros((3, shape[1]), dtype=np.float32)
+        mastery[:old_rows, :old_cols] = self.mastery
+        evidence[:old_rows, :old_cols] = self.evidence
+        params[:, :old_cols] = self.params
+        self.mastery, self.evidence, self.params = mastery, evidence, params
+
+    def _concept_params(self, concept_id: str) -> Tuple[float, float, float]:
+        p_learn, p_slip, p_guess = self.defaults
+        graph = self.graphs.graph
+        index = graph.node_index(concept_id)
+        if index is not None:
+            p_learn *= 1.5 - float(graph.difficulty[index])
+        return p_learn, p_slip, p_guess
+
+    def user_row(self, user_id: str) -> int:
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = self.user_index[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self._grow(row + 1, len(self.concept_ids))
+        return row
+
+    def concept_column(self, concept_id: str) -> int:
+        col = self.concept_index.get(concept_id)
+        if col is None:
+            col = self.concept_index[concept_id] = len(self.concept_ids)
+            self.concept_ids.append(concept_id)
+            self._grow(len(self.user_ids), col + 1)
+            self.params[:, col] = self._concept_params(concept_id)
+        return col
+
+    # Updates
+
+    def apply(self, rows: np.ndarray, cols: np.ndarray, correct: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Apply answers given as index arrays in arrival order; returns the touched flat cells"""
+        started = time.perf_counter()
+        n = len(rows)
+        if not n:
+            return np.zeros(0, dtype=np.int64)
+        width = self.mastery.shape[1]
+        keys = rows.astype(np.int64) * width + cols
+        position = np.arange(n)
+        # Tie-breaking on position keeps arrival order without a (much slower) stable sort
+        order = np.argsort(keys * n + position)
+        sorted_keys = keys[order]
+        first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        rank = position - np.maximum.accumulate(np.where(first, position, 0))
+        by_round = order if not rank.any() else order[np.argsort(rank * n + position)]
+
+        mastery = self.mastery.reshape(-1)
+        evidence = self.evidence.reshape(-1)
+        learn, slip, guess = self.params
+        lo = 0
+        for size in np.bincount(rank):
+            batch = by_round[lo:lo + size]
+            lo += size
+            cells, k, w = keys[batch], cols[batch], weights[batch]
+            p = mastery[cells]
+            s, g = slip[k], guess[k]
+            right = correct[batch]
+            likely = np.where(right, p * (1 - s), p * s)
+            posterior = likely / (likely + np.where(right, (1 - p) * g, (1 - p) * (1 - g)))
+            p = p + w * (posterior - p)
+            p = p + (1 - p) * learn[k] * w
+            mastery[cells] = np.clip(p, _P_MIN, _P_MAX)
+            evidence[cells] += w
+
+        self._dirty = True
+        self.answers_applied += n
+        self.batches += 1
+        self.last_batch_duration = time.perf_counter() - started
+        return sorted_keys[first]
+
+    def check_answers(self, answers: List[Dict[str, Any]]):
+        """Reject a batch on concepts outside the graph or adding more than ``max_new_users`` users.
+
+        Every new user or concept is a row or column of the dense matrices,
+        kept in every snapshot from then on.
+        """
+        graph = self.graphs.graph
+        concepts = {a["concept_id"] for a in answers}
+        unknown = sorted(c for c in concepts if c not in self.concept_index and graph.node_index(c) is None)
+        if unknown:
+            raise ValueError(f"Unknown concepts: {', '.join(unknown[:10])}")
+        new_users = {str(a["user_id"]) for a in answers}.difference(self.user_index)
+        if len(new_users) > self.max_new_users:
+            raise ValueError(f"{len(new_users)} new users in one batch, at most {self.max_new_users} allowed")
+
+    def record_answers(self, answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply ``{user_id, concept_id, correct, attention}`` answers (attention 0-100, optional)"""
+        self.check_answers(answers)
+        rows = np.fromiter((self.user_row(str(a["user_id"])) for a in answers), dtype=np.int64, count=len(answers))
+        cols = np.fromiter((self.concept_column(a["concept_id"]) for a in answers), dtype=np.int64, count=len(answers))
+        correct = np.fromiter((bool(a["correct"]) for a in answers), dtype=bool, count=len(answers))
+        attention = np.fromiter(
+            (100.0 if a.get("attention") is None else a["attention"] for a in answers), dtype=np.float32, count=len(answers)
+        )
+        weights = np.clip(attention / 100.0, MIN_ATTENTION_WEIGHT, 1.0)
+        cells = self.apply(rows, cols, correct, weights)
+        self._notify(cells)
+        return {"answers": len(answers), "updated": len(cells), "apply_ms": round(self.last_batch_duration * 1000, 3)}
+
+    def _notify(self, cells: np.ndarray):
+        if not self._listeners or not len(cells):
+            return
+        width = self.mastery.shape[1]
+        rows, cols = np.divmod(cells, width)
+        mastery = self.mastery.reshape(-1)[cells]
+        confidence = self._confidence(self.evidence.reshape(-1)[cells])
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        for lo, hi in zip(starts, np.r_[starts[1:], len(cells)]):
+            user_id = self.user_ids[rows[lo]]
+            updates = [
+                {"concept_id": self.concept_ids[c], "mastery_level": float(m), "confidence": float(f)}
+                for c, m, f in zip(cols[lo:hi].tolist(), mastery[lo:hi].tolist(), confidence[lo:hi].tolist())
+            ]
+            for listener in self._listeners:
+                listener(user_id, updates)
+
+    @staticmethod
+    def _confidence(evidence: np.ndarray) -> np.ndarray:
+        return evidence / (evidence + CONFIDENCE_HALF_EVIDENCE)
+
+    def seed(self, user_knowledge: List[Dict[str, Any]]):
+        """Start users from known mastery levels (the demo-data ``user_knowledge`` shape)"""
+        for entry in user_knowledge:
+            row = self.user_row(str(entry["user_id"]))
+            for item in entry.get("concept_masteries", []):
+                col = self.concept_column(item["concept_id"])
+                confidence = min(float(item.get("confidence", 0.5)), 0.99)
+                self.mastery[row, col] = np.clip(item["mastery_level"], _P_MIN, _P_MAX)
+                self.evidence[row, col] = CONFIDENCE_HALF_EVIDENCE * confidence / (1 - confidence)
+        self._dirty = True
+
+    def user_mastery(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        row = self.user_index.get(user_id)
+        if row is None:
+            return None
+        count = len(self.concept_ids)
+        evidence = self.evidence[row, :count]
+        seen = np.flatnonzero(evidence > 0)
+        confidence = self._confidence(evidence[seen])
+        return [
+            {"concept_id": self.concept_ids[c], "mastery_level": round(float(self.mastery[row, c]), 4), "confidence": round(float(f), 4)}
+            for c, f in zip(seen.tolist(), confidence.tolist())
+        ]
+
+    # Snapshots
+
+    def _path(self, name: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{name}.{generation}.npy")
+
+    def snapshot(self):
+        """Write the used part of the matrices, then switch the index to the new generation"""
+        started = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self._generation + 1
+        users, concepts = len(self.user_ids), len(self.concept_ids)
+        self._dirty = False
+        np.save(self._path("mastery", generation), self.mastery[:users, :concepts])
+        np.save(self._path("evidence", generation), self.evidence[:users, :concepts])
+        np.save(self._path("params", generation), self.params[:, :concepts])
+        index = os.path.join(self.directory, "index.json")
+        with open(index + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "users": self.user_ids[:users], "concepts": self.concept_ids[:concepts]}, f)
+        os.replace(index + ".tmp", index)
+        for path in glob.glob(os.path.join(self.directory, "*.npy")):
+            if not path.endswith(f".{generation}.npy"):
+                os.remove(path)
+        self._generation = generation
+        self.last_snapshot_duration = time.perf_counter() - started
+
+    def load(self) -> bool:
+        """Map the latest snapshot, if any; pages are read lazily and copied on first write"""
+        index = os.path.join(self.directory, "index.json")
+        if not os.path.exists(index):
+            return False
+        with open(index, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        generation = meta["generation"]
+        self.mastery = np.load(self._path("mastery", generation), mmap_mode="c")
+        self.evidence = np.load(self._path("evidence", generation), mmap_mode="c")
+        self.params = np.load(self._path("params", generation), mmap_mode="c")
+        self.user_ids, self.concept_ids = meta["users"], meta["concepts"]
+        self.user_index = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        self.concept_index = {concept_id: i for i, concept_id in enumerate(self.concept_ids)}
+        self._generation = generation
+        logger.info("Mapped knowledge tracing snapshot: %d users x %d concepts", len(self.user_ids), len(self.concept_ids))
+        return True
+
+    async def restore(self) -> bool:
+        """Map the latest snapshot; without one, seed from the demo masteries. True if mapped"""
+        if await asyncio.to_thread(self.load):
+            return True
+        data = await asyncio.to_thread(load_knowledge_graph, settings.DEMO_DATA_PATH, ("user_knowledge",))
+        self.seed(data["user_knowledge"])
+        return False
+
+    def user_knowledge(self) -> List[Dict[str, Any]]:
+        """Every user's traced masteries in the demo-data ``user_knowledge`` shape"""
+        return [{"user_id": user_id, "concept_masteries": self.user_mastery(user_id)} for user_id in self.user_ids]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self._dirty:
+                try:
+                    await asyncio.to_thread(self.snapshot)
+                except Exception:
+                    logger.exception("Knowledge tracing snapshot failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dirty:
+            await asyncio.to_thread(self.snapshot)
+
+    def metrics(self) -> Dict:
+        return {
+            "users": len(self.user_ids),
+            "concepts": len(self.concept_ids),
+            "capacity": list(self.mastery.shape),
+            "answers_applied": self.answers_applied,
+            "batches": self.batches,
+            "last_batch_ms": round(self.last_batch_duration * 1000, 3),
+            "snapshot_generation": self._generation,
+            "last_snapshot_ms": round(self.last_snapshot_duration * 1000, 3),
+        }
+
+
+# Global knowledge tracer
+knowledge_tracer = KnowledgeTracer()
@@ -0,0 +1,327 @@
+"""
+Learning Path Planner for NeuroLynxEdu AI
+Next-best concepts and prerequisite paths from per-user concept mastery
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.services.demo_data import load_knowledge_graph
+from app.services.graph_centrality import GraphCentrality, graph_centrality
+from app.services.knowledge_graph import KnowledgeGraph, KnowledgeGraphService, knowledge_graph
+
+logger = logging.getLogger(__name__)
+
+# Node types a learner studies; objectives are only ever targets
+LEARNABLE_TYPES = ("Concept", "Skill")
+
+# Users planned per vectorised step (bounds the users x edges temporary)
+BATCH_ROWS = 2048
+
+
+class LearningPathPlanner:
+    """Plans what each user should learn next over the knowledge graph.
+
+    Mastery is a users x nodes matrix of ``mastery_level * confidence``; a
+    node counts as mastered at ``mastery_threshold``. A node's readiness is
+    the strength-weighted mean mastery of its direct prerequisites, and the
+    next-best concepts are the unmastered learnable nodes ranked by
+    readiness, remaining mastery and importance (precomputed PageRank, so
+    foundational concepts come first). A path to an
+    objective is its prerequisite closure in learning order, keeping only
+    nodes linked to the objective by a chain of strength at least
+    ``min_strength`` and dropping what the user has mastered.
+
+    Plans are cached per user as index arrays, turned into response dicts
+    only when read, and dropped when that user's mastery changes or the
+    graph is reloaded. ``plan_all`` fills the cache for every user in one
+    vectorised pass.
+    """
+
+    def __init__(
+        self,
+        graphs: KnowledgeGraphService = knowledge_graph,
+        mastery_threshold: float = settings.LEARNING_PATH_MASTERY_THRESHOLD,
+        min_strength: float = settings.LEARNING_PATH_MIN_STRENGTH,
+        cache_size: int = settings.LEARNING_PATH_CACHE_SIZE,
+        centrality: GraphCentrality = graph_centrality,
+    ):
+        self.graphs = graphs
+        self.centrality = centrality
+        self.mastery_threshold = mastery_threshold
+        self.min_strength = min_strength
+        # user -> node id -> (mastery_level, confidence); survives graph reloads
+        self._levels: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self.user_ids: List[str] = []
+        self.user_index: Dict[str, int] = {}
+        self._mastery = np.zeros((0, 0), dtype=np.float32)
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._graph: Optional[KnowledgeGraph] = None
+        self._node_terms: Dict[str, np.ndarray] = {}
+        self.cache = LRUCache(cache_size)
+        # plans for users with no mastery rows, shared since they are all-zero
+        self._unknown_plans: Dict = {}
+        self._listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+
+        self.batch_runs = 0
+        self.last_batch_duration = 0.0
+        self.invalidations = 0
+
+    # Mastery state
+
+    def _sync_graph(self) -> KnowledgeGraph:
+        """Rebuild the matrix columns when a new graph has been loaded"""
+        graph = self.graphs.graph
+        if graph is self._graph:
+            return graph
+        self._graph = graph
+        self._mastery = np.zeros((max(len(self.user_ids), 1) * 2, graph.size), dtype=np.float32)
+        for row, user_id in enumerate(self.user_ids):
+            self._fill_row(graph, row, self._levels[user_id])
+        self._node_terms = self._graph_terms(graph)
+        self.cache.clear()
+        self._unknown_plans = {}
+        return graph
+
+    def _graph_terms(self, graph: KnowledgeGraph) -> Dict[str, np.ndarray]:
+        """User-independent per-node terms of the ranking"""
+        targets = np.repeat(np.arange(graph.size), np.diff(graph.in_offsets))
+        learnable_codes = [i for i, name in enumerate(graph.type_names) if name in LEARNABLE_TYPES]
+        return {
+            "importance": (1 + self.centrality.scores(graph).importance).astype(np.float32),
+            "prerequisite_weight": np.bincount(targets, weights=graph.in_weights, minlength=graph.size),
+            "learnable": np.isin(graph.node_types, learnable_codes),
+        }
+
+    def _fill_row(self, graph: KnowledgeGraph, row: int, levels: Dict[str, Tuple[float, float]]):
+        self._mastery[row] = 0
+        for node_id, (level, confidence) in levels.items():
+            index = graph.node_index(node_id)
+            if index is not None:
+                self._mastery[row, index] = level * confidence
+
+    def _row(self, user_id: str) -> int:
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.user_index[user_id] = row
+            self._levels[user_id] = {}
+            if row >= len(self._mastery):
+                grown = np.zeros((max(2 * len(self._mastery), 16), self._mastery.shape[1]), dtype=np.float32)
+                grown[:len(self._mastery)] = self._mastery
+                self._mastery = grown
+            if row >= len(self._versions):
+                self._versions = np.concatenate([self._versions, np.zeros(max(len(self._versions), 16), dtype=np.int64)])
+        return row
+
+    def add_listener(self, listener: Callable[[str, List[Dict[str, Any]]], None]):
+        """Register a callback receiving (user_id, updates) after each mastery change"""
+        self._listeners.append(listener)
+
+    def set_mastery(self, user_id: str, updates: Iterable[Dict[str, Any]]):
+        """Apply ``{"concept_id", "mastery_level", "confidence"}`` records and drop the user's cached plans"""
+        graph = self._sync_graph()
+        row = self._row(user_id)
+        levels = self._levels[user_id]
+        updates = list(updates)
+        for update in updates:
+            levels[update["concept_id"]] = (float(update["mastery_level"]), float(update.get("confidence", 1.0)))
+        self._fill_row(graph, row, levels)
+        self._versions[row] += 1
+        self.cache.pop(user_id)
+        self.invalidations += 1
+        for listener in self._listeners:
+            listener(user_id, updates)
+
+    def load_user_knowledge(self, user_knowledge: List[Dict[str, Any]]):
+        for entry in user_knowledge:
+            self.set_mastery(str(entry["user_id"]), entry.get("concept_masteries", []))
+
+    async def load_demo_masteries(self):
+        data = await asyncio.to_thread(load_knowledge_graph, settings.DEMO_DATA_PATH, ("user_knowledge",))
+        self.load_user_knowledge(data["user_knowledge"])
+
+    # Vectorised planning
+
+    def _readiness(self, graph: KnowledgeGraph, mastery: np.ndarray) -> np.ndarray:
+        """Strength-weighted mean prerequisite mastery; 1 where a node has none"""
+        readiness = np.ones_like(mastery)
+        has_prerequisites = np.diff(graph.in_offsets) > 0
+        if graph.edge_count:
+            # Node-major so gathers and sums run over contiguous rows
+            contributions = np.ascontiguousarray(mastery.T)[graph.in_sources] * graph.in_weights[:, None]
+            sums = np.add.reduceat(contributions, graph.in_offsets[:-1][has_prerequisites], axis=0)
+            readiness[:, has_prerequisites] = (sums / self._node_terms["prerequisite_weight"][has_prerequisites, None]).T
+        return readiness
+
+    def _next_concepts(self, graph: KnowledgeGraph, mastery: np.ndarray, limit: int) -> List[Tuple[np.ndarray, ...]]:
+        """Per user: (nodes, mastery, readiness, score) of the top ``limit`` candidates"""
+        readiness = self._readiness(graph, mastery)
+        score = readiness * (1 - mastery) * self._node_terms["importance"]
+        score[(mastery >= self.mastery_threshold) | ~self._node_terms["learnable"]] = -np.inf
+        k = min(limit, graph.size)
+        if not k:
+            empty = np.zeros(0, dtype=np.float32)
+            return [(empty.astype(np.int64), empty, empty, empty)] * len(mastery)
+        top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(score, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        columns = (
+            top,
+            np.take_along_axis(mastery, top, axis=1),
+            np.take_along_axis(readiness, top, axis=1),
+            np.take_along_axis(score, top, axis=1),
+        )
+        valid = np.isfinite(columns[3])
+        return [tuple(c[row][valid[row]] for c in columns) for row in range(len(mastery))]
+
+    def _relevance(self, graph: KnowledgeGraph, target: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Prerequisite closure of a target and each node's strongest chain strength to it"""
+        cached = graph.cache.get(("relevance", target))
+        if cached is not None:
+            return cached
+        closure = graph.prerequisite_closure([target])
+        position = {int(node): i for i, node in enumerate(closure)}
+        relevance = np.zeros(len(closure), dtype=np.float32)
+        relevance[position[target]] = 1.0
+        # Dependents come later in learning order, so walk the closure backwards
+        for i in range(len(closure) - 1, -1, -1):
+            node = int(closure[i])
+            lo, hi = graph.out_offsets[node], graph.out_offsets[node + 1]
+            for dependent, weight in zip(graph.out_targets[lo:hi].tolist(), graph.out_weights[lo:hi].tolist()):
+                j = position.get(dependent)
+                if j is not None:
+                    relevance[i] = max(relevance[i], relevance[j] * weight)
+        graph.cache.set(("relevance", target), (closure, relevance))
+        return closure, relevance
+
+    def _paths(self, graph: KnowledgeGraph, mastery: np.ndarray, target: int) -> List[Tuple[Any, ...]]:
+        """Per user: (closure positions still to learn, their mastery, mastered count, effort)"""
+        closure, relevance = self._relevance(graph, target)
+        candidates = (relevance >= self.min_strength) & self._node_terms["learnable"][closure]
+        closure_mastery = mastery[:, closure]
+        needed = candidates & (closure_mastery < self.mastery_threshold)
+        effort = np.where(needed, (1 - closure_mastery) * (0.5 + graph.difficulty[closure]), 0).sum(axis=1)
+        skipped = candidates.sum() - needed.sum(axis=1)
+        return [
+            (np.flatnonzero(needed[row]), closure_mastery[row][needed[row]], int(skipped[row]), float(effort[row]))
+            for row in range(len(mastery))
+        ]
+
+    @staticmethod
+    def _describe_next(graph: KnowledgeGraph, plan: Tuple[np.ndarray, ...]) -> List[Dict[str, Any]]:
+        nodes, mastery, readiness, score = plan
+        return [
+            {**node, "mastery": round(float(m), 3), "readiness": round(float(r), 3), "score": round(float(s), 4)}
+            for node, m, r, s in zip(graph.describe(nodes), mastery, readiness, score)
+        ]
+
+    def _describe_path(self, graph: KnowledgeGraph, target: int, plan: Tuple[Any, ...]) -> Dict[str, Any]:
+        closure, relevance = self._relevance(graph, target)
+        positions, mastery, skipped, effort = plan
+        return {
+            "steps": [
+                {**node, "mastery": round(float(m), 3), "relevance": round(float(relevance[i]), 3)}
+                for node, m, i in zip(graph.describe(closure[positions]), mastery, positions)
+            ],
+            "mastered_skipped": skipped,
+            "estimated_effort": round(effort, 3),
+        }
+
+    # Cached per-user plans
+
+    def _user_plans(self, user_id: str) -> Tuple[KnowledgeGraph, np.ndarray, Dict]:
+        """Read-only lookup; unknown users plan from a zero-mastery row without being added"""
+        graph = self._sync_graph()
+        row = self.user_index.get(user_id)
+        if row is None:
+            return graph, np.zeros((1, graph.size), dtype=np.float32), self._unknown_plans
+        plans = self.cache.get(user_id)
+        if plans is None:
+            plans = {}
+            self.cache.set(user_id, plans)
+        return graph, self._mastery[row:row + 1], plans
+
+    def next_concepts(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        graph, mastery, plans = self._user_plans(user_id)
+        key = ("next", limit)
+        if key not in plans:
+            plans[key] = self._next_concepts(graph, mastery, limit)[0]
+        return self._describe_next(graph, plans[key])
+
+    def path(self, user_id: str, objective_id: str) -> Optional[Dict[str, Any]]:
+        """Ordered steps to an objective, or None if it is not in the graph"""
+        graph, mastery, plans = self._user_plans(user_id)
+        target = graph.node_index(objective_id)
+        if target is None:
+            return None
+        key = ("path", target)
+        if key not in plans:
+            plans[key] = self._paths(graph, mastery, target)[0]
+        return self._describe_path(graph, target, plans[key])
+
+    async def plan_all(self, objective_id: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
+        """Plan next concepts (and a path to ``objective_id``) for every known user"""
+        started = time.perf_counter()
+        graph = self._sync_graph()
+        target = graph.node_index(objective_id) if objective_id else None
+        users = len(self.user_ids)
+        # Snapshot so mastery updates during the batch are not lost or mixed in
+        mastery = self._mastery[:users].copy()
+        versions = self._versions[:users].copy()
+
+        def compute():
+            next_plans: List = []
+            path_plans: List = []
+            for lo in range(0, users, BATCH_ROWS):
+                chunk = mastery[lo:lo + BATCH_ROWS]
+                next_plans.extend(self._next_concepts(graph, chunk, limit))
+                if target is not None:
+                    path_plans.extend(self._paths(graph, chunk, target))
+            return next_plans, path_plans
+
+        next_plans, path_plans = await asyncio.to_thread(compute)
+        stored = 0
+        if graph is self._graph:
+            for row, user_id in enumerate(self.user_ids[:users]):
+                if self._versions[row] != versions[row]:
+                    continue
+                plans = self.cache.get(user_id) or {}
+                plans[("next", limit)] = next_plans[row]
+                if target is not None:
+                    plans[("path", target)] = path_plans[row]
+                self.cache.set(user_id, plans)
+                stored += 1
+
+        self.batch_runs += 1
+        self.last_batch_duration = time.perf_counter() - started
+        return {
+            "users": users,
+            "cached": stored,
+            "objective_id": objective_id if target is not None else None,
+            "duration_ms": round(self.last_batch_duration * 1000, 3),
+        }
+
+    def metrics(self) -> Dict:
+        return {
+            "users": len(self.user_ids),
+            "concepts": self._mastery.shape[1],
+            "cached_users": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "invalidations": self.invalidations,
+            "batch_runs": self.batch_runs,
+            "last_batch_ms": round(self.last_batch_duration * 1000, 3),
+        }
+
+
+# Global learning path planner
+learning_planner = LearningPathPlanner()
@@ -0,0 +1,325 @@
+"""
+Learning State Classifier for NeuroLynxEdu AI
+Classifies readiness, cognitive load and stress for every live session
+"""
+
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.eeg_simulator import EEGSimulator
+from app.services.live_sessions import FIELD_INDEX, LiveSessionManager, live_session_manager
+
+STATES = ("focused", "distracted", "overloaded", "fatigued")
+SCORES = ("readiness_score", "cognitive_load", "stress_level")
+FEATURE_NAMES = (
+    "attention_mean",
+    "focus_mean",
+    "engagement_mean",
+    "cognitive_load_mean",
+    "theta_beta_ratio",
+    "alpha_beta_ratio",
+    "engagement_index",
+    "attention_var",
+    "focus_var",
+    "attention_trend",
+)
+
+STATE_ACTIONS = {
+    "focused": ("continue_learning", "medium-high"),
+    "distracted": ("switch_to_interactive_content", "medium"),
+    "overloaded": ("reduce_difficulty", "low"),
+    "fatigued": ("take_break", "low"),
+}
+
+_ATT = FIELD_INDEX["attention"]
+_FOC = FIELD_INDEX["focus"]
+_ENG = FIELD_INDEX["engagement"]
+_LOAD = FIELD_INDEX["cognitive_load"]
+_ALPHA = FIELD_INDEX["alpha"]
+_BETA = FIELD_INDEX["beta"]
+_THETA = FIELD_INDEX["theta"]
+
+
+def extract_features(windows: np.ndarray, valid: np.ndarray, sample_rate: float) -> np.ndarray:
+    """Sliding-window features for a batch of sessions.
+
+    ``windows`` is ``(sessions, window, fields)`` in chronological order and
+    ``valid`` masks the samples each session has actually produced.
+    """
+    weights = valid.astype(np.float32)
+    n_valid = np.maximum(weights.sum(axis=1), 1.0)
+
+    means = (windows * weights[..., None]).sum(axis=1) / n_valid[:, None]
+    centered = (windows - means[:, None, :]) * weights[..., None]
+    variances = (centered ** 2).sum(axis=1) / n_valid[:, None]
+
+    # Least-squares attention slope over the valid samples, per second
+    t = np.arange(windows.shape[1], dtype=np.float32)
+    t_mean = (weights * t).sum(axis=1) / n_valid
+    t_centered = (t[None, :] - t_mean[:, None]) * weights
+    denom = np.maximum((t_centered ** 2).sum(axis=1), 1e-6)
+    trend = (t_centered * centered[..., _ATT]).sum(axis=1) / denom * sample_rate
+
+    beta = np.maximum(means[:, _BETA], 1e-3)
+    theta_alpha = means[:, _THETA] + means[:, _ALPHA]
+
+    return np.stack(
+        [
+            means[:, _ATT],
+            means[:, _FOC],
+            means[:, _ENG],
+            means[:, _LOAD],
+            means[:, _THETA] / beta,
+            means[:, _ALPHA] / beta,
+            beta / np.maximum(theta_alpha, 1e-3),
+            variances[:, _ATT],
+            variances[:, _FOC],
+            trend,
+        ],
+        axis=1,
+    ).astype(np.float32)
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _with_bias(x: np.ndarray) -> np.ndarray:
+    return np.hstack([x, np.ones((x.shape[0], 1), dtype=x.dtype)])
+
+
+class LearningStateModel:
+    """Standardized linear model: softmax over states, sigmoid scores"""
+
+    def __init__(
+        self,
+        feature_mean: np.ndarray,
+        feature_std: np.ndarray,
+        state_weights: np.ndarray,
+        score_weights: np.ndarray,
+    ):
+        self.feature_mean = feature_mean.astype(np.float32)
+        self.feature_std = feature_std.astype(np.float32)
+        self.state_weights = state_weights.astype(np.float32)  # (features + 1, states)
+        self.score_weights = score_weights.astype(np.float32)  # (features + 1, scores)
+
+    def predict(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """State probabilities and 0-1 scores for a batch of feature rows"""
+        x = _with_bias((features - self.feature_mean) / self.feature_std)
+        return _softmax(x @ self.state_weights), _sigmoid(x @ self.score_weights)
+
+    @classmethod
+    def fit(
+        cls,
+        features: np.ndarray,
+        state_labels: np.ndarray,
+        score_targets: np.ndarray,
+        epochs: int = 300,
+        learning_rate: float = 0.5,
+        l2: float = 1e-3,
+    ) -> "LearningStateModel":
+        """Train on a labeled feature corpus"""
+        mean = features.mean(axis=0)
+        std = np.maximum(features.std(axis=0), 1e-6)
+        x = _with_bias((features - mean) / std).astype(np.float64)
+        n = x.shape[0]
+
+        # Softmax regression by full-batch gradient descent
+        onehot = np.eye(len(STATES))[state_labels]
+        state_weights = np.zeros((x.shape[1], len(STATES)))
+        for _ in range(epochs):
+            grad = x.T @ (_softmax(x @ state_weights) - onehot) / n
+            state_weights -= learning_rate * (grad + l2 * state_weights)
+
+        # Scores are fit in logit space with ridge regression
+        clipped = np.clip(score_targets, 0.01, 0.99)
+        logits = np.log(clipped / (1 - clipped))
+        gram = x.T @ x + l2 * n * np.eye(x.shape[1])
+        score_weights = np.linalg.solve(gram, x.T @ logits)
+
+        return cls(mean, std, state_weights, score_weights)
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            feature_mean=self.feature_mean,
+            feature_std=self.feature_std,
+            state_weights=self.state_weights,
+            score_weights=self.score_weights,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LearningStateModel":
+        with np.load(path) as data:
+            return cls(
+                data["feature_mean"],
+                data["feature_std"],
+                data["state_weights"],
+                data["score_weights"],
+            )
+
+
+# Simulator corpus used for offline training
+CORPUS_SCENARIOS = {
+    "easy_content": (0.3, 0.8),
+    "difficult_content": (0.9, 0.4),
+    "engaging_video": (0.5, 0.9),
+    "boring_lecture": (0.6, 0.2),
+    "interactive_quiz": (0.7, 0.7),
+}
+
+
+def build_training_corpus(
+    runs_per_combo: int = 2,
+    ticks_per_run: int = 240,
+    window: int = 40,
+    stride: int = 10,
+    tick_hz: float = 4.0,
+    seed: int = 7,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Generate labeled windows from the EEG simulator.
+
+    Every user profile is run through every scenario, some runs starting
+    late in a session so that fatigue shows up. Labels are derived from the
+    simulator's ground truth (content context, profile and elapsed time).
+    """
+    rng = np.random.default_rng(seed)
+    simulator = EEGSimulator(seed=seed)
+    features, labels, targets = [], [], []
+
+    for user_id, profile in simulator.user_profiles.items():
+        for difficulty, engagement in CORPUS_SCENARIOS.values():
+            for run in range(runs_per_combo):
+                simulator.set_content_context(difficulty, engagement)
+                started_at = float(rng.uniform(0, 90 * 60)) if run % 2 else 0.0
+                simulator.session_duration = started_at
+                trace = np.zeros((ticks_per_run, len(FIELD_INDEX)), dtype=np.float32)
+                for i in range(ticks_per_run):
+                    r = simulator.generate_reading(user_id)
+                    trace[i] = (r.attention, r.focus, r.engagement, r.cognitive_load,
+                                r.alpha, r.beta, r.theta, r.delta, r.gamma)
+                    simulator.session_duration += 1.0 / tick_hz
+
+                starts = np.arange(0, ticks_per_run - window + 1, stride)
+                windows = np.stack([trace[s:s + window] for s in starts])
+                valid = np.ones(windows.shape[:2], dtype=bool)
+                features.append(extract_features(windows, valid, tick_hz))
+
+                # Fatigue as of the end of each window, not of the whole run
+                fatigue = profile.fatigue_rate * (started_at + (starts + window) / tick_hz) / 60
+                attention = windows[..., FIELD_INDEX["attention"]].mean(axis=1)
+                focus = windows[..., FIELD_INDEX["focus"]].mean(axis=1)
+                load = windows[..., FIELD_INDEX["cognitive_load"]].mean(axis=1) / 100
+
+                state = np.full(len(windows), STATES.index("focused"))
+                state[attention < 55] = STATES.index("distracted")
+                state[fatigue >= 8] = STATES.index("fatigued")
+                state[(difficulty > 0.7) & (load > 0.7)] = STATES.index("overloaded")
+                labels.append(state)
+
+                readiness = (0.5 * attention + 0.5 * focus) / 100 - 0.01 * fatigue
+                stress = np.full(len(windows), profile.stress_sensitivity * (0.4 + difficulty) / 1.4)
+                targets.append(np.stack([readiness, load, stress], axis=1))
+
+    return (
+        np.concatenate(features),
+        np.concatenate(labels),
+        np.clip(np.concatenate(targets), 0, 1).astype(np.float32),
+    )
+
+
+def train_default_model(**corpus_kwargs) -> LearningStateModel:
+    features, labels, targets = build_training_corpus(**corpus_kwargs)
+    return LearningStateModel.fit(features, labels, targets)
+
+
+class LearningStateClassifier:
+    """Classifies every live session once per tick and caches the results"""
+
+    def __init__(self, manager: LiveSessionManager, model: Optional[LearningStateModel] = None, min_samples: int = 8):
+        self.manager = manager
+        self.model = model
+        self.min_samples = min_samples
+        self.results: Dict[str, Dict] = {}
+        self.last_inference_seconds = 0.0
+
+    def load_model(self, path: str = settings.LEARNING_STATE_MODEL_PATH):
+        """Load a trained model, falling back to a small simulator-trained one"""
+        self.model = LearningStateModel.load(path) if path else train_default_model()
+
+    def on_tick(self, manager: LiveSessionManager):
+        if self.model is None:
+            return
+        sessions, slots = manager.active()
+        ready = manager.counts[slots] >= self.min_samples
+        if not ready.any():
+            self.results = {}
+            return
+
+        started = time.perf_counter()
+        sessions = [s for s, ok in zip(sessions, ready) if ok]
+        windows, valid = manager.window_view(slots[ready])
+        features = extract_features(windows, valid, manager.tick_hz)
+        probs, scores = self.model.predict(features)
+        state_idx = probs.argmax(axis=1)
+
+        now = time.time()
+        results = {}
+        for i, session in enumerate(sessions):
+            state = STATES[state_idx[i]]
+            action, difficulty = STATE_ACTIONS[state]
+            results[session.session_id] = {
+                "session_id": session.session_id,
+                "user_id": session.user_id,
+                "current_state": state,
+                "state_confidence": round(float(probs[i, state_idx[i]]), 3),
+                "readiness_score": round(float(scores[i, 0]), 3),
+                "cognitive_load": round(float(scores[i, 1]), 3),
+                "stress_level": round(float(scores[i, 2]), 3),
+                "recommended_action": action,
+                "optimal_difficulty": difficulty,
+                "updated_at": now,
+            }
+        # Swap in a fresh dict so ended sessions drop out and readers never see a partial update
+        self.results = results
+        self.last_inference_seconds = time.perf_counter() - started
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        return self.results.get(session_id)
+
+
+# Global learning state classifier
+learning_state_classifier = LearningStateClassifier(live_session_manager)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the learning state model on simulator data")
+    parser.add_argument("output", help="Path of the .npz model file to write")
+    parser.add_argument("--runs", type=int, default=6, help="Runs per profile and scenario")
+    parser.add_argument("--ticks", type=int, default=480, help="Ticks per run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    features, labels, targets = build_training_corpus(
+        runs_per_combo=args.runs, ticks_per_run=args.ticks, seed=args.seed
+    )
+    model = LearningStateModel.fit(features, labels, targets)
+    probs, _ = model.predict(features)
+    accuracy = float((probs.argmax(axis=1) == labels).mean())
+    model.save(args.output)
+    print(f"Trained on {len(features)} windows, training accuracy {accuracy:.2%}")
+    print(f"Model saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Live EEG Session Manager for NeuroLynxEdu AI
+Drives every active simulated session from one fixed-rate tick
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.eeg_simulator import EEGSimulator
+
+logger = logging.getLogger(__name__)
+
+# Reading fields kept in the shared ring buffer, in column order
+READING_FIELDS = (
+    "attention",
+    "focus",
+    "engagement",
+    "cognitive_load",
+    "alpha",
+    "beta",
+    "theta",
+    "delta",
+    "gamma",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(READING_FIELDS)}
+# User id of sessions started without one; stands for the seeded demo account
+DEMO_LIVE_USER_ID = "demo_user"
+
+
+@dataclass
+class LiveSession:
+    """A simulated EEG session occupying one buffer slot"""
+    session_id: str
+    user_id: str
+    slot: int
+    simulator: EEGSimulator
+    started_at: float
+    course_id: Optional[str] = None
+    module_id: Optional[str] = None
+    samples: int = 0
+    # Running totals for the session averages stored when it ends
+    attention_sum: float = 0.0
+    focus_sum: float = 0.0
+
+
+TickListener = Callable[["LiveSessionManager"], None]
+
+
+class LiveSessionManager:
+    """Fixed-tick driver for all live sessions.
+
+    Readings for every session are written into one ``(capacity, window,
+    fields)`` float32 ring buffer that shares a single write cursor, so
+    downstream consumers can process all sessions with one vectorized pass
+    per tick instead of one call per session.
+    """
+
+    def __init__(
+        self,
+        capacity: int = settings.EEG_MAX_LIVE_SESSIONS,
+        window: int = settings.EEG_FEATURE_WINDOW,
+        tick_hz: float = settings.EEG_TICK_HZ,
+    ):
+        self.capacity = capacity
+        self.window = window
+        self.tick_hz = tick_hz
+        self.buffer = np.zeros((capacity, window, len(READING_FIELDS)), dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.int64)  # valid samples per slot
+        self.generations = np.zeros(capacity, dtype=np.int64)  # bumped whenever a slot is reused
+        self.cursor = 0  # next write position, oldest sample once the ring is full
+        self.sessions: Dict[str, LiveSession] = {}
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self._listeners: List[TickListener] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # Tick statistics
+        self.tick_count = 0
+        self.tick_overruns = 0
+        self.last_tick_duration = 0.0
+
+    # Session lifecycle
+
+    def start_session(
+        self,
+        user_id: str = DEMO_LIVE_USER_ID,
+        course_id: Optional[str] = None,
+        module_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> LiveSession:
+        """Allocate a slot and start simulating a session"""
+        if not self._free_slots:
+            raise RuntimeError("No free live session slots")
+        session_id = session_id or f"live_{uuid.uuid4().hex[:12]}"
+        if session_id in self.sessions:
+            raise ValueError(f"Session {session_id} is already running")
+
+        slot = self._free_slots.pop()
+        self.buffer[slot] = 0.0
+        self.counts[slot] = 0
+        self.generations[slot] += 1
+
+        session = LiveSession(
+            session_id=session_id,
+            user_id=user_id,
+            slot=slot,
+            simulator=EEGSimulator(),
+            started_at=time.time(),
+            course_id=course_id,
+            module_id=module_id,
+        )
+        self.sessions[session_id] = session
+        return session
+
+    def stop_session(self, session_id: str) -> Optional[LiveSession]:
+        """Stop a session and release its slot"""
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return None
+        self.counts[session.slot] = 0
+        self._free_slots.append(session.slot)
+        return session
+
+    def get_session(self, session_id: str) -> Optional[LiveSession]:
+        return self.sessions.get(session_id)
+
+    # Vectorized access
+
+    def active(self) -> Tuple[List[LiveSession], np.ndarray]:
+        """Active sessions and their slot indices, in matching order"""
+        sessions = list(self.sessions.values())
+        slots = np.fromiter((s.slot for s in sessions), dtype=np.int64, count=len(sessions))
+        return sessions, slots
+
+    def window_view(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Chronological windows (oldest first) and validity masks for slots"""
+        order = (self.cursor + np.arange(self.window)) % self.window
+        windows = self.buffer[slots][:, order]
+        age = np.arange(self.window - 1, -1, -1)  # 0 for the newest sample
+        valid = age[None, :] < self.counts[slots][:, None]
+        return windows, valid
+
+    def latest(self, slots: np.ndarray) -> np.ndarray:
+        """Most recent reading for each slot, shape ``(len(slots), fields)``"""
+        return self.buffer[slots, (self.cursor - 1) % self.window]
+
+    # Tick loop
+
+    def add_tick_listener(self, listener: TickListener):
+        """Register a callback invoked once per tick after readings are written"""
+        self._listeners.append(listener)
+
+    def tick(self):
+        """Advance every live session by one tick"""
+        started = time.perf_counter()
+        dt = 1.0 / self.tick_hz
+
+        for session in self.sessions.values():
+            simulator = session.simulator
+            reading = simulator.generate_reading(session.user_id)
+            simulator.session_duration += dt
+            self.buffer[session.slot, self.cursor] = (
+                reading.attention,
+                reading.focus,
+                reading.engagement,
+                reading.cognitive_load,
+                reading.alpha,
+                reading.beta,
+                reading.theta,
+                reading.delta,
+                reading.gamma,
+            )
+            session.samples += 1
+            session.attention_sum += reading.attention
+            session.focus_sum += reading.focus
+
+        if self.sessions:
+            _, slots = self.active()
+            self.counts[slots] = np.minimum(self.counts[slots] + 1, self.window)
+        self.cursor = (self.cursor + 1) % self.window
+        self.tick_count += 1
+
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                logger.exception("Live session tick listener failed")
+
+        self.last_tick_duration = time.perf_counter() - started
+
+    async def run(self):
+        """Tick at a fixed rate until cancelled"""
+        period = 1.0 / self.tick_hz
+        next_tick = time.perf_counter()
+        while True:
+            self.tick()
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay < 0:
+                # Skip missed ticks instead of bursting to catch up
+                self.tick_overruns += 1
+                next_tick = time.perf_counter()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global live session manager
+live_session_manager = LiveSessionManager()
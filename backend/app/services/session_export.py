@@ -0,0 +1,268 @@
+"""
+Session Export Service for NeuroLynxEdu AI
+Streams learning sessions to CSV, NDJSON or Parquet in constant memory
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.services.demo_data import iter_learning_sessions
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Column types of a flattened learning session, in default export order
+FIELD_TYPES = {
+    "id": "str",
+    "user_id": "str",
+    "course_id": "str",
+    "module_id": "str",
+    "start_time": "str",
+    "end_time": "str",
+    "duration_minutes": "int",
+    "content_type": "str",
+    "eeg_metrics.avg_attention": "float",
+    "eeg_metrics.avg_focus": "float",
+    "eeg_metrics.peak_attention": "float",
+    "eeg_metrics.attention_stability": "float",
+    "eeg_metrics.focus_episodes": "int",
+    "eeg_metrics.distraction_events": "int",
+    "learning_metrics.completion_rate": "float",
+    "learning_metrics.quiz_score": "float",
+    "learning_metrics.time_on_task": "float",
+    "learning_metrics.interaction_count": "int",
+    "adaptive_actions": "json",
+}
+DEFAULT_FIELDS = list(FIELD_TYPES)
+
+
+# Pipeline stages
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values, like the stored session times, are taken as UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def filter_sessions(
+    sessions: Iterable[Dict[str, Any]],
+    user_id: Optional[str] = None,
+    course_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Keep sessions matching the user, course and start-time range"""
+    start = as_utc(start) if start else None
+    end = as_utc(end) if end else None
+    for session in sessions:
+        if user_id and session.get("user_id") != user_id:
+            continue
+        if course_id and session.get("course_id") != course_id:
+            continue
+        if start or end:
+            started = as_utc(datetime.fromisoformat(session["start_time"]))
+            if start and started < start:
+                continue
+            if end and started >= end:
+                continue
+        yield session
+
+
+def flatten(record: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts into dotted keys; lists are kept as values"""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def project(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Iterator[Dict[str, Any]]:
+    for row in rows:
+        flat = flatten(row)
+        yield {field: flat.get(field) for field in fields}
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+# Encoders: each yields bytes chunks of roughly batch_size rows
+
+def encode_csv(rows: Iterable[Dict[str, Any]], fields: List[str], batch_size: int) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fields)
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell(row[field]) for field in fields])
+        pending += 1
+        if pending >= batch_size:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def encode_ndjson(rows: Iterable[Dict[str, Any]], fields: List[str], batch_size: int) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out as they arrive"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def _parquet_column(values: List[Any], kind: str) -> List[Any]:
+    if kind == "json":
+        return [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+    if kind == "str":
+        return [None if v is None else str(v) for v in values]
+    if kind == "float":
+        return [None if v is None else float(v) for v in values]
+    return values
+
+
+def encode_parquet(rows: Iterable[Dict[str, Any]], fields: List[str], batch_size: int) -> Iterator[bytes]:
+    """Parquet with one row group per batch (requires pyarrow)"""
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    kinds = {field: FIELD_TYPES.get(field, "str") for field in fields}
+    arrow_types = {"str": pa.string(), "int": pa.int64(), "float": pa.float64(), "json": pa.string()}
+    schema = pa.schema([(field, arrow_types[kinds[field]]) for field in fields])
+
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+
+    def write_batch(batch: List[Dict[str, Any]]):
+        columns = {field: _parquet_column([row[field] for row in batch], kinds[field]) for field in fields}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+def export_sessions(
+    fmt: str = "csv",
+    sessions: Optional[Iterable[Dict[str, Any]]] = None,
+    user_id: Optional[str] = None,
+    course_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+    batch_size: int = 500,
+) -> Iterator[bytes]:
+    """Generator pipeline: source -> filter -> project -> encode.
+
+    Only one batch of rows is held at a time, so memory stays bounded no
+    matter how many sessions are exported.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unsupported export format '{fmt}', expected one of {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        _require_pyarrow()
+    fields = fields or DEFAULT_FIELDS
+    source = iter_learning_sessions() if sessions is None else sessions
+    rows = project(filter_sessions(source, user_id, course_id, start, end), fields)
+    return ENCODERS[fmt](rows, fields, batch_size)
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [field.strip() for field in value.split(",") if field.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export learning sessions")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", "-o", help="Output file (stdout if omitted)")
+    parser.add_argument("--source", help="demo_data.json to read sessions from")
+    parser.add_argument("--user-id")
+    parser.add_argument("--course-id")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="ISO start time (inclusive)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="ISO end time (exclusive)")
+    parser.add_argument("--fields", help="Comma-separated dotted field names")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    sessions = iter_learning_sessions(args.source) if args.source else None
+    chunks = export_sessions(
+        args.format, sessions, args.user_id, args.course_id,
+        args.start, args.end, parse_fields(args.fields), args.batch_size,
+    )
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Session History for NeuroLynxEdu AI
+Keyset-paginated, streamed learning session queries
+"""
+
+import base64
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import DATABASE_ERRORS, SessionLocal
+from app.models.session import LearningSession
+from app.services.course_store import db_course_id
+from app.services.live_sessions import LiveSession
+
+logger = logging.getLogger(__name__)
+
+# Fields a client may project; the cursor columns are always read
+SESSION_FIELDS = (
+    "id",
+    "course_id",
+    "module_id",
+    "content_type",
+    "start_time",
+    "end_time",
+    "duration_minutes",
+    "completion_rate",
+    "performance_score",
+    "ai_interactions",
+    "avg_attention_level",
+    "avg_focus_level",
+    "eeg_session_id",
+)
+DEFAULT_FIELDS = ("id", "course_id", "start_time", "end_time", "duration_minutes", "avg_attention_level", "avg_focus_level")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class SessionFilter:
+    course_id: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    min_attention: Optional[float] = None
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Columns are naive UTC timestamps"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in SESSION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def encode_cursor(start_time: datetime, session_id: int, descending: bool) -> str:
+    raw = json.dumps([start_time.isoformat(), session_id, "desc" if descending else "asc"])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, descending: bool) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_time, session_id, order = json.loads(base64.urlsafe_b64decode(padded))
+        position = (datetime.fromisoformat(start_time), int(session_id))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if order != ("desc" if descending else "asc"):
+        raise InvalidCursor("Cursor was issued for the other sort order")
+    return position
+
+
+def build_query(
+    user_id: int,
+    fields: List[str],
+    filters: SessionFilter,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    descending: bool = True,
+):
+    """One page: an index range scan on (user_id[, course_id], start_time, id)"""
+    columns = [getattr(LearningSession, f) for f in fields]
+    stmt = select(LearningSession.start_time, LearningSession.id, *columns).where(LearningSession.user_id == user_id)
+    if filters.course_id is not None:
+        stmt = stmt.where(LearningSession.course_id == filters.course_id)
+    if filters.since is not None:
+        stmt = stmt.where(LearningSession.start_time >= _naive_utc(filters.since))
+    if filters.until is not None:
+        stmt = stmt.where(LearningSession.start_time < _naive_utc(filters.until))
+    if filters.min_attention is not None:
+        stmt = stmt.where(LearningSession.avg_attention_level >= filters.min_attention)
+
+    key = tuple_(LearningSession.start_time, LearningSession.id)
+    if after is not None:
+        position = tuple_(*after)
+        stmt = stmt.where(key < position if descending else key > position)
+    if descending:
+        stmt = stmt.order_by(LearningSession.start_time.desc(), LearningSession.id.desc())
+    else:
+        stmt = stmt.order_by(LearningSession.start_time.asc(), LearningSession.id.asc())
+    # One extra row says whether another page exists
+    return stmt.limit(limit + 1)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def stream_page(
+    user_id: int,
+    fields: List[str],
+    filters: SessionFilter,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    descending: bool = True,
+    session_factory: async_sessionmaker = SessionLocal,
+) -> AsyncIterator[str]:
+    """Yield one page as JSON text, a row at a time, ending with the next cursor.
+
+    The page is fetched, and its connection returned to the pool, before
+    the first chunk is produced: a slow client never holds a connection,
+    and a caller that awaits the first chunk sees database errors before
+    any bytes are sent. A page is at most ``limit + 1`` narrow rows.
+    """
+    stmt = build_query(user_id, fields, filters, limit, after, descending)
+    async with session_factory() as session:
+        rows = (await session.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    yield '{"items":['
+    for i, row in enumerate(rows):
+        item = {f: _json_value(v) for f, v in zip(fields, row[2:])}
+        yield ("," if i else "") + json.dumps(item)
+    last = (rows[-1][0], rows[-1][1]) if rows else None
+    next_cursor = encode_cursor(*last, descending) if has_more and last else None
+    yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
+
+
+async def record_live_session(
+    user_id: int,
+    session: LiveSession,
+    ended_at: float,
+    session_factory: async_sessionmaker = SessionLocal,
+) -> Optional[int]:
+    """Store an ended live session as a learning session; returns its id, or None if it could not be saved"""
+    started = datetime.fromtimestamp(session.started_at, timezone.utc).replace(tzinfo=None)
+    ended = datetime.fromtimestamp(ended_at, timezone.utc).replace(tzinfo=None)
+    samples = max(session.samples, 1)
+    row = LearningSession(
+        user_id=user_id,
+        course_id=db_course_id(session.course_id),
+        module_id=session.module_id,
+        content_type="live",
+        start_time=started,
+        end_time=ended,
+        duration_minutes=round((ended_at - session.started_at) / 60),
+        avg_attention_level=session.attention_sum / samples if session.samples else None,
+        avg_focus_level=session.focus_sum / samples if session.samples else None,
+    )
+    try:
+        async with session_factory() as db:
+            db.add(row)
+            await db.commit()
+            return row.id
+    except (*DATABASE_ERRORS, IntegrityError, OSError):
+        logger.warning("Could not save live session %s to history", session.session_id, exc_info=True)
+        return None
@@ -0,0 +1,376 @@
+"""
+Tutor Chat for NeuroLynxEdu AI
+Streams tutor answers from a pluggable generator with answer caching and request coalescing
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import re
+import time
+import urllib.request
+import zlib
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.course_catalog import course_catalog
+from app.services.course_retrieval import CourseRetrieval, course_retrieval
+from app.services.knowledge_graph import KnowledgeGraph, knowledge_graph
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_TOKEN = re.compile(r"\S+\s*")
+# Longest concept name, in words, matched against a question
+MAX_CONCEPT_WORDS = 4
+# Retrieved course passages scoring lower than this are left out of the context
+MIN_MATERIAL_SCORE = 0.2
+
+FOLLOW_UPS = (
+    "Would you like a worked example?",
+    "Want to try a quick practice question on it?",
+    "Shall I explain it another way?",
+    "Which part would you like to go deeper on?",
+)
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case words only, so rephrasings differing in case, punctuation or spacing match"""
+    return " ".join(_WORD.findall(question.lower()))
+
+
+class TutorGenerator(abc.ABC):
+    """Produces an answer as a stream of text tokens"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def stream(self, question: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the answer's tokens as they are produced"""
+
+
+class LocalTutorGenerator(TutorGenerator):
+    """Deterministic stand-in built from the course and knowledge graph context.
+
+    The same question and context always give the same tokens, emitted
+    ``token_delay`` apart to behave like a model decoding.
+    """
+
+    name = "local"
+
+    def __init__(self, token_delay: float = settings.TUTOR_LOCAL_TOKEN_DELAY_MS / 1000.0):
+        self.token_delay = token_delay
+
+    @staticmethod
+    def compose(question: str, context: Dict[str, Any]) -> str:
+        concept = context.get("concept")
+        course = context.get("course")
+        topic = concept["name"] if concept else course["title"] if course else "this topic"
+        sentences = [f"Good question about {topic}."]
+        if concept:
+            where = f" in {course['title']}" if course else ""
+            sentences.append(f"{concept['name']} is a {str(concept.get('type', 'concept')).lower()}{where}.")
+            if context.get("prerequisites"):
+                sentences.append(f"It builds on {_join(context['prerequisites'])}, so make sure those feel solid first.")
+            if context.get("dependents"):
+                sentences.append(f"Once it clicks, it opens the way to {_join(context['dependents'])}.")
+        else:
+            sentences.append("Let's break it down step by step, starting from what you already know.")
+            if course and course.get("description"):
+                sentences.append(f"In this course: {course['description']}")
+        if context.get("material"):
+            sentences.append(f"You'll find more on this in \"{context['material'][0]['title']}\".")
+        sentences.append(FOLLOW_UPS[zlib.crc32(normalize_question(question).encode()) % len(FOLLOW_UPS)])
+        return " ".join(sentences)
+
+    async def stream(self, question: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        for token in _TOKEN.findall(self.compose(question, context)):
+            await asyncio.sleep(self.token_delay)
+            yield token
+
+
+class OllamaGenerator(TutorGenerator):
+    """Streams from an Ollama server's ``/api/generate`` endpoint"""
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        base_url: str = settings.OLLAMA_BASE_URL,
+        model: str = settings.OLLAMA_MODEL,
+        timeout: float = settings.TUTOR_GENERATOR_TIMEOUT_SECONDS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+
+    @staticmethod
+    def prompt(question: str, context: Dict[str, Any]) -> str:
+        lines = ["You are a patient tutor. Answer clearly and briefly, then offer a next step."]
+        if context.get("course"):
+            lines.append(f"Course: {context['course']['title']}")
+        if context.get("concept"):
+            lines.append(f"Concept: {context['concept']['name']}")
+        if context.get("prerequisites"):
+            lines.append(f"Builds on: {', '.join(context['prerequisites'])}")
+        if context.get("material"):
+            lines.append("Course material:")
+            lines.extend(f"- {passage['title']}: {passage['text']}" for passage in context["material"])
+        history = context.get("history")
+        if history:
+            if history["summary"]:
+                lines.append(f"Earlier the student asked: {'; '.join(history['summary'])}")
+            for turn in history["turns"]:
+                lines.append(f"{'Student' if turn['sender'] == 'user' else 'Tutor'}: {turn['message']}")
+        lines.append(f"Student: {question}")
+        return "\n".join(lines)
+
+    def _open(self, prompt: str):
+        body = json.dumps({"model": self.model, "prompt": prompt, "stream": True}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/generate", data=body, headers={"Content-Type": "application/json"}
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    async def stream(self, question: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await asyncio.to_thread(self._open, self.prompt(question, context))
+        try:
+            while True:
+                line = await asyncio.to_thread(response.readline)
+                if not line:
+                    break
+                chunk = json.loads(line)
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+        finally:
+            response.close()
+
+
+GENERATORS = {"local": LocalTutorGenerator, "ollama": OllamaGenerator}
+
+
+def _join(names: List[str]) -> str:
+    return names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+
+
+class _Generation:
+    """Tokens of one in-flight answer, replayable by any number of readers"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done, self.error = True, error
+        self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            changed = self._changed
+            if position < len(self.tokens):
+                position += 1
+                yield self.tokens[position - 1]
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await changed.wait()
+
+
+class TutorChat:
+    """Answers tutor questions as token streams.
+
+    Answers are cached per (course, normalised question) for ``cache_ttl``.
+    A question already being generated is not generated again: later
+    askers replay the tokens produced so far and then follow along. The
+    generation runs as its own task, so it completes for the others even
+    if the first asker disconnects. Follow-up questions that come with
+    conversation history depend on it, so they bypass both.
+    """
+
+    def __init__(
+        self,
+        generator: Optional[TutorGenerator] = None,
+        cache_size: int = settings.TUTOR_CACHE_SIZE,
+        cache_ttl: float = settings.TUTOR_CACHE_TTL_SECONDS,
+        retrieval: CourseRetrieval = course_retrieval,
+        material_chunks: int = settings.TUTOR_MATERIAL_CHUNKS,
+        window: int = 1000,
+    ):
+        self.retrieval = retrieval
+        self.material_chunks = material_chunks
+        self.generator = generator or GENERATORS.get(settings.TUTOR_BACKEND, LocalTutorGenerator)()
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._inflight: Dict[Tuple[str, str], _Generation] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._concept_names: Tuple[Optional[KnowledgeGraph], Dict[str, int]] = (None, {})
+
+        self.requests = {"generated": 0, "coalesced": 0, "cache": 0}
+        self.failures = 0
+        self._ttft: Dict[str, Deque[float]] = {source: deque(maxlen=window) for source in self.requests}
+        self._tokens_per_second: Deque[float] = deque(maxlen=window)
+
+    # Context
+
+    def _concept_index(self, graph: KnowledgeGraph) -> Dict[str, int]:
+        if self._concept_names[0] is not graph:
+            names = {}
+            for i, node in enumerate(graph.nodes):
+                names.setdefault(normalize_question(node.get("name", "")), i)
+                names.setdefault(normalize_question(node["id"].replace("_", " ")), i)
+            names.pop("", None)
+            self._concept_names = (graph, names)
+        return self._concept_names[1]
+
+    def context(self, question: str, course_id: Optional[str]) -> Dict[str, Any]:
+        """The course, the longest knowledge graph concept named in the question and the best matching course passages"""
+        graph = knowledge_graph.graph
+        names = self._concept_index(graph)
+        words = normalize_question(question).split()
+        match = None
+        for size in range(min(MAX_CONCEPT_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                match = names.get(" ".join(words[start:start + size]))
+                if match is not None:
+                    break
+            if match is not None:
+                break
+        context: Dict[str, Any] = {"course": course_catalog.get(course_id) if course_id else None}
+        if match is not None:
+            context["concept"] = graph.describe([match])[0]
+            context["prerequisites"] = [node["name"] for node in graph.describe(graph.prerequisites(match))]
+            context["dependents"] = [node["name"] for node in graph.describe(graph.dependents(match))]
+        if self.material_chunks:
+            passages = self.retrieval.retrieve(question, self.material_chunks, course_id if context["course"] else None)
+            context["material"] = [p for p in passages if p["score"] >= MIN_MATERIAL_SCORE]
+        return context
+
+    # Answers
+
+    async def _generate(
+        self,
+        key: Optional[Tuple[str, str]],
+        question: str,
+        context: Dict[str, Any],
+        generation: _Generation,
+    ):
+        started = time.perf_counter()
+        first = None
+        try:
+            async for token in self.generator.stream(question, context):
+                if first is None:
+                    first = time.perf_counter()
+                generation.push(token)
+        except asyncio.CancelledError as e:
+            generation.finish(e)
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Tutor generation failed: %s", e)
+            generation.finish(e)
+        else:
+            generation.finish()
+            if key is not None:
+                self.cache.set(key, tuple(generation.tokens))
+            if first is not None and len(generation.tokens) > 1:
+                self._tokens_per_second.append((len(generation.tokens) - 1) / max(time.perf_counter() - first, 1e-9))
+            logger.debug("Generated tutor answer in %.1f ms", (time.perf_counter() - started) * 1000)
+        finally:
+            if key is not None:
+                self._inflight.pop(key, None)
+
+    async def _replay(self, tokens: Tuple[str, ...]) -> AsyncIterator[str]:
+        for token in tokens:
+            yield token
+
+    async def _timed(self, source: str, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        first = True
+        async for token in tokens:
+            if first:
+                self._ttft[source].append(time.perf_counter() - started)
+                first = False
+            yield token
+
+    def _start(self, key: Optional[Tuple[str, str]], question: str, context: Dict[str, Any]) -> _Generation:
+        generation = _Generation()
+        if key is not None:
+            self._inflight[key] = generation
+        generation.task = asyncio.create_task(self._generate(key, question, context, generation))
+        self._tasks.add(generation.task)
+        generation.task.add_done_callback(self._tasks.discard)
+        return generation
+
+    def ask(
+        self,
+        question: str,
+        course_id: Optional[str] = None,
+        history: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, AsyncIterator[str]]:
+        """Token stream answering the question, and where it comes from (generated, coalesced or cache).
+
+        ``history`` is a conversation context window (see ``ConversationStore.context``).
+        """
+        if history and history["turns"]:
+            context = {**self.context(question, course_id), "history": history}
+            source, tokens = "generated", self._start(None, question, context).follow()
+            self.requests[source] += 1
+            return source, self._timed(source, tokens)
+
+        key = (str(course_id or ""), normalize_question(question))
+        cached = self.cache.get(key)
+        if cached is not None:
+            source, tokens = "cache", self._replay(cached)
+        elif key in self._inflight:
+            source, tokens = "coalesced", self._inflight[key].follow()
+        else:
+            source, tokens = "generated", self._start(key, question, self.context(question, course_id)).follow()
+        self.requests[source] += 1
+        return source, self._timed(source, tokens)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._inflight.clear()
+
+    def metrics(self) -> Dict:
+        def summary(samples: Deque[float], scale: float = 1.0) -> Dict[str, Optional[float]]:
+            if not samples:
+                return {"p50": None, "p95": None}
+            p50, p95 = np.percentile(np.fromiter(samples, dtype=float), [50, 95]) * scale
+            return {"p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+
+        return {
+            "generator": self.generator.name,
+            "requests": dict(self.requests),
+            "failures": self.failures,
+            "in_flight": len(self._inflight),
+            "cached_answers": len(self.cache),
+            "time_to_first_token_ms": {source: summary(samples, 1000) for source, samples in self._ttft.items()},
+            "tokens_per_second": summary(self._tokens_per_second),
+        }
+
+
+# Global tutor chat
+tutor_chat = TutorChat()
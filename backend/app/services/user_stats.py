@@ -0,0 +1,399 @@
+"""
+User Statistics Accumulator for NeuroLynxEdu AI
+Write-behind counters and running averages for UserStats
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, TextIO
+
+import numpy as np
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User, UserStats
+from app.services.live_sessions import FIELD_INDEX, LiveSessionManager
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("total_courses", "completed_courses", "total_study_time", "total_ai_sessions")
+SNAPSHOT_FIELDS = COUNTERS + (
+    "learning_streak",
+    "avg_focus_level",
+    "avg_attention_level",
+    "metric_samples",
+    "knowledge_mastery_score",
+    "learning_efficiency",
+)
+
+
+@dataclass
+class StatsDelta:
+    """Changes to one user's stats not yet written to the database"""
+    counters: Dict[str, int] = field(default_factory=dict)
+    focus_sum: float = 0.0
+    attention_sum: float = 0.0
+    samples: int = 0
+    streak: Optional[int] = None  # absolute value, last write wins
+
+    def merge(self, other: "StatsDelta"):
+        for name, value in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.focus_sum += other.focus_sum
+        self.attention_sum += other.attention_sum
+        self.samples += other.samples
+        if other.streak is not None:
+            self.streak = other.streak
+
+    def apply(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Snapshot with this delta applied, mirroring the SQL in ``_write``"""
+        view = dict(snapshot)
+        for name, value in self.counters.items():
+            view[name] = (view.get(name) or 0) + value
+        if self.samples:
+            samples = view.get("metric_samples") or 0
+            total = samples + self.samples
+            view["avg_focus_level"] = ((view.get("avg_focus_level") or 0.0) * samples + self.focus_sum) / total
+            view["avg_attention_level"] = ((view.get("avg_attention_level") or 0.0) * samples + self.attention_sum) / total
+            view["metric_samples"] = total
+        if self.streak is not None:
+            view["learning_streak"] = self.streak
+        return view
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "c": self.counters,
+            "f": self.focus_sum,
+            "a": self.attention_sum,
+            "n": self.samples,
+            "s": self.streak,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StatsDelta":
+        return cls(counters=data["c"], focus_sum=data["f"], attention_sum=data["a"], samples=data["n"], streak=data["s"])
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {name: 0 for name in SNAPSHOT_FIELDS}
+
+
+class UserStatsAccumulator:
+    """Collects stat increments in memory and writes them in batches.
+
+    Every recorded change is first appended to the current log segment, so
+    a crash loses nothing that was acknowledged. A flush closes the
+    segment, applies the merged deltas in one transaction and deletes the
+    segment. Each applied row is stamped with the segment's sequence
+    number and a segment is only applied to rows with an older stamp, so
+    replaying a segment that was already written is a no-op.
+
+    Reads merge a cached database snapshot with deltas not yet flushed.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = SessionLocal,
+        log_dir: str = settings.USER_STATS_LOG_DIR,
+        flush_interval: float = settings.USER_STATS_FLUSH_SECONDS,
+        cache_size: int = settings.USER_CACHE_SIZE,
+        cache_ttl: float = settings.USER_CACHE_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.log_dir = log_dir
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, StatsDelta] = {}
+        self._inflight: Dict[int, StatsDelta] = {}
+        self._segments: List[str] = []  # log segments covering the pending deltas
+        self._sequence = 0
+        self._log: Optional[TextIO] = None
+        self._snapshots = TTLCache(cache_size, cache_ttl)
+        self._flush_lock = asyncio.Lock()
+        # Bumped when a flush starts and ends, so a read can tell one overlapped it
+        self._flush_generation = 0
+        self._task: Optional[asyncio.Task] = None
+        # Non-numeric live session user ids that stand for a database user
+        self._aliases: Dict[str, int] = {}
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_duration = 0.0
+
+    # Recording
+
+    def record(
+        self,
+        user_id: int,
+        counters: Optional[Dict[str, int]] = None,
+        focus: Optional[float] = None,
+        attention: Optional[float] = None,
+        streak: Optional[int] = None,
+    ):
+        delta = StatsDelta(counters=dict(counters or {}), streak=streak)
+        if focus is not None and attention is not None:
+            delta.focus_sum, delta.attention_sum, delta.samples = float(focus), float(attention), 1
+        self.record_many({user_id: delta})
+
+    def record_many(self, deltas: Dict[int, StatsDelta]):
+        """Log and accumulate a group of deltas with a single log write"""
+        if not deltas:
+            return
+        for delta in deltas.values():
+            unknown = set(delta.counters) - set(COUNTERS)
+            if unknown:
+                raise ValueError(f"Unknown counters: {', '.join(sorted(unknown))}")
+        self._append(deltas)
+        for user_id, delta in deltas.items():
+            self._pending.setdefault(user_id, StatsDelta()).merge(delta)
+
+    def alias(self, name: str, user_id: int):
+        """Record stats of live sessions started as ``name`` under database user ``user_id``"""
+        self._aliases[name] = user_id
+
+    def resolve(self, user_id: Any) -> Optional[int]:
+        """Database user id of a live session's user, or None if it has none"""
+        user_id = str(user_id)
+        return int(user_id) if user_id.isdigit() else self._aliases.get(user_id)
+
+    def on_tick(self, manager: LiveSessionManager):
+        """Fold the latest focus and attention of live sessions with database users"""
+        sessions, user_ids = [], []
+        for session in manager.sessions.values():
+            user_id = self.resolve(session.user_id)
+            if user_id is not None and session.samples:
+                sessions.append(session)
+                user_ids.append(user_id)
+        if not sessions:
+            return
+        latest = manager.latest(np.array([s.slot for s in sessions]))
+        deltas: Dict[int, StatsDelta] = {}
+        for user_id, reading in zip(user_ids, latest):
+            delta = deltas.setdefault(user_id, StatsDelta())
+            delta.focus_sum += float(reading[FIELD_INDEX["focus"]])
+            delta.attention_sum += float(reading[FIELD_INDEX["attention"]])
+            delta.samples += 1
+        self.record_many(deltas)
+
+    # Append log
+
+    def _next_sequence(self) -> int:
+        # Millisecond timestamps keep sequences increasing across restarts
+        self._sequence = max(int(time.time() * 1000), self._sequence + 1)
+        return self._sequence
+
+    def _segment_path(self, sequence: int) -> str:
+        return os.path.join(self.log_dir, f"user_stats.{sequence}.log")
+
+    def _append(self, deltas: Dict[int, StatsDelta]):
+        if not self.log_dir:
+            return
+        if self._log is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = self._segment_path(self._next_sequence())
+            self._log = open(path, "a", encoding="utf-8")
+            self._segments.append(path)
+        line = json.dumps({str(user_id): delta.to_dict() for user_id, delta in deltas.items()})
+        self._log.write(line + "\n")
+        self._log.flush()
+
+    def _close_segment(self):
+        if self._log is not None:
+            os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+
+    @staticmethod
+    def _read_segment(path: str) -> Dict[int, StatsDelta]:
+        deltas: Dict[int, StatsDelta] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line from a crash mid-write
+                for user_id, data in entry.items():
+                    deltas.setdefault(int(user_id), StatsDelta()).merge(StatsDelta.from_dict(data))
+        return deltas
+
+    async def replay(self):
+        """Apply log segments left behind by a previous process"""
+        if not self.log_dir or not os.path.isdir(self.log_dir):
+            return
+        own = set(self._segments)
+        paths = [p for p in glob.glob(os.path.join(self.log_dir, "user_stats.*.log")) if p not in own]
+        for path in sorted(paths, key=lambda p: int(p.rsplit(".", 2)[-2])):
+            sequence = int(path.rsplit(".", 2)[-2])
+            self._sequence = max(self._sequence, sequence)
+            deltas = self._read_segment(path)
+            if deltas:
+                await self._write(deltas, sequence)
+            os.remove(path)
+            logger.info("Replayed %d user stats deltas from %s", len(deltas), path)
+
+    # Flushing
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            started = time.perf_counter()
+            self._close_segment()
+            batch, self._pending = self._pending, {}
+            segments, self._segments = self._segments, []
+            sequence = self._next_sequence()
+            self._inflight = batch
+            self._flush_generation += 1
+            try:
+                await self._write(batch, sequence)
+            except Exception:
+                # Keep the deltas; the next flush retries them with a newer sequence
+                for user_id, delta in batch.items():
+                    batch_delta = self._pending.get(user_id)
+                    if batch_delta is not None:
+                        delta.merge(batch_delta)
+                    self._pending[user_id] = delta
+                self._segments = segments + self._segments
+                raise
+            finally:
+                self._inflight = {}
+                self._flush_generation += 1
+            for path in segments:
+                os.remove(path)
+            for user_id in batch:
+                self._snapshots.pop(user_id)
+            self.flushes += 1
+            self.rows_written += len(batch)
+            self.last_flush_duration = time.perf_counter() - started
+
+    async def _write(self, deltas: Dict[int, StatsDelta], sequence: int):
+        async with self.session_factory() as session:
+            user_ids = set(deltas)
+            known = set(await session.scalars(select(User.id).where(User.id.in_(user_ids))))
+            with_stats = set(await session.scalars(select(UserStats.user_id).where(UserStats.user_id.in_(known))))
+            session.add_all(UserStats(user_id=user_id) for user_id in known - with_stats)
+            await session.flush()
+            if len(known) < len(user_ids):
+                logger.warning("Dropping stats for %d unknown users", len(user_ids) - len(known))
+
+            table = UserStats.__table__
+            c = table.c
+            samples = func.coalesce(c.metric_samples, 0)
+            total = samples + bindparam("d_samples")
+            values = {name: func.coalesce(c[name], 0) + bindparam(f"d_{name}") for name in COUNTERS}
+            values.update(
+                avg_focus_level=func.coalesce(
+                    (func.coalesce(c.avg_focus_level, 0.0) * samples + bindparam("d_focus")) / func.nullif(total, 0),
+                    c.avg_focus_level,
+                ),
+                avg_attention_level=func.coalesce(
+                    (func.coalesce(c.avg_attention_level, 0.0) * samples + bindparam("d_attention")) / func.nullif(total, 0),
+                    c.avg_attention_level,
+                ),
+                metric_samples=total,
+                learning_streak=func.coalesce(bindparam("d_streak"), c.learning_streak),
+                log_sequence=bindparam("d_sequence"),
+                updated_at=func.now(),
+            )
+            stmt = (
+                update(table)
+                .where(c.user_id == bindparam("d_user_id"), func.coalesce(c.log_sequence, 0) < bindparam("d_sequence"))
+                .values(**values)
+            )
+            params = [
+                {
+                    "d_user_id": user_id,
+                    "d_sequence": sequence,
+                    "d_samples": delta.samples,
+                    "d_focus": delta.focus_sum,
+                    "d_attention": delta.attention_sum,
+                    "d_streak": delta.streak,
+                    **{f"d_{name}": delta.counters.get(name, 0) for name in COUNTERS},
+                }
+                for user_id, delta in deltas.items()
+                if user_id in known
+            ]
+            if params:
+                await session.execute(stmt, params)
+            await session.commit()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("User stats flush failed, will retry")
+
+    async def start(self):
+        """Replay leftover log segments and start the flush timer"""
+        try:
+            await self.replay()
+        except Exception:
+            logger.exception("User stats log replay failed, segments kept for the next start")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final user stats flush failed, deltas remain in the log")
+        self._close_segment()
+
+    # Reads
+
+    async def get(self, session: AsyncSession, user_id: int) -> Dict[str, Any]:
+        """Current stats: cached database row plus everything not yet flushed"""
+        if user_id in self._inflight:
+            # Wait for the running flush rather than risk counting it twice
+            async with self._flush_lock:
+                pass
+        snapshot = self._snapshots.get(user_id)
+        while snapshot is None:
+            generation = self._flush_generation
+            # populate_existing: a retry must not get the row loaded by the previous attempt back
+            row = await session.scalar(
+                select(UserStats).where(UserStats.user_id == user_id).execution_options(populate_existing=True)
+            )
+            if generation != self._flush_generation or user_id in self._inflight:
+                # A flush overlapped the read, which may or may not have seen its deltas
+                async with self._flush_lock:
+                    pass
+                continue
+            snapshot = {name: getattr(row, name) or 0 for name in SNAPSHOT_FIELDS} if row else _empty_snapshot()
+            self._snapshots.set(user_id, snapshot)
+        for pending in (self._inflight, self._pending):
+            if user_id in pending:
+                snapshot = pending[user_id].apply(snapshot)
+        return snapshot
+
+    def metrics(self) -> Dict:
+        return {
+            "pending_users": len(self._pending),
+            "log_segments": len(self._segments),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 3),
+            "cache_entries": len(self._snapshots),
+            "cache_hits": self._snapshots.hits,
+            "cache_misses": self._snapshots.misses,
+        }
+
+
+# Global stats accumulator
+user_stats = UserStatsAccumulator()
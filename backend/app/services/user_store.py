@@ -0,0 +1,83 @@
+"""
+User Persistence for NeuroLynxEdu AI
+Async queries for user profiles
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import password_hasher
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User, UserStats
+
+DEMO_USERNAME = "demo"
+
+PROFILE_FIELDS = ("email", "full_name", "avatar_url", "learning_preferences", "eeg_device_connected")
+
+# Profiles by username, invalidated on update
+profile_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
+    return await session.scalar(select(User).where(User.username == username))
+
+
+async def ensure_demo_user(session: AsyncSession) -> User:
+    user = await get_user_by_username(session, DEMO_USERNAME)
+    if user:
+        return user
+    hashed_password = await password_hasher.hash(DEMO_USERNAME)
+    user = User(
+        username=DEMO_USERNAME,
+        email="demo@neurolynx.edu",
+        full_name="Demo User",
+        hashed_password=hashed_password,
+        learning_preferences={
+            "preferred_difficulty": "intermediate",
+            "learning_style": "visual",
+            "session_duration": 45
+        }
+    )
+    session.add(user)
+    await session.flush()
+    session.add(UserStats(user_id=user.id))
+    await session.commit()
+    return user
+
+
+async def get_profile(session: AsyncSession, username: str) -> Optional[Dict[str, Any]]:
+    """Read-through cached profile"""
+    profile = profile_cache.get(username)
+    if profile is None:
+        user = await get_user_by_username(session, username)
+        if not user:
+            return None
+        profile = {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "full_name": user.full_name,
+            "avatar_url": user.avatar_url,
+            "learning_preferences": user.learning_preferences or {},
+            "eeg_device_connected": bool(user.eeg_device_connected),
+        }
+        profile_cache.set(username, profile)
+    return profile
+
+
+async def update_profile(session: AsyncSession, user: User, changes: Dict[str, Any]) -> User:
+    """Apply profile changes; raises IntegrityError, with the session rolled back, if the email is taken"""
+    for field in PROFILE_FIELDS:
+        if field in changes:
+            setattr(user, field, changes[field])
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise
+    profile_cache.pop(user.username)
+    return user
@@ -0,0 +1,98 @@
+"""
+Login storm benchmark for NeuroLynxEdu AI
+Measures login throughput and event-loop responsiveness during a burst of logins
+
+Run from the backend directory:
+    python -m benchmarks.login_storm --logins 64 --concurrency 32
+    python -m benchmarks.login_storm --inline   # bcrypt on the event loop, for comparison
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from app.core.auth import password_hasher, verify_password
+from app.main import app
+
+ADMIN_HASH = "$2b$12$EixZaYVK1fsbw1ZfbX3OXePaWxn96p36WQoeG6Lruj3vjPGga31lW"
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def stream_probe(interval: float, lags: List[float], stop: asyncio.Event):
+    """Stands in for an EEG stream: records how late each periodic wake-up is"""
+    expected = time.perf_counter() + interval
+    while not stop.is_set():
+        await asyncio.sleep(max(expected - time.perf_counter(), 0))
+        lags.append(max(time.perf_counter() - expected, 0.0))
+        expected += interval
+
+
+async def login_storm(logins: int, concurrency: int, inline: bool) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    gate = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one_login():
+            async with gate:
+                started = time.perf_counter()
+                if inline:
+                    verify_password("secret", ADMIN_HASH)
+                    status = 200
+                else:
+                    response = await client.post(
+                        "/api/v1/auth/login", data={"username": "admin", "password": "secret"}
+                    )
+                    status = response.status_code
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        lags: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(stream_probe(0.01, lags, stop))
+        await asyncio.sleep(0.2)  # baseline lag before the storm
+        started = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    return {
+        "mode": "inline" if inline else "executor",
+        "logins": logins,
+        "statuses": statuses,
+        "logins_per_second": round(logins / elapsed, 2),
+        "login_p50_ms": round(1000 * statistics.median(latencies), 1),
+        "login_p99_ms": round(1000 * percentile(latencies, 0.99), 1),
+        "stream_lag_p50_ms": round(1000 * percentile(lags, 0.5), 2),
+        "stream_lag_p99_ms": round(1000 * percentile(lags, 0.99), 2),
+        "stream_lag_max_ms": round(1000 * max(lags, default=0.0), 2),
+        "hasher": password_hasher.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm benchmark")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--inline", action="store_true", help="verify bcrypt on the event loop instead")
+    args = parser.parse_args()
+
+    result = asyncio.run(login_storm(args.logins, args.concurrency, args.inline))
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
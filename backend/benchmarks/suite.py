@@ -0,0 +1,399 @@
+"""
+Benchmark suite for NeuroLynxEdu AI
+Times the EEG simulator, session analytics, EEG payload serialization and the main API endpoints,
+saves the results as a JSON baseline and compares later runs against it
+
+Run from the backend directory:
+    python -m benchmarks.suite run --save benchmarks/baselines/main.json
+    python -m benchmarks.suite compare benchmarks/baselines/main.json              # runs the suite now
+    python -m benchmarks.suite compare benchmarks/baselines/main.json after.json   # compares two saved runs
+    python -m benchmarks.suite list
+
+--filter selects benchmarks by name prefix (e.g. --filter analytics. --filter http.).
+compare exits with status 1 when any benchmark's median is slower than the baseline by more than --threshold.
+Baselines are only comparable between runs on the same machine and Python, so none is committed:
+save one from the revision to compare against before making the change.
+The app's data directories and snapshots point at a scratch directory while the suite runs.
+An endpoint that answers anything but 2xx (e.g. no demo data to pick a node id from) is skipped rather than timed.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+# Only modules that leave app.core.config unimported, see scratch_data_settings
+from app.services.eeg_simulator import EEGSimulator
+
+# Session lengths, in minutes at the simulator's 250 Hz, the analytics are timed at
+SESSION_MINUTES = (1, 10, 60)
+SCENARIOS = ("easy_content", "interactive_quiz")
+SEED = 1234
+
+# name -> setup returning the operation to time, so setup cost stays out of the numbers
+Setup = Callable[[], Callable[[], object]]
+BENCHMARKS: Dict[str, Setup] = {}
+# name -> (method, path, body) of in-process HTTP benchmarks; "{course_id}" and "{node_id}"
+# are filled in from the running app
+ENDPOINTS: Dict[str, Tuple[str, str, Optional[Dict]]] = {
+    "http.health": ("GET", "/health", None),
+    "http.eeg_current": ("GET", "/api/v1/eeg/current", None),
+    "http.eeg_latest": ("GET", "/api/v1/eeg/data/latest", None),
+    "http.courses_list": ("GET", "/api/v1/courses/?limit=20", None),
+    "http.course_detail": ("GET", "/api/v1/courses/{course_id}", None),
+    "http.course_search": ("GET", "/api/v1/courses/search?q=machine+learning", None),
+    "http.learning_order": ("GET", "/api/v1/knowledge/nodes/{node_id}/learning-order", None),
+    "http.analytics_dashboard": ("GET", "/api/v1/analytics/dashboard", None),
+    "http.prometheus_metrics": ("GET", "/metrics", None),
+}
+# Settings naming files the app writes, redirected to a scratch directory
+DATA_SETTINGS = {
+    "CENTRALITY_SNAPSHOT_PATH": "graph_centrality.npz",
+    "KNOWLEDGE_TRACING_DIR": "knowledge_tracing",
+    "RETRIEVAL_DIR": "retrieval",
+    "EEG_STORE_DIR": "eeg",
+    "USER_STATS_LOG_DIR": "user_stats",
+}
+
+
+def benchmark(name: str):
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def seeded_simulator() -> EEGSimulator:
+    return EEGSimulator(seed=SEED)
+
+
+def session_readings(minutes: int) -> List[Dict]:
+    """Stored readings of a session ``minutes`` long, one simulated minute repeated"""
+    minute = [asdict(reading) for reading in seeded_simulator().simulate_learning_scenario("interactive_quiz", 1)]
+    return minute * minutes
+
+
+def session_simulator(minutes: int) -> EEGSimulator:
+    simulator = seeded_simulator()
+    simulator.current_session = {"user_id": "demo_user", "start_time": time.time(), "readings": session_readings(minutes)}
+    return simulator
+
+
+def eeg_data():
+    """A payload shaped like ``GET /eeg/data/latest``"""
+    from app.api.v1.endpoints.eeg import EEGData
+
+    rng = random.Random(SEED)
+    return EEGData(
+        timestamp=datetime.now(),
+        raw_data=[rng.uniform(-100, 100) for _ in range(8)],
+        processed_data={band: rng.uniform(0.1, 0.8) for band in ("alpha", "beta", "theta", "delta")},
+        focus_level=rng.uniform(0.6, 0.95),
+        attention_level=rng.uniform(0.5, 0.9),
+        meditation_level=rng.uniform(0.3, 0.8),
+        signal_quality=rng.uniform(0.7, 1.0),
+    )
+
+
+# Simulator
+
+@benchmark("simulator.generate_reading")
+def bench_generate_reading():
+    return seeded_simulator().generate_reading
+
+
+for _scenario in SCENARIOS:
+    @benchmark(f"simulator.scenario.{_scenario}.1min")
+    def bench_scenario(scenario: str = _scenario):
+        simulator = seeded_simulator()
+        return lambda: simulator.simulate_learning_scenario(scenario, 1)
+
+
+# Session analytics
+
+for _minutes in SESSION_MINUTES:
+    @benchmark(f"analytics.session_summary.{_minutes}min")
+    def bench_session_summary(minutes: int = _minutes):
+        return session_simulator(minutes).get_session_summary
+
+    @benchmark(f"analytics.focus_episodes.{_minutes}min")
+    def bench_focus_episodes(minutes: int = _minutes):
+        simulator = EEGSimulator()
+        values = [r["focus"] for r in session_readings(minutes)]
+        return lambda: simulator._count_focus_episodes(values)
+
+    @benchmark(f"analytics.distraction_events.{_minutes}min")
+    def bench_distraction_events(minutes: int = _minutes):
+        simulator = EEGSimulator()
+        values = [r["attention"] for r in session_readings(minutes)]
+        return lambda: simulator._count_distraction_events(values)
+
+
+# Serialization
+
+@benchmark("serialization.eeg_data.model_dump_json")
+def bench_eeg_data_dump_json():
+    return eeg_data().model_dump_json
+
+
+@benchmark("serialization.eeg_data.response")
+def bench_eeg_data_response():
+    # What FastAPI does with a model returned without a response_model
+    data = eeg_data()
+    return lambda: json.dumps(jsonable_encoder(data), separators=(",", ":")).encode("utf-8")
+
+
+@benchmark("serialization.eeg_reading.json")
+def bench_eeg_reading_json():
+    reading = seeded_simulator().generate_reading()
+    return lambda: json.dumps(asdict(reading))
+
+
+# Timing
+
+def summarize(times: List[float], loops: int) -> Dict:
+    ordered = sorted(times)
+    return {
+        "median_s": statistics.median(ordered),
+        "min_s": ordered[0],
+        "p95_s": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "samples": len(ordered),
+        "loops": loops,
+    }
+
+
+def measure(operation: Callable[[], object], min_time: float, repeats: int) -> Dict:
+    """Seconds per call: ``repeats`` timings of enough calls to take ``min_time`` each.
+
+    Garbage collection is paused while timing so a collection triggered by
+    earlier allocations does not land in one repeat at random.
+    """
+    operation()  # warm up caches and lazy imports
+    loops = 1
+    while loops < 1 << 20:
+        started = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / elapsed * 1.1)) if elapsed > 0 else loops * 10
+
+    times = []
+    gc_was_enabled = gc.isenabled()
+    try:
+        for _ in range(repeats):
+            gc.collect()
+            gc.disable()
+            started = time.perf_counter()
+            for _ in range(loops):
+                operation()
+            times.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return summarize(times, loops)
+
+
+async def measure_endpoints(names: List[str], requests: int, warmup: int) -> Dict[str, Dict]:
+    """Latency of each endpoint, one request at a time, with the app started as in production"""
+    import httpx
+
+    from app.main import app
+
+    results: Dict[str, Dict] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            courses = (await client.get("/api/v1/courses/?limit=1")).json().get("items", [])
+            order = (await client.get("/api/v1/knowledge/topological-order")).json().get("order", [])
+            ids = {
+                "course_id": courses[0]["id"] if courses else "1",
+                "node_id": order[-1]["id"] if order else "missing",
+            }
+            for name in names:
+                method, path, body = ENDPOINTS[name]
+                path = path.format(**ids)
+                statuses: Dict[int, int] = {}
+                latencies = []
+                for i in range(warmup + requests):
+                    started = time.perf_counter()
+                    response = await client.request(method, path, json=body)
+                    if i >= warmup:
+                        latencies.append(time.perf_counter() - started)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                failed = {status: count for status, count in statuses.items() if not 200 <= status < 300}
+                if failed:
+                    # An error response is timed as fast as any other, so it must not become a baseline number
+                    print(f"{name:<48} {'skipped':>10}  {method} {path} answered {failed}", file=sys.stderr)
+                    continue
+                results[name] = {**summarize(latencies, 1), "statuses": statuses}
+    return results
+
+
+def selected(filters: Optional[List[str]]) -> List[str]:
+    names = list(BENCHMARKS) + list(ENDPOINTS)
+    return [name for name in names if not filters or any(name.startswith(f) for f in filters)]
+
+
+def environment() -> Dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def scratch_data_settings(directory: str):
+    """Point the app's data settings into ``directory``.
+
+    Services take these paths as defaults when their module is imported, so
+    this has to run before anything imports ``app.core.config``.
+    """
+    if "app.core.config" in sys.modules:
+        raise RuntimeError("app settings were loaded before the scratch data directory was set")
+    for name, path in DATA_SETTINGS.items():
+        os.environ[name] = os.path.join(directory, path)
+
+
+def run_suite(filters: Optional[List[str]], min_time: float, repeats: int, requests: int) -> Dict:
+    names = selected(filters)
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        scratch_data_settings(scratch)
+        for name in names:
+            if name in BENCHMARKS:
+                results[name] = measure(BENCHMARKS[name](), min_time, repeats)
+                print(f"{name:<48} {format_seconds(results[name]['median_s']):>10}", file=sys.stderr)
+        endpoints = [name for name in names if name in ENDPOINTS]
+        if endpoints:
+            for name, result in asyncio.run(measure_endpoints(endpoints, requests, max(requests // 10, 5))).items():
+                results[name] = result
+                print(f"{name:<48} {format_seconds(result['median_s']):>10}", file=sys.stderr)
+    return {"environment": environment(), "settings": {"min_time": min_time, "repeats": repeats, "requests": requests}, "results": results}
+
+
+# Reporting
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Report lines and the names of benchmarks whose median slowed down by more than ``threshold``"""
+    lines = []
+    for key in ("python", "platform", "machine"):
+        before, after = baseline["environment"].get(key), current["environment"].get(key)
+        if before != after:
+            lines.append(f"warning: {key} differs ({before} -> {after}); timings may not be comparable")
+    lines.append(f"{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = []
+    before_results, after_results = baseline["results"], current["results"]
+    for name in sorted(set(before_results) | set(after_results)):
+        if name not in after_results:
+            lines.append(f"{name:<48} {format_seconds(before_results[name]['median_s']):>10} {'-':>10} {'':>8}  not run")
+            continue
+        after = after_results[name]["median_s"]
+        if name not in before_results:
+            lines.append(f"{name:<48} {'-':>10} {format_seconds(after):>10} {'':>8}  new")
+            continue
+        before = before_results[name]["median_s"]
+        change = after / before - 1 if before else 0.0
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = ""
+        lines.append(f"{name:<48} {format_seconds(before):>10} {format_seconds(after):>10} {change:>+8.1%}  {status}")
+    return lines, regressions
+
+
+def load(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(result: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list benchmark names")
+    run = commands.add_parser("run", help="run the suite and print or save the results")
+    run.add_argument("--save", help="write the results to this JSON file")
+    check = commands.add_parser("compare", help="compare against a saved baseline")
+    check.add_argument("baseline")
+    check.add_argument("current", nargs="?", help="saved results to compare; the suite runs now if omitted")
+    check.add_argument("--threshold", type=float, default=0.10, help="slowdown of the median flagged as a regression")
+    check.add_argument("--save", help="also write the new results to this JSON file")
+    for command in (run, check):
+        command.add_argument("--filter", action="append", help="only benchmarks whose name starts with this")
+        command.add_argument("--min-time", type=float, default=0.2, help="seconds each repeat runs for at least")
+        command.add_argument("--repeats", type=int, default=7)
+        command.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print("\n".join(selected(None)))
+        return
+    if args.command == "compare" and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; save one first with: python -m benchmarks.suite run --save {args.baseline}")
+
+    if args.command == "compare" and args.current:
+        current = load(args.current)
+    else:
+        filters = args.filter
+        if args.command == "compare" and not filters:
+            filters = list(load(args.baseline)["results"])  # only what the baseline has numbers for
+        current = run_suite(filters, args.min_time, args.repeats, args.requests)
+    if args.save:
+        save(current, args.save)
+
+    if args.command == "run":
+        if not args.save:
+            print(json.dumps(current, indent=2, sort_keys=True))
+        return
+    lines, regressions = compare(load(args.baseline), current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
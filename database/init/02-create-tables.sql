@@ -28,9 +28,11 @@ CREATE TABLE IF NOT EXISTS user_stats (
     learning_streak INTEGER DEFAULT 0,
     avg_focus_level FLOAT DEFAULT 0.0,
     avg_attention_level FLOAT DEFAULT 0.0,
+    metric_samples INTEGER DEFAULT 0,
     total_ai_sessions INTEGER DEFAULT 0,
     knowledge_mastery_score FLOAT DEFAULT 0.0,
     learning_efficiency FLOAT DEFAULT 0.0,
+    log_sequence BIGINT DEFAULT 0,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -43,6 +45,7 @@ CREATE TABLE IF NOT EXISTS courses (
     estimated_duration INTEGER DEFAULT 0,
     thumbnail_url VARCHAR(255),
     rating FLOAT DEFAULT 0.0,
+    enrollment_count INTEGER DEFAULT 0,
     tags TEXT[],
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -60,6 +63,14 @@ CREATE TABLE IF NOT EXISTS course_enrollments (
     UNIQUE(user_id, course_id)
 );
 
+-- Sharded enrollment counters, summed with courses.enrollment_count on read
+CREATE TABLE IF NOT EXISTS course_enrollment_counters (
+    course_id INTEGER REFERENCES courses(id) ON DELETE CASCADE,
+    shard INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_id, shard)
+);
+
 -- EEG sessions
 CREATE TABLE IF NOT EXISTS eeg_sessions (
     id SERIAL PRIMARY KEY,
@@ -82,11 +93,16 @@ CREATE TABLE IF NOT EXISTS learning_sessions (
     user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
     course_id INTEGER REFERENCES courses(id),
     eeg_session_id INTEGER REFERENCES eeg_sessions(id),
+    module_id VARCHAR(100),
+    content_type VARCHAR(50),
     start_time TIMESTAMP NOT NULL,
     end_time TIMESTAMP,
+    duration_minutes INTEGER DEFAULT 0,
     completion_rate FLOAT DEFAULT 0.0,
     performance_score FLOAT,
     ai_interactions INTEGER DEFAULT 0,
+    avg_attention_level FLOAT,
+    avg_focus_level FLOAT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -121,5 +137,6 @@ CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_username ON users(username);
 CREATE INDEX idx_course_enrollments_user_id ON course_enrollments(user_id);
 CREATE INDEX idx_eeg_sessions_user_id ON eeg_sessions(user_id);
-CREATE INDEX idx_learning_sessions_user_id ON learning_sessions(user_id);
-CREATE INDEX idx_ai_chat_messages_session_id ON ai_chat_messages(session_id);
\ No newline at end of file
+CREATE INDEX idx_learning_sessions_user_start ON learning_sessions(user_id, start_time, id);
+CREATE INDEX idx_learning_sessions_user_course_start ON learning_sessions(user_id, course_id, start_time, id);
+CREATE INDEX idx_ai_chat_messages_session_id ON ai_chat_messages(session_id, id);
\ No newline at end of file